@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+# Copyright: (c) 2025, Ansible Module
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+"""Discovery and inventory throughput against a simulated rack.
+
+    sudo python3 benchmarks/bench_discovery.py --servers 32 --switches 4 \\
+        --latency 0.05 --jitter 0.02 --failure-rate 0.01
+
+Targets (--targets, comma separated, default all):
+
+- ansibleautodiscover-serial: ansibleautodiscover.discover_neighbors()
+- ansibleautodiscover-async: ansibleautodiscover with AsyncDiscoveryEngine
+- autodiscover: pythonToolkit autodiscover.discoverNodes() + discoverSwitches()
+- ha-inventory: Ucp_HA_configchecker HA_operations.collectInventory()
+
+For every run it reports devices identified, devices/sec and p50/p95/p99
+per-device latency (first contact to last answer, as seen by the fake
+device). --repeat runs each target again with the identity cache from the
+previous run, which is what a re-run during bring-up looks like.
+
+The code under test is imported from this tree, so its own dependencies
+(ansible, requests, netmiko, and quantaskylake and friends for the
+pythonToolkit targets) must be installed. The identity cache goes to a
+temporary file, never the real one.
+"""
+
+import argparse
+import contextlib
+import importlib.util
+import io
+import json
+import math
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import simulator
+
+TOOLKIT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODULE_UTILS_DIR = os.path.join(TOOLKIT_DIR, 'plugins', 'module_utils')
+MODULES_DIR = os.path.join(TOOLKIT_DIR, 'plugins', 'modules')
+PYTHON_TOOLKIT_DIR = os.path.join(TOOLKIT_DIR, 'pythonToolkit')
+
+TARGETS = ('ansibleautodiscover-serial', 'ansibleautodiscover-async', 'autodiscover', 'ha-inventory')
+
+
+def percentile(values, p):
+    """Nearest-rank percentile; None for no values"""
+    if not values:
+        return None
+    values = sorted(values)
+    return values[max(0, int(math.ceil(p / 100.0 * len(values))) - 1)]
+
+
+def load_module(name):
+    """Import a plugins/modules file with this tree's module_utils behind ansible.module_utils"""
+    import ansible.module_utils
+    if MODULE_UTILS_DIR not in ansible.module_utils.__path__:
+        ansible.module_utils.__path__.append(MODULE_UTILS_DIR)
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.spec_from_file_location(name, os.path.join(MODULES_DIR, name + '.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    sys.modules[name] = module
+    return module
+
+
+def load_flat(name):
+    """Import a pythonToolkit / module_utils script the way the toolkit scripts do"""
+    for directory in (MODULE_UTILS_DIR, PYTHON_TOOLKIT_DIR):
+        if directory not in sys.path:
+            sys.path.insert(0, directory)
+    return importlib.import_module(name)
+
+
+def close_pooled_connections():
+    """Drop pooled Redfish connections, tokens and switch sessions so every run starts cold"""
+    for name in ('redfish_client', 'ansible.module_utils.redfish_client',
+                 'switch_sessions', 'ansible.module_utils.switch_sessions'):
+        module = sys.modules.get(name)
+        if module is not None:
+            module.close_all()
+
+
+def credentials(args, good):
+    """The good credential behind --wrong-credentials bad passwords"""
+    username, password = good
+    return [username], [f'wrong-{number}' for number in range(args.wrong_credentials)] + [password]
+
+
+def run_ansibleautodiscover(fleet, args, engine):
+    module = load_module('ansibleautodiscover')
+    usernames, passwords = credentials(args, simulator.DEFAULT_SERVER_CREDENTIALS)
+    switch_usernames, switch_passwords = credentials(args, simulator.DEFAULT_SWITCH_CREDENTIALS)
+    cache = module.IdentityCache(os.environ['TOOLKIT_IDENTITY_CACHE'])
+    addresses = fleet.server_addresses + fleet.switch_addresses
+    if engine == 'async':
+        discovery = module.AsyncDiscoveryEngine(module.identify_server, module.identify_switch,
+                                                max_in_flight=args.max_in_flight, identity_cache=cache,
+                                                verify_server=module.verify_server,
+                                                verify_switch=module.verify_switch)
+        servers, switches = discovery.discover(
+            addresses,
+            [(u, p) for u in usernames for p in passwords],
+            [(u, p) for u in switch_usernames for p in switch_passwords])
+    else:
+        servers, switches = module.discover_neighbors(addresses, usernames, passwords,
+                                                      switch_usernames, switch_passwords, identity_cache=cache)
+    cache.save()
+    return len(servers), len(switches)
+
+
+def run_autodiscover(fleet, args):
+    autodiscover = load_flat('autodiscover')
+    usernames, passwords = credentials(args, simulator.DEFAULT_SERVER_CREDENTIALS)
+    switch_usernames, switch_passwords = credentials(args, simulator.DEFAULT_SWITCH_CREDENTIALS)
+    nodes = autodiscover.discoverNodes(fleet.server_addresses, usernames, passwords) if fleet.bmcs else []
+    switches = autodiscover.discoverSwitches(fleet.switch_addresses, switch_usernames,
+                                             switch_passwords) if fleet.switches else []
+    return len(nodes), len(switches)
+
+
+def run_ha_inventory(fleet, args):
+    configchecker = load_flat('Ucp_HA_configchecker')
+    username, password = simulator.DEFAULT_SERVER_CREDENTIALS
+    operations = configchecker.HA_operations(args.max_in_flight)
+    operations.nodes = [{'IPV6': address, 'Username': username, 'Password': password}
+                        for address in fleet.server_addresses]
+    nodes = operations.collectInventory()
+    return len([node for node in nodes if node.get('FC_card_details')]), 0
+
+
+def run_target(target, fleet, args):
+    if target == 'ansibleautodiscover-serial':
+        return run_ansibleautodiscover(fleet, args, 'serial')
+    if target == 'ansibleautodiscover-async':
+        return run_ansibleautodiscover(fleet, args, 'async')
+    if target == 'autodiscover':
+        return run_autodiscover(fleet, args)
+    return run_ha_inventory(fleet, args)
+
+
+def measure(target, fleet, args, run):
+    fleet.reset_stats()
+    close_pooled_connections()
+    output = io.StringIO()
+    started = time.monotonic()
+    with contextlib.redirect_stdout(output):
+        servers, switches = run_target(target, fleet, args)
+    elapsed = time.monotonic() - started
+    latencies = fleet.latencies()
+    return {
+        'target': target,
+        'run': run,
+        'devices': len(fleet.devices) if target != 'ha-inventory' else len(fleet.bmcs),
+        'servers_found': servers,
+        'switches_found': switches,
+        'seconds': round(elapsed, 3),
+        'devices_per_second': round((servers + switches) / elapsed, 2) if elapsed else None,
+        'p50': percentile(latencies, 50),
+        'p95': percentile(latencies, 95),
+        'p99': percentile(latencies, 99),
+    }
+
+
+def print_report(results):
+    header = f"{'target':<28}{'run':>4}{'found':>9}{'seconds':>10}{'dev/s':>9}{'p50':>9}{'p95':>9}{'p99':>9}"
+    print(header)
+    print('-' * len(header))
+
+    def ms(value):
+        return '-' if value is None else f'{value * 1000:.0f}ms'
+
+    for r in results:
+        found = f"{r['servers_found'] + r['switches_found']}/{r['devices']}"
+        print(f"{r['target']:<28}{r['run']:>4}{found:>9}{r['seconds']:>10.2f}{r['devices_per_second'] or 0:>9.1f}"
+              f"{ms(r['p50']):>9}{ms(r['p95']):>9}{ms(r['p99']):>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--servers', type=int, default=16, help='fake BMCs')
+    parser.add_argument('--switches', type=int, default=2, help='fake switches')
+    parser.add_argument('--latency', type=float, default=0.02, help='seconds added to every request')
+    parser.add_argument('--jitter', type=float, default=0.01, help='+/- seconds of random latency')
+    parser.add_argument('--failure-rate', type=float, default=0.0, help='fraction of requests that fail')
+    parser.add_argument('--server-model', default='HA820_G2', choices=sorted(simulator.SERVER_MODELS))
+    parser.add_argument('--switch-model', default='Nexus93180YCFX3', choices=sorted(simulator.SWITCH_MODELS))
+    parser.add_argument('--wrong-credentials', type=int, default=0,
+                        help='bad passwords tried before the right one')
+    parser.add_argument('--max-in-flight', type=int, default=32)
+    parser.add_argument('--targets', default=','.join(TARGETS))
+    parser.add_argument('--repeat', type=int, default=1, help='runs per target, sharing the identity cache')
+    parser.add_argument('--prefix', default=simulator.DEFAULT_PREFIX, help='IPv6 prefix for the fake devices')
+    parser.add_argument('--no-configure-addresses', action='store_true',
+                        help='the addresses are already on lo; do not add/remove them')
+    parser.add_argument('--seed', type=int, help='seed for jitter and failure injection')
+    parser.add_argument('--json', help='also write the results to this file')
+    args = parser.parse_args()
+
+    targets = [target.strip() for target in args.targets.split(',') if target.strip()]
+    unknown = [target for target in targets if target not in TARGETS]
+    if unknown:
+        parser.error(f"unknown targets: {', '.join(unknown)}")
+
+    workdir = tempfile.mkdtemp(prefix='bench-discovery-')
+    os.environ['TOOLKIT_IDENTITY_CACHE'] = os.path.join(workdir, 'identity_cache.json')
+    # autodiscover writes HA rows to HA8XX_scripts/servers.csv relative to the working directory
+    os.makedirs(os.path.join(workdir, 'HA8XX_scripts'))
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    results = []
+    try:
+        with simulator.FakeFleet(args.servers, args.switches, args.latency, args.jitter, args.failure_rate,
+                                 args.server_model, args.switch_model, args.prefix,
+                                 not args.no_configure_addresses, args.seed) as fleet:
+            for target in targets:
+                if os.path.exists(os.environ['TOOLKIT_IDENTITY_CACHE']):
+                    os.remove(os.environ['TOOLKIT_IDENTITY_CACHE'])
+                for run in range(1, args.repeat + 1):
+                    results.append(measure(target, fleet, args, run))
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print_report(results)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'parameters': vars(args), 'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,567 @@
+# Copyright: (c) 2025, Ansible Module
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+"""Simulated rack for benchmarking discovery without hardware.
+
+FakeFleet puts N fake BMCs and M fake switches on IPv6 addresses added to the
+loopback interface:
+
+- a BMC serves Redfish over HTTPS on 443 (service root, SessionService,
+  Systems, Managers/1/EthernetInterfaces, Chassis/1/NetworkAdapters with
+  ports, $expand=. on collections) and holds UDP 623 open
+- a switch serves SSH on 22 with a shell answering `show version`
+  (Cisco NX-OS) or `chassisshow` (Brocade); NX-OS switches also take
+  `configure terminal` ... `end` and show what was configured in
+  `show running-config`
+
+Every request or command is delayed by latency +/- jitter and fails with
+failure_rate (HTTP 503, a dropped SSH channel). Each device records when it
+was first contacted and when it last answered, which gives per-device
+latency without instrumenting the code under test.
+
+Needs root (or CAP_NET_ADMIN and CAP_NET_BIND_SERVICE) for the loopback
+addresses and the low ports, openssl for the throwaway TLS certificate and
+paramiko for the switches.
+"""
+
+import base64
+import json
+import os
+import random
+import re
+import socket
+import ssl
+import subprocess
+import tempfile
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_PREFIX = 'fd00:5e1::'
+DEFAULT_SERVER_CREDENTIALS = ('admin', 'cmb9.admin')
+DEFAULT_SWITCH_CREDENTIALS = ('admin', 'Passw0rd!')
+
+# (Model, SKU) pairs the discovery code recognises
+SERVER_MODELS = {
+    'HA820_G2': ('Hitachi Advanced Server HA820 G2', 'P05174-B21'),
+    'HA810_G3': ('Hitachi Advanced Server HA810 G3', 'WC3382-008'),
+    'D52B': ('D52B', 'D52B-1U'),
+}
+SWITCH_MODELS = {
+    'Nexus93180YCFX3': 'show version',
+    'Nexus9332C': 'show version',
+    'G620': 'chassisshow',
+}
+NXOS_MODELS = {'Nexus93180YCFX3': 'N9K-C93180YC-FX3', 'Nexus9332C': 'N9K-C9332C'}
+BROCADE_FACTORY_IDS = {'G620': 'BROCAD0000G62'}
+# Config commands that open a section, and settings a section holds once (a new value replaces the old)
+CONFIG_SECTIONS = ('interface ', 'vpc domain', 'vlan ', 'mlag configuration')
+CONFIG_SETTINGS = ('description', 'switchport mode', 'switchport trunk allowed vlan', 'channel-group', 'mtu',
+                   'role priority', 'peer-keepalive destination', 'ip address')
+
+
+class Faults(object):
+    """Latency, jitter and failure injection shared by the fake devices"""
+
+    def __init__(self, latency=0.0, jitter=0.0, failure_rate=0.0, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def delay(self):
+        with self._lock:
+            pause = self.latency + self._random.uniform(-self.jitter, self.jitter)
+        if pause > 0:
+            time.sleep(pause)
+
+    def fail(self):
+        with self._lock:
+            return self._random.random() < self.failure_rate
+
+
+class DeviceStats(object):
+    """First contact and last answer of one device"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.first_contact = None
+            self.last_answer = None
+            self.requests = 0
+
+    def contact(self):
+        with self._lock:
+            if self.first_contact is None:
+                self.first_contact = time.monotonic()
+
+    def answered(self):
+        with self._lock:
+            self.last_answer = time.monotonic()
+            self.requests += 1
+
+    @property
+    def latency(self):
+        with self._lock:
+            if self.first_contact is None or self.last_answer is None:
+                return None
+            return self.last_answer - self.first_contact
+
+
+def make_certificate(directory):
+    """Throwaway self-signed certificate for the fake BMCs; returns (certfile, keyfile)"""
+    certfile = os.path.join(directory, 'bmc.crt')
+    keyfile = os.path.join(directory, 'bmc.key')
+    subprocess.run(['openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes', '-days', '1',
+                    '-subj', '/CN=bmc-simulator', '-keyout', keyfile, '-out', certfile],
+                   check=True, capture_output=True)
+    return certfile, keyfile
+
+
+def redfish_tree(index, model, sku):
+    """Resources of one fake BMC, {path: body}"""
+    mac = f'02:00:5e:01:{index >> 8 & 0xff:02x}:{index & 0xff:02x}'
+    systems = '/redfish/v1/Systems'
+    adapters = '/redfish/v1/Chassis/1/NetworkAdapters'
+    interfaces = '/redfish/v1/Managers/1/EthernetInterfaces'
+    tree = {
+        '/redfish/v1': {'@odata.id': '/redfish/v1', 'RedfishVersion': '1.6.0',
+                        'Systems': {'@odata.id': systems}},
+        systems: {'@odata.id': systems, 'Members': [{'@odata.id': f'{systems}/1'}]},
+        f'{systems}/1': {
+            '@odata.id': f'{systems}/1', 'Id': '1', 'Model': model, 'SKU': sku,
+            'SerialNumber': f'SIM{index:06d}', 'PowerState': 'On',
+            'Oem': {'Hpe': {'PostState': 'FinishedPost'}},
+        },
+        interfaces: {'@odata.id': interfaces, 'Members': [{'@odata.id': f'{interfaces}/1'}]},
+        f'{interfaces}/1': {
+            '@odata.id': f'{interfaces}/1', 'Name': 'Manager Dedicated Network Interface',
+            'LinkStatus': 'LinkUp', 'MACAddress': mac, 'PermanentMACAddress': mac,
+            'HostName': f'ilo-sim-{index}', 'IPv4Addresses': [],
+            'IPv6Addresses': [{'Address': f'fe80::{index:x}'}],
+        },
+        adapters: {'@odata.id': adapters, 'Members': [{'@odata.id': f'{adapters}/DC1'}]},
+    }
+    ports = [f'{adapters}/DC1/Ports/{port}' for port in (1, 2)]
+    tree[f'{adapters}/DC1'] = {
+        '@odata.id': f'{adapters}/DC1', 'Name': 'Simulated FC HBA', 'Model': 'SN1610Q',
+        'SerialNumber': f'HBA{index:06d}', 'SKU': 'R2E09A',
+        'Controllers': [{
+            'FirmwarePackageVersion': '2.10.0',
+            'Links': {'Ports': [{'@odata.id': port} for port in ports]},
+            'Location': {'PartLocation': {'LocationType': 'Slot', 'ServiceLabel': 'PCI-E Slot 1'}},
+        }],
+    }
+    for number, port in enumerate(ports, 1):
+        tree[port] = {
+            '@odata.id': port, 'PortId': str(number), 'SignalDetected': True, 'LinkNetworkTechnology': 'FibreChannel',
+            'Ethernet': {'AssociatedMACAddresses': [f'10:00:00:5e:{index & 0xff:02x}:{number:02x}']},
+        }
+    return tree
+
+
+class _TLSServer(ThreadingHTTPServer):
+    address_family = socket.AF_INET6
+    daemon_threads = True
+
+    def __init__(self, bmc, context):
+        self.bmc = bmc
+        ThreadingHTTPServer.__init__(self, (bmc.address, 443), _RedfishHandler, bind_and_activate=False)
+        self.socket = context.wrap_socket(self.socket, server_side=True, do_handshake_on_connect=False)
+        self.server_bind()
+        self.server_activate()
+
+    def verify_request(self, request, client_address):
+        # Also counts bare port probes that connect and hang up
+        self.bmc.stats.contact()
+        return True
+
+    def handle_error(self, request, client_address):
+        pass  # port probes and aborted handshakes are expected
+
+
+class _RedfishHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body=None, headers=None):
+        data = json.dumps(body).encode() if body is not None else b''
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+        self.server.bmc.stats.answered()
+
+    def _authorized(self):
+        bmc = self.server.bmc
+        if self.headers.get('X-Auth-Token') in bmc.sessions.values():
+            return True
+        auth = self.headers.get('Authorization', '')
+        if auth.startswith('Basic '):
+            try:
+                return base64.b64decode(auth[6:]).decode() == ':'.join(bmc.credentials)
+            except ValueError:
+                return False
+        return False
+
+    def _prologue(self):
+        bmc = self.server.bmc
+        bmc.faults.delay()
+        if bmc.faults.fail():
+            self._send(503, {'error': {'code': 'Base.1.0.ServiceTemporarilyUnavailable'}})
+            return False
+        return True
+
+    def do_GET(self):
+        if not self._prologue():
+            return
+        path, _, query = self.path.partition('?')
+        path = path.rstrip('/') or '/'
+        if path != '/redfish/v1' and not self._authorized():
+            return self._send(401, {'error': {'code': 'Base.1.0.NoValidSession'}})
+        body = self.server.bmc.get(path, '$expand=' in query)
+        if body is None:
+            return self._send(404, {'error': {'code': 'Base.1.0.ResourceMissingAtURI'}})
+        self._send(200, body)
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        data = self.rfile.read(length) if length else b''
+        if not self._prologue():
+            return
+        bmc = self.server.bmc
+        if self.path.rstrip('/') != '/redfish/v1/SessionService/Sessions':
+            if not self._authorized():
+                return self._send(401, {'error': {'code': 'Base.1.0.NoValidSession'}})
+            return self._send(204)
+        try:
+            body = json.loads(data or b'{}')
+        except ValueError:
+            body = {}
+        if (body.get('UserName'), body.get('Password')) != bmc.credentials:
+            return self._send(401, {'error': {'code': 'Base.1.0.NoValidSession'}})
+        session_id, token = bmc.new_session()
+        location = f'/redfish/v1/SessionService/Sessions/{session_id}'
+        self._send(201, {'@odata.id': location}, {'X-Auth-Token': token, 'Location': location})
+
+    def do_DELETE(self):
+        if not self._prologue():
+            return
+        if not self._authorized():
+            return self._send(401, {'error': {'code': 'Base.1.0.NoValidSession'}})
+        self.server.bmc.sessions.pop(self.path.rstrip('/').rsplit('/', 1)[-1], None)
+        self._send(204)
+
+
+class FakeBMC(object):
+    """Redfish over HTTPS on 443 and UDP 623 for one address"""
+
+    def __init__(self, address, index, faults, credentials=DEFAULT_SERVER_CREDENTIALS, model='HA820_G2'):
+        self.address = address
+        self.faults = faults
+        self.credentials = tuple(credentials)
+        self.stats = DeviceStats()
+        self.sessions = {}
+        self.tree = redfish_tree(index, *SERVER_MODELS[model])
+        self._http = None
+        self._udp = None
+
+    def get(self, path, expand=False):
+        body = self.tree.get(path)
+        if body is None or not expand or 'Members' not in body:
+            return body
+        members = [self.tree.get(member['@odata.id'], member) for member in body['Members']]
+        return dict(body, Members=members)
+
+    def new_session(self):
+        session_id, token = str(len(self.sessions) + 1), uuid.uuid4().hex
+        self.sessions[session_id] = token
+        return session_id, token
+
+    def start(self, context):
+        self._udp = socket.socket(socket.AF_INET6, socket.SOCK_DGRAM)
+        self._udp.bind((self.address, 623))
+        self._http = _TLSServer(self, context)
+        threading.Thread(target=self._http.serve_forever, daemon=True).start()
+
+    def stop(self):
+        if self._http is not None:
+            self._http.shutdown()
+            self._http.server_close()
+        if self._udp is not None:
+            self._udp.close()
+
+
+class FakeSwitch(object):
+    """SSH on 22 with a shell that answers the identification commands and keeps a running-config"""
+
+    def __init__(self, address, index, faults, host_key, credentials=DEFAULT_SWITCH_CREDENTIALS,
+                 model='Nexus93180YCFX3'):
+        self.address = address
+        self.index = index
+        self.faults = faults
+        self.host_key = host_key
+        self.credentials = tuple(credentials)
+        self.model = model
+        self.stats = DeviceStats()
+        self.hostname = f'sim-switch-{index}'
+        # section header (None for global lines) -> lines, in the order configured
+        self.running = {None: []}
+        self._lock = threading.Lock()
+        self._socket = None
+        self._running = False
+
+    def prompt(self, shell=None):
+        if shell and shell.get('config'):
+            return f"{self.hostname}({'config-if' if shell.get('section') else 'config'})# "
+        return f'{self.hostname}# '
+
+    def running_config(self):
+        lines = ['!Command: show running-config', 'hostname ' + self.hostname]
+        with self._lock:
+            for line in self.running[None]:
+                lines.append(line)
+            for header, section in self.running.items():
+                if header is not None:
+                    lines.append(header)
+                    lines.extend('  ' + line for line in section)
+        return '\r\n'.join(lines) + '\r\n'
+
+    def configure(self, command, shell):
+        """One line in configuration mode; returns the switch's answer"""
+        if command == 'end':
+            shell.update(config=False, section=None)
+            return ''
+        if command == 'exit':
+            shell['config'] = shell.get('section') is not None
+            shell['section'] = None
+            return ''
+        with self._lock:
+            if command.startswith('hostname '):
+                self.hostname = command.split(None, 1)[1]
+                return ''
+            if command.startswith(CONFIG_SECTIONS):
+                shell['section'] = command
+                self.running.setdefault(command, [])
+                return ''
+            if command.startswith('feature '):
+                shell['section'] = None
+                if command not in self.running[None]:
+                    self.running[None].append(command)
+                return ''
+            section = self.running.get(shell['section']) if shell.get('section') else None
+            if section is None:
+                return '% Invalid command at \'^\' marker.\r\n'
+            if command.startswith('no '):
+                section[:] = [line for line in section if line != command[3:]]
+                return ''
+            setting = next((prefix for prefix in CONFIG_SETTINGS if command.startswith(prefix + ' ')), None)
+            if setting is not None:
+                section[:] = [line for line in section if not line.startswith(setting + ' ')]
+            if command not in section:
+                section.append(command)
+        return ''
+
+    def respond(self, command, shell=None):
+        command = command.strip()
+        shell = {} if shell is None else shell
+        if not command:
+            return ''
+        if shell.get('config'):
+            return self.configure(command, shell)
+        if command.startswith('terminal') or command.startswith('set cli'):
+            return ''
+        if command == 'show version' and self.model in NXOS_MODELS:
+            return ('Cisco Nexus Operating System (NX-OS) Software\r\n'
+                    '  NXOS: version 9.3(8)\r\n'
+                    f'  cisco Nexus9000 {NXOS_MODELS[self.model]} Chassis\r\n'
+                    f'  Device name: {self.hostname}\r\n')
+        if command == 'chassisshow' and self.model in BROCADE_FACTORY_IDS:
+            return (f'Chassis Family:         {self.model}\r\n'
+                    f'Factory Part Num:       {BROCADE_FACTORY_IDS[self.model]}\r\n'
+                    f'Serial Num:             SIMFC{self.index:05d}\r\n')
+        if self.model in NXOS_MODELS:
+            if command == 'configure terminal':
+                shell['config'] = True
+                return ''
+            if command == 'show running-config':
+                return self.running_config()
+            if command == 'copy running-config startup-config':
+                return 'Copy complete.\r\n'
+        return '% Invalid command at \'^\' marker.\r\n'
+
+    def start(self):
+        self._socket = socket.socket(socket.AF_INET6, socket.SOCK_STREAM)
+        self._socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._socket.bind((self.address, 22))
+        self._socket.listen(64)
+        self._running = True
+        threading.Thread(target=self._accept, daemon=True).start()
+
+    def stop(self):
+        self._running = False
+        if self._socket is not None:
+            self._socket.close()
+
+    def _accept(self):
+        while self._running:
+            try:
+                connection, peer = self._socket.accept()
+            except OSError:
+                return
+            self.stats.contact()
+            threading.Thread(target=self._serve, args=(connection,), daemon=True).start()
+
+    def _serve(self, connection):
+        import paramiko
+
+        switch = self
+
+        class Server(paramiko.ServerInterface):
+            def check_auth_password(self, username, password):
+                switch.faults.delay()
+                if (username, password) == switch.credentials:
+                    return paramiko.AUTH_SUCCESSFUL
+                return paramiko.AUTH_FAILED
+
+            def get_allowed_auths(self, username):
+                return 'password'
+
+            def check_channel_request(self, kind, chanid):
+                return paramiko.OPEN_SUCCEEDED if kind == 'session' else paramiko.OPEN_FAILED_ADMINISTRATIVELY_PROHIBITED
+
+            def check_channel_pty_request(self, *args):
+                return True
+
+            def check_channel_shell_request(self, channel):
+                return True
+
+        transport = paramiko.Transport(connection)
+        transport.add_server_key(self.host_key)
+        try:
+            transport.start_server(server=Server())
+            channel = transport.accept(30)
+            if channel is None:
+                return
+            channel.send(('\r\n' + self.prompt()).encode())
+            shell = {}
+            buffer = ''
+            while True:
+                data = channel.recv(1024)
+                if not data:
+                    break
+                # netmiko's is_alive() probes with a NUL, which a switch ignores
+                buffer += data.decode(errors='replace').replace('\x00', '')
+                while re.search(r'[\r\n]', buffer):
+                    line, buffer = re.split(r'\r\n|\r|\n', buffer, maxsplit=1)
+                    self.faults.delay()
+                    if self.faults.fail():
+                        channel.close()
+                        return
+                    answer = self.respond(line, shell)
+                    channel.send((line + '\r\n' + answer + self.prompt(shell)).encode())
+                    self.stats.answered()
+        except Exception:
+            pass
+        finally:
+            transport.close()
+
+
+class LoopbackAddresses(object):
+    """Adds prefix+1 .. prefix+count as /128 addresses on lo, and removes them again"""
+
+    def __init__(self, count, prefix=DEFAULT_PREFIX, configure=True):
+        self.addresses = [f'{prefix}{number:x}' for number in range(1, count + 1)]
+        self.configure = configure
+
+    def __enter__(self):
+        if self.configure:
+            for address in self.addresses:
+                subprocess.run(['ip', '-6', 'addr', 'replace', f'{address}/128', 'dev', 'lo', 'nodad'],
+                               check=True, capture_output=True)
+        return self.addresses
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self.configure:
+            for address in self.addresses:
+                subprocess.run(['ip', '-6', 'addr', 'del', f'{address}/128', 'dev', 'lo'], capture_output=True)
+
+
+class FakeFleet(object):
+    """N fake BMCs followed by M fake switches on consecutive loopback addresses"""
+
+    def __init__(self, servers=8, switches=2, latency=0.0, jitter=0.0, failure_rate=0.0,
+                 server_model='HA820_G2', switch_model='Nexus93180YCFX3', prefix=DEFAULT_PREFIX,
+                 configure_addresses=True, seed=None):
+        self.faults = Faults(latency, jitter, failure_rate, seed)
+        self.server_count = servers
+        self.switch_count = switches
+        self.server_model = server_model
+        self.switch_model = switch_model
+        self._addresses = LoopbackAddresses(servers + switches, prefix, configure_addresses)
+        self._tmpdir = None
+        self.bmcs = []
+        self.switches = []
+
+    @property
+    def devices(self):
+        return self.bmcs + self.switches
+
+    @property
+    def server_addresses(self):
+        return [bmc.address for bmc in self.bmcs]
+
+    @property
+    def switch_addresses(self):
+        return [switch.address for switch in self.switches]
+
+    def __enter__(self):
+        addresses = self._addresses.__enter__()
+        try:
+            self._tmpdir = tempfile.mkdtemp(prefix='bmc-simulator-')
+            context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+            context.load_cert_chain(*make_certificate(self._tmpdir))
+            for index, address in enumerate(addresses[:self.server_count], 1):
+                bmc = FakeBMC(address, index, self.faults, model=self.server_model)
+                bmc.start(context)
+                self.bmcs.append(bmc)
+            if self.switch_count:
+                import paramiko
+                host_key = paramiko.RSAKey.generate(2048)
+                for index, address in enumerate(addresses[self.server_count:], 1):
+                    switch = FakeSwitch(address, index, self.faults, host_key, model=self.switch_model)
+                    switch.start()
+                    self.switches.append(switch)
+        except Exception:
+            self.__exit__(None, None, None)
+            raise
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        for device in self.devices:
+            device.stop()
+        self.bmcs, self.switches = [], []
+        self._addresses.__exit__(exc_type, exc_value, traceback)
+        if self._tmpdir:
+            for name in os.listdir(self._tmpdir):
+                os.remove(os.path.join(self._tmpdir, name))
+            os.rmdir(self._tmpdir)
+            self._tmpdir = None
+
+    def reset_stats(self):
+        for device in self.devices:
+            device.stats.reset()
+
+    def latencies(self):
+        """Per-device seconds from first contact to last answer, for devices that answered"""
+        return [device.stats.latency for device in self.devices if device.stats.latency is not None]
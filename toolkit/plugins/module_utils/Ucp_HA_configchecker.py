@@ -1,6 +1,5 @@
 import sys
 from typing import Any
-import redfish
 import os
 from prettytable import PrettyTable
 from pexpect.popen_spawn import PopenSpawn
@@ -16,9 +15,13 @@ import autodiscover
 import json
 import networkconfig
 import helper
+import redfish_client
 import logging
 logger = logging.getLogger("root")
 import csv
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import threading
 #sys.path.insert(1,'C:\\UCPToolkit7.1\\UCPCI-HC_MediaKit_V7.1_2023\\WinPython-64bit-3.6.3.0Zero\\scripts\\HA8XX_scripts')
 
 
@@ -46,8 +49,23 @@ def danceLEDs(orderednodes, dance = True):
         if not dance:
             break
 
+# Nodes inventoried at the same time; each holds one iLO session
+HA_MAX_WORKERS = 8
+
+ETHERNET_URL = "/redfish/v1/Managers/1/EthernetInterfaces"
+FC_URL = "/redfish/v1/Chassis/1/NetworkAdapters"
+ETHERNET_FIELDS = ["Name", "LinkStatus", "MACAddress", "PermanentMACAddress", "HostName",
+                   "IPv6Addresses", "IPv4Addresses"]
+FC_CARD_FIELDS = ["Controllers", "Model", "Name", "SerialNumber", "SKU"]
+FC_PORT_FIELDS = ["Ethernet", "SignalDetected", "PortId", "LinkNetworkTechnology"]
+NETWORK_PORT_FIELDS = ["AssociatedNetworkAddresses", "LinkStatus", "PhysicalPortNumber", "ActiveLinkTechnology"]
+
 class HA_operations:
-    def __init__(self):
+    def __init__(self, max_workers=HA_MAX_WORKERS):
+        self.max_workers = max_workers
+        # iLOs that rejected $select; guarded by the lock since nodes run in parallel
+        self.no_select = set()
+        self.lock = threading.Lock()
         if nodes!=[]:
             self.nodes = nodes
             print("nodes exist")
@@ -55,43 +73,70 @@ class HA_operations:
             self.nodes = nodes
             print("empty nodes ")
 
-    def createSession(self, custom_url):
-        print(f"creating session for node {self.ilo_host} ")
-        base_url = f"https://{self.ilo_host}"
-        login_account = self.Username
-        login_password = self.Password
-        self.custom_url = custom_url
-
-        # Create a REDFISH object
-        print(f"url -->>>>> {base_url}")
-        REDFISH_OBJ = redfish.RedfishClient(base_url=base_url, username=login_account,
-                                            password=login_password, default_prefix='/redfish/v1')
-
-
-        # Login into the server and create a session
+    @contextmanager
+    def nodeSession(self, node):
+        """Log in to a node's iLO once and yield the client (None if login failed)"""
+        client = redfish_client.RedfishClient(node["IPV6"], node["Username"], node["Password"], auth='session')
+        print(f"creating session for node {node['IPV6']} ")
         try:
-            REDFISH_OBJ.login(auth="session")
+            client.login()
             print("Session creation successful!")
-        except redfish.rest.exceptions.JSONDecodeError:
-            print("Error in Creating Session.")
+        except (redfish_client.RedfishError, requests.RequestException):
+            print(f"Error in Creating Session for node {node['IPV6']}.")
+            yield None
             return
-
-
-        # Do a GET on a given path
         try:
-            print(f"calling URL {self.ilo_host}{self.custom_url}")
-            response = REDFISH_OBJ.get(self.custom_url)
-        except redfish.rest.exceptions.JSONDecodeError:
-            print(f"Error in calling custom api {self.custom_url}")
-            REDFISH_OBJ.logout()
-            return
-
-        # Print out the response
-        sys.stdout.write("%s\n" % response)
+            yield client
+        finally:
+            # Logout of the node session
+            client.logout()
 
-        # Logout of the current session
-        REDFISH_OBJ.logout()
-        return response
+    def getResource(self, client, url, select=None):
+        """GET one resource, asking only for the fields in select when the iLO allows it"""
+        try:
+            if select and client.base_url not in self.no_select:
+                response = client.get(f"{url}?$select={','.join(select)}")
+                if response.ok:
+                    return response.json()
+                with self.lock:
+                    self.no_select.add(client.base_url)
+            response = client.get(url)
+            if response.ok:
+                return response.json()
+            print(f"Error in calling custom api {client.host}{url}: {response.status_code}")
+        except (ValueError, requests.RequestException) as e:
+            print(f"Error in calling custom api {client.host}{url}: {e}")
+        return None
+
+    def getMembers(self, client, collection_url, select=None):
+        """Return the members of a collection, expanded in a single GET when the iLO supports $expand"""
+        collection = self.getResource(client, f"{collection_url}?$expand=.")
+        members = collection.get("Members", []) if collection else []
+        # Expanded members carry their properties; unexpanded ones only @odata.id
+        if members and all(len(member) > 1 for member in members):
+            return members
+        if collection is None:
+            collection = self.getResource(client, collection_url)
+            members = collection.get("Members", []) if collection else []
+        details = []
+        for member in members:
+            data = self.getResource(client, member.get("@odata.id", ""), select)
+            if data:
+                details.append(data)
+        return details
+
+    def forEachNode(self, collect):
+        """Run collect(node) for every node in parallel, at most max_workers at a time"""
+        if not self.nodes:
+            return self.nodes
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(self.nodes))) as executor:
+            futures = {executor.submit(collect, node): node for node in self.nodes}
+            for future in as_completed(futures):
+                try:
+                    future.result()
+                except Exception as e:
+                    print(f"An error occurred while processing node: {futures[future]}\nError: {e}")
+        return self.nodes
 
     def Discover_HA_Nodes(self):
         print("Please hold on while we Discover HA nodes...")
@@ -118,182 +163,128 @@ class HA_operations:
             print(f"{count+1} : {item}")
         return nodes
 
-    def getEthernetAdapters(self):
-        for node in self.nodes:
+    def collectInventory(self):
+        """Ethernet and FC inventory of every node, one session per node"""
+        def collect(node):
             print(f"Getting node details : {node}")
-            self.ilo_host = node["IPV6"]
-            self.Username = node["Username"]
-            self.Password = node["Password"]
-            self.ethernet_url = "/redfish/v1/Managers/1/EthernetInterfaces"
-            try:
-                response = self.createSession(self.ethernet_url)
-                if response and response.status == 200:
-                    # Extract members from the API response
-                    members_eth = response.dict.get("Members", [])
-                    member_eth_ids = [member.get("@odata.id", "") for member in members_eth]
-                    ntw_card= self.processEthernetMembers(member_eth_ids)
-                node["management_cards_details"]=ntw_card
-            except Exception as e:
-                print(f"An error occurred while processing node Ethernet Adapters: {node}\nError: {e}")
+            with self.nodeSession(node) as client:
+                if client is None:
+                    return
+                node["management_cards_details"] = self.processEthernetMembers(
+                    self.getMembers(client, ETHERNET_URL, ETHERNET_FIELDS))
+                node["FC_card_details"] = self.processFCMembers(client, self.getMembers(client, FC_URL, FC_CARD_FIELDS))
+        return self.forEachNode(collect)
 
-    def processEthernetMembers(self, member_eth_ids):
+    def getEthernetAdapters(self):
+        def collect(node):
+            print(f"Getting node details : {node}")
+            with self.nodeSession(node) as client:
+                if client is None:
+                    return
+                members = self.getMembers(client, ETHERNET_URL, ETHERNET_FIELDS)
+                node["management_cards_details"] = self.processEthernetMembers(members)
+        return self.forEachNode(collect)
+
+    def processEthernetMembers(self, members_eth):
         ntw_card = []
-        for member_id_url in member_eth_ids:
-            ntw_card_details = {}
-            print(f"\n processing details of member {member_id_url}")
-            try:
-                response = self.createSession(member_id_url)
-                if response and response.status == 200:
-                    # Process the response for each member
-                    ipv6_addresses = response.dict.get("IPv6Addresses", [])
-                    ipv4_addresses = response.dict.get("IPv4Addresses", [])
-                    IPv6Addresses = [addr.get("Address") for addr in ipv6_addresses]
-                    IPv4Addresses = [addr.get("Address") for addr in ipv4_addresses]
-                    if(response.dict.get("Name", "") == "Manager Dedicated Network Interface"):
-                        ntw_card_details = {
-                            "LinkStatus": response.dict.get("LinkStatus", ""),
-                            "MACAddress": response.dict.get("MACAddress", ""),
-                            "PermanentMACAddress": response.dict.get("PermanentMACAddress", ""),
-                            "HostName": response.dict.get("HostName", ""),
-                            "IPv6Addresses": IPv6Addresses,
-                            "IPv4Addresses": IPv4Addresses,
-                            "Name": response.dict.get("Name", "")
-                        }
-                else:
-                    print(f"Failed to create session for member: {member_id_url}")
-                if ntw_card_details:
-                    ntw_card.append(ntw_card_details)
-            except Exception as e:
-                print(f"An error occurred while processing Ethernet Member {member_id_url}\nError: {e}")
+        for data in members_eth:
+            print(f"\n processing details of member {data.get('@odata.id', '')}")
+            ipv6_addresses = data.get("IPv6Addresses", [])
+            ipv4_addresses = data.get("IPv4Addresses", [])
+            IPv6Addresses = [addr.get("Address") for addr in ipv6_addresses]
+            IPv4Addresses = [addr.get("Address") for addr in ipv4_addresses]
+            if(data.get("Name", "") == "Manager Dedicated Network Interface"):
+                ntw_card.append({
+                    "LinkStatus": data.get("LinkStatus", ""),
+                    "MACAddress": data.get("MACAddress", ""),
+                    "PermanentMACAddress": data.get("PermanentMACAddress", ""),
+                    "HostName": data.get("HostName", ""),
+                    "IPv6Addresses": IPv6Addresses,
+                    "IPv4Addresses": IPv4Addresses,
+                    "Name": data.get("Name", "")
+                })
         return ntw_card
 
 
-    def processFCMembers(self, member_fc_ids):
+    def processFCMembers(self, client, members_fc):
         fc_card = []
-        for member_id in member_fc_ids:
+        for data in members_fc:
+            member_id = data.get("@odata.id", "")
             try:
                 print(f"processing FC member : {member_id}")
-                response = self.createSession(member_id)
-                #response = response.dict.get()
-                if response and response.status == 200:
-                    print(f"response 200 for {member_id}")
-                    self.fc_card_details = {}
-                    # Extracting Controllers details
-                    controllers = response.dict.get("Controllers", [])
-                    if controllers:
-                        controller = controllers[0]
-                        firmware_version = controller.get("FirmwarePackageVersion")
-                        self.fc_card_details["FirmwarePackageVersion"] = firmware_version
-
-                    # Extract NetworkDeviceFunctions, NetworkPorts, and Ports from Controllers
-                    links = controller.get("Links", {})
-                    #etwork_device_functions = links.get("NetworkDeviceFunctions", [])
-                    #network_device_function_ids = [func.get("@odata.id") for func in network_device_functions]
-                    #self.fc_card_details["NetworkDeviceFunctions"] = network_device_function_ids
-
-                    #Updating Dictionary with port details
-
-
-                    # Extract NetworkPorts and Ports from Controllers
-                    network_ports = links.get("NetworkPorts", [])
-                    network_port_ids = [port.get("@odata.id") for port in network_ports]
-                    self.fc_card_details["NetworkPorts"] = network_port_ids
-
-                    ports = links.get("Ports", [])
-                    port_ids = [port.get("@odata.id") for port in ports]
-                    self.fc_card_details["Ports"] = port_ids
-
-                    # Extract LocationType and ServiceLabel from Location
-                    location = controller.get("Location", {})
-                    part_location = location.get("PartLocation", {})
-                    location_type = part_location.get("LocationType")
-                    service_label = part_location.get("ServiceLabel")
-                    self.fc_card_details["LocationType"] = location_type
-                    self.fc_card_details["ServiceLabel"] = service_label
-
-                    # Extract Model, Name, SerialNumber, and SKU from response
-                    self.fc_card_details["Model"] = response.dict.get("Model")
-                    self.fc_card_details["Name"] = response.dict.get("Name")
-                    self.fc_card_details["SerialNumber"] = response.dict.get("SerialNumber")
-                    self.fc_card_details["SKU"] = response.dict.get("SKU")
-                    fc_card_details=self.fc_card_details
-                    print(f"fc_card_details  : {self.fc_card_details}")
-                    ports = self.processFCMemberPorts()
-                    self.fc_card_details["ports_data"] = ports
-                else:
-                    print(f"Failed to process member: {member_id}")
-                if fc_card_details:
-                    print(f"FC cards with ports data {fc_card_details}")
-                    fc_card.append(self.fc_card_details)
+                fc_card_details = {}
+                # Extracting Controllers details
+                controllers = data.get("Controllers", [])
+                controller = controllers[0] if controllers else {}
+                if controllers:
+                    fc_card_details["FirmwarePackageVersion"] = controller.get("FirmwarePackageVersion")
+
+                # Extract NetworkPorts and Ports from Controllers
+                links = controller.get("Links", {})
+                network_ports = links.get("NetworkPorts", [])
+                fc_card_details["NetworkPorts"] = [port.get("@odata.id") for port in network_ports]
+
+                ports = links.get("Ports", [])
+                fc_card_details["Ports"] = [port.get("@odata.id") for port in ports]
+
+                # Extract LocationType and ServiceLabel from Location
+                location = controller.get("Location", {})
+                part_location = location.get("PartLocation", {})
+                fc_card_details["LocationType"] = part_location.get("LocationType")
+                fc_card_details["ServiceLabel"] = part_location.get("ServiceLabel")
+
+                # Extract Model, Name, SerialNumber, and SKU from response
+                fc_card_details["Model"] = data.get("Model")
+                fc_card_details["Name"] = data.get("Name")
+                fc_card_details["SerialNumber"] = data.get("SerialNumber")
+                fc_card_details["SKU"] = data.get("SKU")
+                print(f"fc_card_details  : {fc_card_details}")
+                fc_card_details["ports_data"] = self.processFCMemberPorts(client, fc_card_details)
+                print(f"FC cards with ports data {fc_card_details}")
+                fc_card.append(fc_card_details)
             except Exception as e:
                 print(f"An error occurred while processing FC Member {member_id}\nError: {e}")
         return fc_card
 
 
     def getFCCardDetails(self):
-        try:
-            for node in self.nodes:
-                self.ilo_host = node["IPV6"]
-                self.Username = node["Username"]
-                self.Password = node["Password"]
-                self.fc_url = "/redfish/v1/Chassis/1/NetworkAdapters"
-                response = self.createSession(self.fc_url)
-                if response and response.status == 200:
-                    members_fc = response.dict.get("Members", [])
-                    member_fc_ids = [member.get("@odata.id", "") for member in members_fc]
-                    fc_cards= self.processFCMembers(member_fc_ids)
-                else:
+        def collect(node):
+            with self.nodeSession(node) as client:
+                if client is None:
                     print("Failed to retrieve FC card details.")
-                node["FC_card_details"]=fc_cards
+                    return
+                node["FC_card_details"] = self.processFCMembers(client, self.getMembers(client, FC_URL, FC_CARD_FIELDS))
+        return self.forEachNode(collect)
 
-
-            nodes_data = json.dumps(self.nodes, indent=4)
-            return self.nodes
-        except Exception as e:
-            print(f"An error occurred while getting FC card details: {e}")
-            return None
-
-    def processFCMemberPorts(self):
+    def processFCMemberPorts(self, client, fc_card_details):
         ports_details = []
         print("\n working on to fetch the NetworkDeviceFunctions ")
-        ports_fc_cards = self.fc_card_details.get("Ports", [])
-        ports_ethernet_cards = self.fc_card_details.get("NetworkPorts", [])
-        try:
-            if(ports_fc_cards):
-                for port_id_url in ports_fc_cards:
-                    port_data = {}
-                    response = self.createSession(port_id_url)
-                    if response and response.status == 200:
-                        port_json = response.dict
-                        # Extract the required items
-                        port_data["AssociatedMACAddresses"] = port_json["Ethernet"]["AssociatedMACAddresses"]
-                        port_data["SignalDetected"] = port_json["SignalDetected"]
-                        port_data["PortId"] = port_json["PortId"]
-                        port_data["LinkNetworkTechnology"] = port_json["LinkNetworkTechnology"]
-                        # Append the port_data dictionary to ports_details
-                        ports_details.append(port_data)
-                    else:
-                        print(f"Failed to process NetworkDeviceFunction: {port_id_url}")
-        except Exception as e:
-                print(f"An error occurred while processing NetworkDeviceFunctions")
+        ports_fc_cards = fc_card_details.get("Ports", [])
+        ports_ethernet_cards = fc_card_details.get("NetworkPorts", [])
+        if(ports_fc_cards):
+            for port_id_url in ports_fc_cards:
+                port_json = self.getResource(client, port_id_url, FC_PORT_FIELDS)
+                try:
+                    ports_details.append({
+                        "AssociatedMACAddresses": port_json["Ethernet"]["AssociatedMACAddresses"],
+                        "SignalDetected": port_json["SignalDetected"],
+                        "PortId": port_json["PortId"],
+                        "LinkNetworkTechnology": port_json["LinkNetworkTechnology"]
+                    })
+                except (KeyError, TypeError):
+                    print(f"Failed to process NetworkDeviceFunction: {port_id_url}")
         else:
-            try:
-                for port_id_url in ports_ethernet_cards:
-                    port_data = {}
-                    response = self.createSession(port_id_url)
-                    if response and response.status == 200:
-                        port_json = response.dict
-                        # Extract the required items
-                        port_data["AssociatedMACAddresses"] = port_json["AssociatedNetworkAddresses"][0]
-                        port_data["SignalDetected"] = port_json["LinkStatus"]
-                        port_data["PortId"] = port_json["PhysicalPortNumber"]
-                        port_data["LinkNetworkTechnology"] = port_json["ActiveLinkTechnology"]
-                        # Append the port_data dictionary to ports_details
-                        ports_details.append(port_data)
-                    else:
-                        print(f"Failed to process NetworkDeviceFunction: {port_id_url}")
-            except Exception as e:
-                print(f"An error occurred while processing NetworkDeviceFunctions Else Block...")
+            for port_id_url in ports_ethernet_cards:
+                port_json = self.getResource(client, port_id_url, NETWORK_PORT_FIELDS)
+                try:
+                    ports_details.append({
+                        "AssociatedMACAddresses": port_json["AssociatedNetworkAddresses"][0],
+                        "SignalDetected": port_json["LinkStatus"],
+                        "PortId": port_json["PhysicalPortNumber"],
+                        "LinkNetworkTechnology": port_json["ActiveLinkTechnology"]
+                    })
+                except (KeyError, IndexError, TypeError):
+                    print(f"Failed to process NetworkDeviceFunction: {port_id_url}")
         return ports_details
 
 
@@ -325,10 +316,8 @@ def main():
     #this returns list of nodes reading from server.csv
     nodes = objc.Discover_HA_Nodes()
 
-    #calling getEthernetAdapters() for discovered nodes and returns nodes by appending the ethernet adaptor values.
-    nodes = objc.getEthernetAdapters()
-
-    nodes = objc.getFCCardDetails()
+    #collects ethernet adaptor and FC card details for the discovered nodes in parallel and returns nodes with them appended.
+    nodes = objc.collectInventory()
 
     input("I'm going to detect the rack-design by detecting the type of switches in this rack. Hit enter to continue.")
 
@@ -338,10 +327,14 @@ def main():
         logger.info("I discovered the following switches:")
         for switch in switches:
             logger.info(switch.name + ' ' + switch.host)
-        UCPCINet = networkconfig.networkstack(racknum, switches, networkconfigjson)
+        try:
+            UCPCINet = networkconfig.networkstack(racknum, switches, networkconfigjson)
 
-        UCPCINet.detectOrder()
-        if UCPCINet.design is None:
+            UCPCINet.detectOrder()
+        except networkconfig.DesignNotFound as e:
+            logger.info(str(e))
+            UCPCINet = None
+        if UCPCINet is None or UCPCINet.design is None:
             input("I wasn't able to detect the design of this rack. Please hit enter to try again.")
         else:
             break
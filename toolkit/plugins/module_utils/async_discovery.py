@@ -0,0 +1,255 @@
+# Copyright: (c) 2025, Ansible Module
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+"""Asyncio discovery engine shared by the IPv6 discovery modules.
+
+The engine only schedules work. Identification (Redfish GET, SSH show
+commands) stays in the calling module and is passed in as plain callables,
+so the serial and async paths return exactly the same result dicts.
+"""
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+import asyncio
+import functools
+import logging
+import socket
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    from ansible.module_utils import run_trace
+    from ansible.module_utils.identity_cache import walk_credentials
+except ImportError:
+    import run_trace
+    from identity_cache import walk_credentials
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_IN_FLIGHT = 32
+DEFAULT_HOST_TIMEOUT = 60
+PORT_TIMEOUT = 2
+PING_TIMEOUT = 3
+
+# Ports checked once per address by the single-pass sweep
+IPMI_PORT = 623
+HTTPS_PORT = 443
+SSH_PORT = 22
+
+
+def classify_ports(open_ports, discover_servers=True, discover_switches=True):
+    """Return the identification paths to try, in order, for the ports that answered
+
+    A BMC answers on 623 and/or 443 and goes to Redfish first. Anything with SSH open
+    falls through to the switch path, which also catches switches that serve NX-API/eAPI
+    on 443 but fail the Redfish login.
+    """
+    paths = []
+    if discover_servers and (open_ports.get(IPMI_PORT) or open_ports.get(HTTPS_PORT)):
+        paths.append('redfish')
+    if discover_switches and open_ports.get(SSH_PORT):
+        paths.append('ssh')
+    return paths
+
+
+def thread_starmap(func, argument_tuples, max_workers=DEFAULT_MAX_IN_FLIGHT):
+    """pool.starmap on threads: one worker per task up to max_workers, results in input order
+
+    Discovery is network I/O, so threads do the same job as a process pool
+    without the spawn cost, and results (node and switch objects) stay in
+    this process instead of being pickled back.
+    """
+    argument_tuples = list(argument_tuples)
+    if not argument_tuples:
+        return []
+    with ThreadPoolExecutor(max_workers=max(1, min(int(max_workers), len(argument_tuples)))) as executor:
+        return list(executor.map(lambda arguments: func(*arguments), argument_tuples))
+
+
+def udp_port_open(ipv6_node, port, timeout=PORT_TIMEOUT):
+    """Connect a UDP socket to port, same check the serial IPMI probe does"""
+    try:
+        addrinfo = socket.getaddrinfo(ipv6_node, port, socket.AF_INET6, socket.SOCK_DGRAM)
+        family, socktype, proto, canonname, sockaddr = addrinfo[0]
+        sock = socket.socket(family, socktype, proto)
+        sock.settimeout(timeout)
+        result = sock.connect_ex(sockaddr)
+        sock.close()
+        return result == 0
+    except Exception as e:
+        logger.debug(f"UDP port {port} probe failed on {ipv6_node}: {e}")
+        return False
+
+
+class AsyncDiscoveryEngine(object):
+    """Runs ping, port probes and identification for many hosts concurrently
+
+    identify_server(host, username, password) and identify_switch(host, username, password)
+    must return a result dict or None. They are blocking, so they run on a thread pool
+    bounded by max_in_flight; the same limit caps how many hosts are in progress.
+    An optional IdentityCache short-circuits credential walks for known devices:
+    verify_server/verify_switch(host, username, password) check that the cached
+    credential still logs in, so the identification itself can be skipped.
+    """
+
+    def __init__(self, identify_server, identify_switch, max_in_flight=DEFAULT_MAX_IN_FLIGHT,
+                 host_timeout=DEFAULT_HOST_TIMEOUT, identity_cache=None, verify_server=None, verify_switch=None):
+        self.identify_server = identify_server
+        self.identify_switch = identify_switch
+        self.identity_cache = identity_cache
+        self.verify = {'server': verify_server, 'switch': verify_switch}
+        self.max_in_flight = max(1, int(max_in_flight))
+        self.host_timeout = host_timeout
+        self._semaphore = None
+        self._executor = None
+        self._single_pass = True
+
+    def discover(self, addresses, server_credentials, switch_credentials,
+                 discover_servers=True, discover_switches=True, single_pass=True):
+        """Discover all addresses and return (servers, switches) in input order
+
+        With single_pass each address is pinged once, 623/443/22 are probed together and
+        the address is identified as a server or a switch, never both.
+        """
+        return asyncio.run(self._discover(addresses, server_credentials, switch_credentials,
+                                          discover_servers, discover_switches, single_pass))
+
+    async def _discover(self, addresses, server_credentials, switch_credentials,
+                        discover_servers, discover_switches, single_pass):
+        self._single_pass = single_pass
+        self._semaphore = asyncio.Semaphore(self.max_in_flight)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_in_flight)
+        try:
+            tasks = [self._discover_host(address, server_credentials, switch_credentials,
+                                         discover_servers, discover_switches)
+                     for address in addresses]
+            results = await asyncio.gather(*tasks)
+        finally:
+            self._executor.shutdown(wait=False)
+
+        servers = [server for server, switch in results if server]
+        switches = [switch for server, switch in results if switch]
+        logger.debug(f"Async discovery finished: {len(servers)} servers, {len(switches)} switches")
+        return servers, switches
+
+    async def _discover_host(self, address, server_credentials, switch_credentials,
+                             discover_servers, discover_switches):
+        async with self._semaphore:
+            try:
+                return await asyncio.wait_for(
+                    self._probe_host(address, server_credentials, switch_credentials,
+                                     discover_servers, discover_switches),
+                    timeout=self.host_timeout)
+            except asyncio.TimeoutError:
+                logger.debug(f"Discovery of {address} timed out after {self.host_timeout}s", extra={'host': address})
+            except Exception as e:
+                logger.debug(f"Exception during async discovery of {address}: {e}", extra={'host': address})
+            return None, None
+
+    async def _probe_host(self, address, server_credentials, switch_credentials,
+                          discover_servers, discover_switches):
+        with run_trace.span('ping', address) as span:
+            alive = await self.ping(address)
+            if not alive:
+                span['status'] = 'failed'
+        if not alive:
+            logger.debug(f"Device {address} not responding to ping, skipping", extra={'host': address})
+            return None, None
+
+        if self._single_pass:
+            return await self._classify_host(address, server_credentials, switch_credentials,
+                                             discover_servers, discover_switches)
+
+        server_task = self._server_path(address, server_credentials) if discover_servers else _none()
+        switch_task = self._switch_path(address, switch_credentials) if discover_switches else _none()
+        server, switch = await asyncio.gather(server_task, switch_task)
+        return server, switch
+
+    async def _classify_host(self, address, server_credentials, switch_credentials,
+                             discover_servers, discover_switches):
+        with run_trace.span('probe', address):
+            ipmi, https, ssh = await asyncio.gather(self.udp_port_open(address, IPMI_PORT),
+                                                    self.tcp_port_open(address, HTTPS_PORT),
+                                                    self.tcp_port_open(address, SSH_PORT))
+        open_ports = {IPMI_PORT: ipmi, HTTPS_PORT: https, SSH_PORT: ssh}
+        logger.debug(f"Open ports on {address}: {[port for port, is_open in open_ports.items() if is_open]}",
+                     extra={'host': address})
+
+        for path in classify_ports(open_ports, discover_servers, discover_switches):
+            if path == 'redfish':
+                server = await self._try_credentials(self.identify_server, address, server_credentials, 'server')
+                if server:
+                    return server, None
+            else:
+                switch = await self._try_credentials(self.identify_switch, address, switch_credentials, 'switch')
+                if switch:
+                    return None, switch
+        return None, None
+
+    async def _server_path(self, address, credentials):
+        if not await self.udp_port_open(address, IPMI_PORT):
+            logger.debug(f"IPMI port not accessible on {address}, skipping", extra={'host': address})
+            return None
+        return await self._try_credentials(self.identify_server, address, credentials, 'server')
+
+    async def _switch_path(self, address, credentials):
+        if not await self.tcp_port_open(address, SSH_PORT):
+            logger.debug(f"SSH port not accessible on {address}, skipping", extra={'host': address})
+            return None
+        return await self._try_credentials(self.identify_switch, address, credentials, 'switch')
+
+    async def _try_credentials(self, identify, address, credentials, device_class):
+        # Credentials are tried in order and stop at the first success, as in the serial path
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(
+            walk_credentials, identify, address, credentials, device_class, self.identity_cache,
+            verify=self.verify[device_class]))
+
+    async def ping(self, address):
+        """Single ping6 without blocking the event loop"""
+        try:
+            proc = await asyncio.create_subprocess_exec(
+                'ping6', '-c', '1', '-W', '1', address,
+                stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.DEVNULL)
+        except Exception as e:
+            logger.debug(f"Ping test failed for {address}: {e}", extra={'host': address})
+            return False
+        try:
+            return await asyncio.wait_for(proc.wait(), timeout=PING_TIMEOUT) == 0
+        except asyncio.TimeoutError:
+            proc.kill()
+            return False
+
+    async def tcp_port_open(self, address, port):
+        """TCP connect check that yields while waiting for the handshake"""
+        try:
+            addrinfo = await asyncio.get_running_loop().getaddrinfo(
+                address, port, family=socket.AF_INET6, type=socket.SOCK_STREAM)
+            sockaddr = addrinfo[0][4]
+            reader, writer = await asyncio.wait_for(_open_scoped(sockaddr), timeout=PORT_TIMEOUT)
+            writer.close()
+            return True
+        except Exception as e:
+            logger.debug(f"TCP port {port} probe failed on {address}: {e}", extra={'host': address})
+            return False
+
+    async def udp_port_open(self, address, port):
+        """UDP connect check; cheap enough to run on the pool"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, udp_port_open, address, port)
+
+
+async def _none():
+    return None
+
+
+async def _open_scoped(sockaddr):
+    # open_connection(host, port) drops the link-local scope id, so hand it a connected socket
+    sock = socket.socket(socket.AF_INET6, socket.SOCK_STREAM)
+    sock.setblocking(False)
+    try:
+        await asyncio.get_running_loop().sock_connect(sock, sockaddr)
+    except Exception:
+        sock.close()
+        raise
+    return await asyncio.open_connection(sock=sock)
@@ -22,6 +22,7 @@ import minios
 import cisconexus
 import networkconfig
 import helper
+import readiness
 from prettytable import PrettyTable
 import copy
 
@@ -29,6 +30,9 @@ import loginit
 import logging
 logger = logging.getLogger("root")
 
+# Longest a G2 BMC may take to come back from an IPMI cold reset
+BMC_RESET_TIMEOUT = 330
+
 def danceLEDs(orderednodes, dance = True):
     while True:
         if dance:
@@ -42,6 +46,17 @@ def danceLEDs(orderednodes, dance = True):
         if not dance:
             break
 
+def resetG2BMCs(nodes):
+    """IPMI cold reset the BMC of every G2 node, then wait until they all serve Redfish again"""
+    print("Detected G2 node. Performing BMC IPMI COLD RESET. Please allow up to 5 minutes to complete.")
+    g2nodes = [node for node in nodes if node.gen == 2]
+    for node in g2nodes:
+        node.resetBMC()
+    waits = readiness.wait_all(lambda node: readiness.wait_for_bmc_reset(node.host, BMC_RESET_TIMEOUT), g2nodes)
+    for node, ready in waits:
+        if not ready:
+            logger.info(node.host + " BMC did not come back within " + str(BMC_RESET_TIMEOUT) + " seconds")
+
 def main():
 
 
@@ -75,9 +90,13 @@ def main():
         logger.info("I discovered the following switches:")
         for switch in switches:
             logger.info(switch.name + ' ' + switch.host)
-        UCPCINet = networkconfig.networkstack(racknum, switches, networkconfigjson)
-        UCPCINet.detectOrder()
-        if UCPCINet.design is None:
+        try:
+            UCPCINet = networkconfig.networkstack(racknum, switches, networkconfigjson)
+            UCPCINet.detectOrder()
+        except networkconfig.DesignNotFound as e:
+            logger.info(str(e))
+            UCPCINet = None
+        if UCPCINet is None or UCPCINet.design is None:
             input("I wasn't able to detect the design of this rack. Please hit enter to try again.")
         else:
             break
@@ -212,11 +231,7 @@ def main():
             break
 
     if contain_G2:
-        print("Detected G2 node. Performing BMC IPMI COLD RESET. Please allow 5 minutes to complete.")
-        for node in nodes:
-            if node.gen == 2:
-                node.resetBMC()
-        time.sleep(330)
+        resetG2BMCs(nodes)
 
     # Make sure Redfish BIOS config is populated
     helper.redfishValidate(nodes)
@@ -282,11 +297,7 @@ def main():
         if 'n' in response:
             helper.removeAllVMCLI()
             if contain_G2:
-                print("Detected G2 node. Performing BMC IPMI COLD RESET. Please allow 5 minutes to complete.")
-                for node in nodes:
-                    if node.gen == 2:
-                        node.resetBMC()
-                time.sleep(330)
+                resetG2BMCs(nodes)
             logger.info('\nExiting... :D\n\n')
             exit(0)
     else:
@@ -408,11 +419,7 @@ def main():
     logger.info("I have outputted the Node, MAC and WWN tables to the connectiontable.txt within the scripts folder. Enjoy!")
 
     if contain_G2:
-        print("Detected G2 node. Performing BMC IPMI COLD RESET. Please allow 5 minutes to complete.")
-        for node in nodes:
-            if node.gen == 2:
-                node.resetBMC()
-        time.sleep(330)
+        resetG2BMCs(nodes)
 
     badtime.okay()
 
@@ -0,0 +1,185 @@
+# Copyright: (c) 2025, Ansible Module
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+"""Result set of the previous discovery run, for incremental re-runs.
+
+During rack bring-up discovery is re-run after every recabling step, and
+most devices have not changed since the last run. With the previous result
+set on disk a re-run only has to:
+
+- fully probe addresses that are new, or whose address changed (same MAC
+  seen on another interface or with another link-local address)
+- check that every other known device still answers on the port it was
+  identified through (443 for servers, 22 for switches) and reuse its result
+- report what was added, removed and left unchanged
+
+Devices are keyed by the MAC embedded in the link-local address, like the
+identity cache. As there, credentials are stored by index into the
+credential list, never the password itself.
+"""
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+import json
+import logging
+import os
+import socket
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    from ansible.module_utils.identity_cache import cache_key
+except ImportError:
+    from identity_cache import cache_key
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STATE_PATH = '/tmp/ansible_toolkit/discovery_state.json'
+LIVENESS_TIMEOUT = 2
+LIVENESS_WORKERS = 64
+
+# Port a known device is re-validated on, by device class
+LIVENESS_PORTS = {'server': 443, 'switch': 22}
+# A re-probed device whose identity differs in any of these counts as removed and added
+IDENTITY_FIELDS = ('type', 'model', 'sku', 'serial_number')
+
+
+def tcp_alive(address, port, timeout=LIVENESS_TIMEOUT):
+    """Cheap liveness check: does a TCP connect to port succeed"""
+    try:
+        addrinfo = socket.getaddrinfo(address, port, socket.AF_INET6, socket.SOCK_STREAM)
+        family, socktype, proto, canonname, sockaddr = addrinfo[0]
+        with socket.socket(family, socktype, proto) as sock:
+            sock.settimeout(timeout)
+            return sock.connect_ex(sockaddr) == 0
+    except (OSError, IndexError):
+        return False
+
+
+def _public(result):
+    return dict((k, v) for k, v in result.items() if k != 'password')
+
+
+class DiscoveryState(object):
+    """Devices found by the last run, backed by a JSON file
+
+    credentials maps device class -> list of (username, password), the same
+    lists discovery walks, so stored credential indexes can be resolved.
+    """
+
+    def __init__(self, credentials, path=DEFAULT_STATE_PATH):
+        self.path = path
+        self.credentials = credentials
+        self.devices = self._read()
+
+    def _read(self):
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+            devices = data.get('devices', {}) if isinstance(data, dict) else {}
+            return devices if isinstance(devices, dict) else {}
+        except (IOError, OSError, ValueError):
+            return {}
+
+    def _result(self, device):
+        """Stored result with its password resolved again, or None if the credential list changed"""
+        credentials = self.credentials.get(device.get('device_class'), [])
+        index = device.get('credential_index')
+        result = dict(device.get('result', {}))
+        if index is None or not 0 <= index < len(credentials) or credentials[index][0] != result.get('username'):
+            return None
+        result['password'] = credentials[index][1]
+        return result
+
+    def plan(self, addresses, device_classes=('server', 'switch')):
+        """Split addresses into (known, to_probe)
+
+        known is [(address, device_class, result)] for devices found last time
+        at exactly this address; everything else needs a full probe.
+        """
+        known = []
+        to_probe = []
+        for address in addresses:
+            device = self.devices.get(cache_key(address))
+            result = None
+            if device is not None and device.get('device_class') in device_classes \
+                    and device.get('result', {}).get('host') == address:
+                result = self._result(device)
+            if result is None:
+                to_probe.append(address)
+            else:
+                known.append((address, device['device_class'], result))
+        return known, to_probe
+
+    def revalidate(self, known, max_workers=LIVENESS_WORKERS):
+        """Liveness-check known devices; returns (alive, to_probe)
+
+        alive is [(device_class, result)]; devices that did not answer go back
+        to a full probe, since the address may now belong to something else.
+        """
+        if not known:
+            return [], []
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(known)))) as executor:
+            answers = list(executor.map(
+                lambda item: tcp_alive(item[0], LIVENESS_PORTS.get(item[1], 443)), known))
+        alive = [(device_class, result) for (address, device_class, result), ok in zip(known, answers) if ok]
+        to_probe = [address for (address, device_class, result), ok in zip(known, answers) if not ok]
+        logger.debug(f"Revalidated {len(known)} known devices, {len(to_probe)} need a full probe")
+        return alive, to_probe
+
+    def update(self, found, device_classes=('server', 'switch'), scope=None):
+        """Replace the stored devices with found = [(device_class, result)]; returns the delta
+
+        Only devices of device_classes can be removed, and with scope (the
+        addresses that were looked at) only devices at one of those addresses.
+        The delta is {'added': [...], 'removed': [...], 'unchanged': [...]}
+        with passwords left out.
+        """
+        scope_keys = None if scope is None else set(cache_key(address) for address in scope)
+        delta = {'added': [], 'removed': [], 'unchanged': []}
+        devices = dict(self.devices)
+        seen = set()
+        for device_class, result in found:
+            key = cache_key(result['host'])
+            seen.add(key)
+            previous = self.devices.get(key)
+            credentials = self.credentials.get(device_class, [])
+            credential = (result.get('username'), result.get('password'))
+            devices[key] = {
+                'device_class': device_class,
+                'credential_index': credentials.index(credential) if credential in credentials else None,
+                'result': _public(result),
+                'updated': time.time(),
+            }
+            if previous is None:
+                delta['added'].append(_public(result))
+            elif previous.get('device_class') != device_class or any(
+                    previous.get('result', {}).get(field) != result.get(field) for field in IDENTITY_FIELDS):
+                delta['removed'].append(previous.get('result', {}))
+                delta['added'].append(_public(result))
+            else:
+                delta['unchanged'].append(_public(result))
+
+        for key, previous in self.devices.items():
+            if key in seen or previous.get('device_class') not in device_classes:
+                continue
+            if scope_keys is not None and key not in scope_keys:
+                continue
+            delta['removed'].append(previous.get('result', {}))
+            devices.pop(key)
+
+        self.devices = devices
+        return delta
+
+    def save(self):
+        directory = os.path.dirname(self.path)
+        try:
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump({'updated': time.time(), 'devices': self.devices}, f, indent=2, sort_keys=True)
+            os.replace(tmp_path, self.path)
+        except (IOError, OSError) as e:
+            logger.debug(f"Could not write discovery state {self.path}: {e}")
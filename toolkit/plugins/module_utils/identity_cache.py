@@ -0,0 +1,310 @@
+# Copyright: (c) 2025, Ansible Module
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+"""On-disk cache of discovered device identities.
+
+Entries are keyed by the MAC embedded in the EUI-64 link-local address, so a
+device keeps its entry when it is re-discovered on another interface/scope.
+Each entry remembers which credential worked last, the device class and the
+SKU/model/serial read from Redfish (or the switch model read over SSH).
+
+Credentials are walked in a learned order: the one that last worked on this
+device, then the ones that most recently worked anywhere else in the rack,
+then the rest. Walks stop at the first success and pause between failed
+logins on the same BMC so they stay clear of the lockout counters. A fresh
+entry still logs in with its credential, but skips the SKU fetch.
+
+The file is shared by every discovery entry point, including the multiprocessing
+workers in autodiscover, so save() merges with what is on disk under a lock and
+replaces the file atomically.
+"""
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+import json
+import logging
+import os
+import threading
+import time
+
+try:
+    import fcntl
+    HAS_FCNTL = True
+except ImportError:
+    HAS_FCNTL = False
+
+try:
+    from ansible.module_utils import run_trace
+except ImportError:
+    import run_trace
+
+logger = logging.getLogger(__name__)
+
+# TOOLKIT_IDENTITY_CACHE moves it, e.g. so benchmark runs do not mix with the real rack's cache
+DEFAULT_CACHE_PATH = os.environ.get('TOOLKIT_IDENTITY_CACHE', '/tmp/ansible_toolkit/identity_cache.json')
+DEFAULT_TTL = 3600
+# Pause before the next login on a BMC after a failed one, doubling per failure
+LOGIN_PACE = 1.0
+MAX_LOGIN_PACE = 8.0
+
+# Identity fields kept per device; credentials are referenced by index, never stored.
+# Entries without a 'type' (written by the single-host modules) only save the SKU read.
+IDENTITY_FIELDS = ('type', 'model', 'sku', 'serial_number')
+
+
+def ipv62mac(ipv6):
+    """Derive the MAC from an EUI-64 link-local address (same as lawcompliance.ipv62mac)"""
+    ipv6 = ipv6.split('%')[0].split('/')[0]
+    ipv6Parts = ipv6.split(":")
+    macParts = []
+    for ipv6Part in ipv6Parts[-4:]:
+        while len(ipv6Part) < 4:
+            ipv6Part = "0" + ipv6Part
+        macParts.append(ipv6Part[:2])
+        macParts.append(ipv6Part[-2:])
+
+    # modify parts to match MAC value
+    macParts[0] = "%02x" % (int(macParts[0], 16) ^ 2)
+    del macParts[4]
+    del macParts[3]
+
+    for offset in range(int(len(macParts)/2)):
+        macParts[offset:offset+2] = [''.join(macParts[offset:offset+2])]
+
+    return ".".join(macParts)
+
+
+def cache_key(ipv6):
+    """MAC for EUI-64 addresses, otherwise the address without its zone id"""
+    address = ipv6.strip('[]').split('%')[0].lower()
+    parts = address.split(':')
+    try:
+        if len(parts) >= 4 and parts[-3].endswith('ff') and parts[-2].zfill(4).startswith('fe'):
+            return ipv62mac(address)
+    except ValueError:
+        pass
+    return address
+
+
+class IdentityCache(object):
+    """Identity cache backed by a JSON file
+
+    lookup() only returns entries younger than ttl seconds. Call save() once
+    discovery is done; record()/invalidate() only touch memory until then.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, ttl=DEFAULT_TTL):
+        self.path = path
+        self.ttl = ttl
+        self._dirty = {}
+        self._removed = set()
+        self._lock = threading.Lock()
+        self.entries = self._read()
+
+    def _read(self):
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except (IOError, OSError, ValueError):
+            return {}
+
+    def is_fresh(self, entry):
+        return entry is not None and time.time() - entry.get('updated', 0) < self.ttl
+
+    def lookup(self, ipv6, device_class=None, fresh_only=True):
+        """Return the cached entry for an address, or None"""
+        with self._lock:
+            entry = self.entries.get(cache_key(ipv6))
+        if entry is None:
+            return None
+        if device_class is not None and entry.get('device_class') != device_class:
+            return None
+        if fresh_only and not self.is_fresh(entry):
+            return None
+        return entry
+
+    def rack_order(self, credentials, device_class=None):
+        """Credentials most recently successful anywhere in the rack first, keeping the original indexes
+
+        Credentials that never worked keep their original order at the end.
+        Returns a list of (index, (username, password)).
+        """
+        last_success = {}
+        with self._lock:
+            entries = list(self.entries.values())
+        for entry in entries:
+            if device_class is not None and entry.get('device_class') != device_class:
+                continue
+            index = entry.get('credential_index')
+            if index is None or not 0 <= index < len(credentials) or credentials[index][0] != entry.get('username'):
+                continue
+            last_success[index] = max(last_success.get(index, 0), entry.get('updated', 0))
+        indexed = list(enumerate(credentials))
+        return sorted(indexed, key=lambda item: -last_success.get(item[0], -1))
+
+    def order_credentials(self, ipv6, credentials, device_class=None):
+        """The last working credential for this address first, then rack_order()
+
+        Returns a list of (index, (username, password)).
+        """
+        indexed = self.rack_order(credentials, device_class)
+        entry = self.lookup(ipv6, device_class, fresh_only=False)
+        if entry is None:
+            return indexed
+        index = entry.get('credential_index')
+        if index is None or not 0 <= index < len(credentials) or credentials[index][0] != entry.get('username'):
+            return indexed
+        return [item for item in indexed if item[0] == index] + [item for item in indexed if item[0] != index]
+
+    def cached_result(self, ipv6, credentials, device_class):
+        """Build a discovery result from a fresh entry; the caller confirms its credential still logs in"""
+        entry = self.lookup(ipv6, device_class)
+        if entry is None or 'type' not in entry.get('identity', {}):
+            return None
+        index = entry.get('credential_index')
+        if index is None or not 0 <= index < len(credentials):
+            return None
+        username, password = credentials[index]
+        if username != entry.get('username'):
+            return None
+        result = dict(entry.get('identity', {}))
+        result.update({'host': ipv6, 'username': username, 'password': password, 'ipv4_address': None})
+        return result
+
+    def record(self, ipv6, device_class, credential_index, username, identity):
+        """Remember the credential and identity that worked for an address
+
+        credential_index=None keeps the index already cached for the same username,
+        for callers that only ever try a single credential.
+        """
+        key = cache_key(ipv6)
+        if credential_index is None:
+            previous = self.entries.get(key) or {}
+            if previous.get('username') == username:
+                credential_index = previous.get('credential_index')
+        entry = {
+            'host': ipv6,
+            'device_class': device_class,
+            'credential_index': credential_index,
+            'username': username,
+            'identity': dict((k, v) for k, v in identity.items() if k in IDENTITY_FIELDS),
+            'updated': time.time(),
+        }
+        with self._lock:
+            self.entries[key] = entry
+            self._dirty[key] = entry
+            self._removed.discard(key)
+
+    def invalidate(self, ipv6=None):
+        """Drop one address, or every entry when ipv6 is None"""
+        with self._lock:
+            keys = list(self.entries) if ipv6 is None else [cache_key(ipv6)]
+            for key in keys:
+                self.entries.pop(key, None)
+                self._dirty.pop(key, None)
+                self._removed.add(key)
+
+    def save(self):
+        """Merge pending changes into the file on disk"""
+        with self._lock:
+            if not self._dirty and not self._removed:
+                return
+            dirty, removed = dict(self._dirty), set(self._removed)
+            self._dirty.clear()
+            self._removed.clear()
+
+        directory = os.path.dirname(self.path)
+        try:
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.path + '.lock', 'w') as lock_file:
+                if HAS_FCNTL:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                entries = self._read()
+                for key in removed:
+                    entries.pop(key, None)
+                for key, entry in dirty.items():
+                    if entry.get('updated', 0) >= entries.get(key, {}).get('updated', 0):
+                        entries[key] = entry
+                tmp_path = f"{self.path}.{os.getpid()}.tmp"
+                with open(tmp_path, 'w') as f:
+                    json.dump(entries, f, indent=2, sort_keys=True)
+                os.replace(tmp_path, self.path)
+            with self._lock:
+                merged = dict(entries)
+                merged.update(self._dirty)
+                self.entries = merged
+        except (IOError, OSError) as e:
+            logger.debug(f"Could not write identity cache {self.path}: {e}")
+
+
+def pick_credentials(cache, ipv6, credentials, device_class):
+    """(index, credential) pairs worth trying for an address
+
+    Used where every credential is tried in parallel: a fresh entry narrows the
+    list to the credential that worked last, otherwise everything is tried.
+    """
+    if cache is None:
+        return list(enumerate(credentials))
+    ordered = cache.order_credentials(ipv6, credentials, device_class)
+    entry = cache.lookup(ipv6, device_class)
+    if entry is not None and ordered and ordered[0][0] == entry.get('credential_index'):
+        return ordered[:1]
+    return ordered
+
+
+def login_pause(failures, pace=LOGIN_PACE, max_pause=MAX_LOGIN_PACE):
+    """Seconds to wait before the next login on a BMC that has seen failures failed logins"""
+    if failures <= 0 or not pace:
+        return 0
+    return min(pace * 2 ** (failures - 1), max_pause)
+
+
+def _attempt(identify, ipv6, username, password, device_class):
+    """One identify() call, traced as a 'login' on the device, whose logging is tagged with it"""
+    with run_trace.host(ipv6), run_trace.span('login', ipv6, device_class=device_class) as span:
+        result = identify(ipv6, username, password)
+        if not result:
+            span['status'] = 'failed'
+        return result
+
+
+def walk_credentials(identify, ipv6, credentials, device_class, cache=None, pace=0, verify=None):
+    """Try credentials until identify() succeeds, using and updating the cache
+
+    With a fresh cache entry the cached credential is checked with
+    verify(ipv6, username, password), a login without the SKU fetch, and the
+    cached identity is returned if it still works. Without verify, or once
+    the cached credential fails, the last working credential is tried first
+    with identify(), then the rack order. With pace, failed logins are spaced
+    out per login_pause().
+    """
+    if cache is None:
+        for failures, (username, password) in enumerate(credentials):
+            time.sleep(login_pause(failures, pace))
+            result = _attempt(identify, ipv6, username, password, device_class)
+            if result:
+                return result
+        return None
+
+    ordered = cache.order_credentials(ipv6, credentials, device_class)
+    failed = 0
+    result = cache.cached_result(ipv6, credentials, device_class) if verify is not None else None
+    if result:
+        if _attempt(verify, ipv6, result['username'], result['password'], device_class):
+            logger.debug(f"Identity cache hit for {ipv6}: {result.get('type')}")
+            return result
+        # The cached credential leads the order; it just failed, so the walk starts after it
+        logger.debug(f"Cached credential for {ipv6} no longer logs in")
+        ordered = ordered[1:]
+        failed = 1
+
+    for failures, (index, (username, password)) in enumerate(ordered, failed):
+        time.sleep(login_pause(failures, pace))
+        result = _attempt(identify, ipv6, username, password, device_class)
+        if result:
+            cache.record(ipv6, device_class, index, username, result)
+            return result
+    return None
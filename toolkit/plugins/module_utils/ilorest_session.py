@@ -0,0 +1,40 @@
+# Copyright: (c) 2025, Ansible Module
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+"""Per-server ilorest cache directories.
+
+`ilorest login <ip>` stores the session in ilorest's cache directory and every
+later bare `ilorest <cmd>` talks to whichever server that cache points at. With
+one shared cache, two servers driven at once overwrite each other's login.
+Passing each server its own --cache-dir keeps the sessions apart, which is
+what makes max_parallel > 1 safe.
+"""
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+import os
+import re
+import shlex
+import tempfile
+
+ILOREST_CACHE_ROOT = os.path.join(tempfile.gettempdir(), 'ansible_toolkit', 'ilorest')
+
+
+def cache_dir(ipaddress, root=ILOREST_CACHE_ROOT):
+    """Create and return the ilorest cache directory for one server"""
+    # Keep IPv6 brackets/colons/zone ids out of the path
+    name = re.sub(r'[^A-Za-z0-9._-]', '_', ipaddress.strip().strip('[]'))
+    path = os.path.join(root, name)
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    return path
+
+
+def ilorest_cmd(ilorest_path, ipaddress, *args):
+    """Argument list for an ilorest command bound to the server's own cache"""
+    return [ilorest_path, f'--cache-dir={cache_dir(ipaddress)}'] + list(args)
+
+
+def ilorest_shell(ilorest_path, ipaddress, args):
+    """Same as ilorest_cmd for callers that build shell command strings"""
+    return f'{shlex.quote(ilorest_path)} --cache-dir={shlex.quote(cache_dir(ipaddress))} {args}'
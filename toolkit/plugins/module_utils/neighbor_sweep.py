@@ -0,0 +1,207 @@
+# Copyright: (c) 2025, Ansible Module
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+"""IPv6 link-local neighbor sweep without ping6.
+
+sweep() sends ICMPv6 echo requests to ff02::1 on every interface at once,
+one socket per interface, and collects the echo replies for a fixed window
+so slow BMCs that answer after ping6 has already exited are still counted.
+Replies are deduplicated per interface and merged with the kernel neighbor
+table (`ip -6 neigh`), which also holds devices that answered an earlier
+sweep or only speak NDP.
+
+An unprivileged ICMPv6 "ping" socket is used where the kernel allows it
+(net.ipv4.ping_group_range), else a raw socket. If neither can be opened
+the interface falls back to running ping6 as before.
+
+Nothing here needs real hardware: a veth pair with one end in a network
+namespace is enough to exercise it.
+"""
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+import logging
+import os
+import random
+import re
+import selectors
+import socket
+import struct
+import subprocess
+import time
+
+logger = logging.getLogger(__name__)
+
+ALL_NODES = 'ff02::1'
+DEFAULT_WINDOW = 3.0
+DEFAULT_COUNT = 2
+SEND_INTERVAL = 0.5
+
+ICMPV6_ECHO_REQUEST = 128
+ICMPV6_ECHO_REPLY = 129
+
+# Neighbor states that do not mean the device is (or recently was) there
+DEAD_NEIGHBOR_STATES = ('FAILED', 'INCOMPLETE')
+
+
+def up_interfaces():
+    """Non-loopback interfaces whose operstate is up"""
+    interfaces = []
+    for iface in sorted(os.listdir('/sys/class/net')):
+        if iface == 'lo':
+            continue
+        try:
+            with open(f'/sys/class/net/{iface}/operstate') as f:
+                if f.read().strip() == 'up':
+                    interfaces.append(iface)
+        except OSError:
+            continue
+    return interfaces
+
+
+def _open_socket(nic):
+    """ICMPv6 socket bound to nic; returns (sock, raw) or (None, None)"""
+    ifindex = socket.if_nametoindex(nic)
+    for socktype, raw in ((socket.SOCK_DGRAM, False), (socket.SOCK_RAW, True)):
+        try:
+            sock = socket.socket(socket.AF_INET6, socktype, socket.IPPROTO_ICMPV6)
+        except OSError:
+            continue
+        try:
+            sock.setsockopt(socket.IPPROTO_IPV6, socket.IPV6_MULTICAST_IF, ifindex)
+            try:
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_BINDTODEVICE, nic.encode())
+            except (OSError, AttributeError):
+                pass  # replies are filtered on the scope id below as well
+            sock.setblocking(False)
+            return sock, raw
+        except OSError:
+            sock.close()
+    return None, None
+
+
+def _echo_request(ident, seq):
+    # Checksum 0: the kernel fills in the ICMPv6 checksum for both socket types
+    return struct.pack('!BBHHH', ICMPV6_ECHO_REQUEST, 0, 0, ident, seq) + b'toolkit-sweep'
+
+
+def _ping6(nic, count):
+    """Old behaviour for interfaces where no ICMPv6 socket could be opened"""
+    found = []
+    try:
+        result = subprocess.run(['ping6', '-c', str(count), f'{ALL_NODES}%{nic}'],
+                                capture_output=True, text=True, timeout=10 + count)
+    except (OSError, subprocess.TimeoutExpired) as e:
+        logger.debug(f"ping6 on {nic} failed: {e}")
+        return found
+    for line in result.stdout.splitlines():
+        if line.startswith('64 bytes from fe80:'):
+            found.append(line.split()[3].rstrip(':').split('%')[0])
+    return found
+
+
+def echo_sweep(nics, window=DEFAULT_WINDOW, count=DEFAULT_COUNT):
+    """Ping ff02::1 on all nics at once; returns {nic: [link-local address, ...]} in reply order"""
+    found = dict((nic, []) for nic in nics)
+    selector = selectors.DefaultSelector()
+    sockets = []
+    ident = random.randint(0, 0xffff)
+    try:
+        for nic in nics:
+            try:
+                sock, raw = _open_socket(nic)
+            except OSError as e:
+                logger.debug(f"Cannot sweep {nic}: {e}")
+                continue
+            if sock is None:
+                logger.debug(f"No ICMPv6 socket available on {nic}, using ping6")
+                found[nic] = list(dict.fromkeys(_ping6(nic, count)))
+                continue
+            sockets.append(sock)
+            selector.register(sock, selectors.EVENT_READ, (nic, socket.if_nametoindex(nic), raw))
+
+        started = time.monotonic()
+        deadline = started + window
+        sent = 0
+        while sockets:
+            now = time.monotonic()
+            if sent < count and now >= started + sent * SEND_INTERVAL:
+                for key in selector.get_map().values():
+                    nic, ifindex, raw = key.data
+                    try:
+                        key.fileobj.sendto(_echo_request(ident, sent), (ALL_NODES, 0, 0, ifindex))
+                    except OSError as e:
+                        logger.debug(f"Echo request on {nic} failed: {e}")
+                sent += 1
+            if now >= deadline:
+                break
+            wait = deadline - now
+            if sent < count:
+                wait = min(wait, started + sent * SEND_INTERVAL - now)
+            for key, mask in selector.select(max(wait, 0)):
+                nic, ifindex, raw = key.data
+                try:
+                    while True:
+                        packet, address = key.fileobj.recvfrom(1500)
+                        if len(packet) < 8 or packet[0] != ICMPV6_ECHO_REPLY:
+                            continue
+                        # Ping sockets only deliver our own replies; raw sockets see everybody's
+                        if raw and struct.unpack('!H', packet[4:6])[0] != ident:
+                            continue
+                        if address[3] and address[3] != ifindex:
+                            continue
+                        host = address[0].split('%')[0]
+                        if host not in found[nic]:
+                            found[nic].append(host)
+                except (BlockingIOError, InterruptedError):
+                    pass
+                except OSError as e:
+                    logger.debug(f"Receive on {nic} failed: {e}")
+    finally:
+        for sock in sockets:
+            selector.unregister(sock)
+            sock.close()
+        selector.close()
+    return found
+
+
+def neighbor_table(nics=None):
+    """Link-local entries of the kernel IPv6 neighbor table: {nic: [address, ...]}"""
+    table = {}
+    try:
+        output = subprocess.run(['ip', '-6', 'neigh', 'show'], capture_output=True, text=True,
+                                timeout=10).stdout
+    except (OSError, subprocess.TimeoutExpired) as e:
+        logger.debug(f"Cannot read neighbor table: {e}")
+        return table
+    for line in output.splitlines():
+        match = re.match(r'(fe80:\S+) dev (\S+)', line)
+        if not match or line.split()[-1] in DEAD_NEIGHBOR_STATES:
+            continue
+        address, nic = match.groups()
+        if nics is None or nic in nics:
+            table.setdefault(nic, [])
+            if address not in table[nic]:
+                table[nic].append(address)
+    return table
+
+
+def sweep(nics=None, window=DEFAULT_WINDOW, count=DEFAULT_COUNT, include_neighbors=True):
+    """Link-local devices on nics (all up interfaces by default) as 'fe80::...%nic', without duplicates
+
+    Echo replies come first in the order they arrived, then neighbor
+    table entries that did not answer.
+    """
+    if nics is None:
+        nics = up_interfaces()
+    nics = list(nics)
+    found = echo_sweep(nics, window, count)
+    if include_neighbors:
+        for nic, addresses in neighbor_table(nics).items():
+            found[nic] += [address for address in addresses if address not in found[nic]]
+    devices = []
+    for nic in nics:
+        devices += [f'{address}%{nic}' for address in found[nic]]
+    logger.debug(f"Neighbor sweep on {nics}: {len(devices)} devices")
+    return devices
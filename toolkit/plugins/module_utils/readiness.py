@@ -0,0 +1,220 @@
+# Copyright: (c) 2025, Ansible Module
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+"""Wait for servers and BMCs to reach a state instead of sleeping a fixed time.
+
+Every wait polls with exponential backoff and returns as soon as the target
+state is seen, or gives up at a deadline. Inside run_per_server the deadline
+is also capped by the server's own timeout.
+
+- wait_for_boot: a reset server has gone back through POST
+  (PowerState plus Oem.Hpe.PostState, or BootProgress.LastState)
+- wait_for_reset: a running server goes down again (an installer or
+  SPP finishing and rebooting)
+- wait_for_power_state: PowerState reaches On/Off
+- wait_for_bmc_reset: a BMC that was cold reset dropped off and its
+  Redfish service answers again
+- wait_for_bios_pending: BIOS settings are staged in Bios/Settings
+- settle_bios_load: wait_for_bios_pending after an ilorest load, falling
+  back to a fixed delay when Redfish or the template cannot be read
+"""
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+import logging
+import socket
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    from ansible.module_utils import run_trace
+    from ansible.module_utils.redfish_actions import bios_attributes_from_template
+    from ansible.module_utils.redfish_client import RedfishClient, RedfishError
+    from ansible.module_utils.server_executor import remaining_time, server_name
+except ImportError:
+    import run_trace
+    from redfish_actions import bios_attributes_from_template
+    from redfish_client import RedfishClient, RedfishError
+    from server_executor import remaining_time, server_name
+
+logger = logging.getLogger(__name__)
+
+INITIAL_INTERVAL = 2
+MAX_INTERVAL = 30
+BACKOFF_FACTOR = 2
+PROBE_TIMEOUT = 3
+
+SYSTEM_URL = '/redfish/v1/Systems/1'
+
+# Oem.Hpe.PostState values (iLO) and BootProgress.LastState values (standard) that mean POST is done
+READY_POST_STATES = ('InPostDiscoveryComplete', 'FinishedPost')
+READY_BOOT_PROGRESS = ('SystemHardwareInitializationComplete', 'SetupEntered', 'OSBootStarted', 'OSRunning')
+# A reset that is never seen leaving the ready state is trusted after this long
+RESET_SETTLE = 60
+# How long a cold reset BMC may take to drop off the network
+BMC_DOWN_TIMEOUT = 90
+# How long iLO may take to show a loaded BIOS template in Bios/Settings
+BIOS_PENDING_TIMEOUT = 60
+# Fixed wait after an ilorest load when Bios/Settings cannot be checked
+BIOS_LOAD_DELAY = 5
+
+
+def poll(check, timeout, initial=INITIAL_INTERVAL, max_interval=MAX_INTERVAL, factor=BACKOFF_FACTOR):
+    """Call check() until it returns something truthy; returns that value, or None at the deadline
+
+    Exceptions from check() count as "not yet": BMCs drop requests while resetting.
+    """
+    remaining = remaining_time()
+    if remaining is not None:
+        timeout = min(timeout, remaining)
+    deadline = time.monotonic() + timeout
+    interval = initial
+    while True:
+        try:
+            value = check()
+            if value:
+                return value
+        except Exception as e:
+            logger.debug(f"Readiness check failed, retrying: {e}")
+        left = deadline - time.monotonic()
+        if left <= 0:
+            return None
+        time.sleep(min(interval, left))
+        interval = min(interval * factor, max_interval)
+
+
+def wait_all(wait, items):
+    """Run wait(item) for all items at the same time; returns [(item, result)] in order"""
+    def call(item):
+        with run_trace.host(server_name(item)):
+            return wait(item)
+
+    items = list(items)
+    if not items:
+        return []
+    with ThreadPoolExecutor(max_workers=len(items)) as executor:
+        return list(zip(items, executor.map(call, items)))
+
+
+def bmc_reachable(host, port=443, timeout=PROBE_TIMEOUT):
+    """TCP connect to the BMC's HTTPS port"""
+    address = host.strip().strip('[]')
+    try:
+        family = socket.AF_INET6 if ':' in address else socket.AF_UNSPEC
+        sockaddr = socket.getaddrinfo(address, port, family, socket.SOCK_STREAM)[0]
+        with socket.socket(sockaddr[0], sockaddr[1], sockaddr[2]) as sock:
+            sock.settimeout(timeout)
+            return sock.connect_ex(sockaddr[4]) == 0
+    except (OSError, IndexError):
+        return False
+
+
+def redfish_up(host, timeout=PROBE_TIMEOUT):
+    """The (unauthenticated) Redfish service root answers"""
+    client = RedfishClient(host, None, None, timeout=timeout)
+    response = client.http.get(client.url('/redfish/v1/'), headers=client.headers, timeout=timeout)
+    return response.ok
+
+
+def boot_state(client):
+    """(PowerState, POST state) from Oem.Hpe.PostState, or BootProgress.LastState elsewhere"""
+    response = client.get(SYSTEM_URL)
+    if not response.ok:
+        raise RedfishError(f"Read system state failed: HTTP {response.status_code}")
+    system = response.json()
+    post = system.get('Oem', {}).get('Hpe', {}).get('PostState')
+    if post is None:
+        post = system.get('BootProgress', {}).get('LastState')
+    return system.get('PowerState'), post
+
+
+def is_booted(power, post):
+    return power == 'On' and post in READY_POST_STATES + READY_BOOT_PROGRESS
+
+
+@run_trace.traced('wait_boot')
+def wait_for_boot(client, timeout):
+    """Return the (power, post) state once a server that was just reset has been through POST again
+
+    Raises RedfishError if that has not happened before the deadline.
+    """
+    started = time.monotonic()
+    seen = {'left_ready': False, 'state': None}
+
+    def check():
+        try:
+            seen['state'] = boot_state(client)
+        except Exception:
+            seen['state'] = None
+        if seen['state'] is None or not is_booted(*seen['state']):
+            seen['left_ready'] = True
+            return None
+        if seen['left_ready'] or time.monotonic() - started >= RESET_SETTLE:
+            return seen['state']
+        return None
+
+    state = poll(check, timeout, initial=5)
+    if state is None:
+        raise RedfishError(f"{client.host} did not finish POST within {int(timeout)}s (last state {seen['state']})")
+    return state
+
+
+@run_trace.traced('wait_reset')
+def wait_for_reset(client, timeout):
+    """Return True once a booted server leaves the booted state, False at the deadline"""
+    def check():
+        try:
+            return not is_booted(*boot_state(client))
+        except Exception:
+            return True
+
+    return bool(poll(check, timeout, initial=10, max_interval=60))
+
+
+@run_trace.traced('wait_power_state')
+def wait_for_power_state(client, power_state, timeout):
+    """Return True once PowerState equals power_state, False at the deadline"""
+    return bool(poll(lambda: boot_state(client)[0] == power_state, timeout))
+
+
+@run_trace.traced('wait_bmc_reset')
+def wait_for_bmc_reset(host, timeout, down_timeout=BMC_DOWN_TIMEOUT):
+    """Return True once a BMC that was just reset is back and serving Redfish
+
+    First waits (briefly) for it to drop off, so the check does not pass
+    before the reset has actually started.
+    """
+    started = time.monotonic()
+    poll(lambda: not bmc_reachable(host), min(down_timeout, timeout), initial=1, max_interval=5)
+    left = timeout - (time.monotonic() - started)
+    return bool(left > 0 and poll(lambda: bmc_reachable(host) and redfish_up(host), left))
+
+
+@run_trace.traced('wait_bios_pending')
+def wait_for_bios_pending(client, attributes, timeout):
+    """Return True once every attribute the BIOS knows is staged in Bios/Settings with the requested value"""
+    def check():
+        bios = client.get(f'{SYSTEM_URL}/Bios').json()
+        settings_url = bios.get('@Redfish.Settings', {}).get('SettingsObject', {}).get(
+            '@odata.id', f'{SYSTEM_URL}/Bios/Settings')
+        current = bios.get('Attributes', {})
+        pending = client.get(settings_url).json().get('Attributes', {})
+        return all(pending.get(k, current[k]) == v for k, v in attributes.items() if k in current)
+
+    return bool(poll(check, timeout, initial=1, max_interval=5))
+
+
+def settle_bios_load(connect, template_file, timeout=BIOS_PENDING_TIMEOUT):
+    """Wait for a template loaded by ilorest to show in Bios/Settings; never fails the load
+
+    connect() returns the server's Redfish client. A connect error or a template
+    without BIOS attributes is logged and costs BIOS_LOAD_DELAY instead.
+    """
+    try:
+        attributes = bios_attributes_from_template(template_file)
+        return wait_for_bios_pending(connect(), attributes, timeout)
+    except Exception as e:
+        logger.warning(f"Could not check pending BIOS settings, waiting {BIOS_LOAD_DELAY}s instead: {e}")
+        time.sleep(BIOS_LOAD_DELAY)
+        return False
@@ -0,0 +1,172 @@
+# Copyright: (c) 2025, Ansible Module
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+"""In-process Redfish equivalents of the ilorest commands used by the ucp_* modules.
+
+Selected with backend=redfish. Covers ComputerSystem.Reset (ilorest reboot),
+VirtualMedia insert/eject (ilorest virtualmedia), Bios settings PATCH
+(ilorest load -f <bios template>) and AccountService user creation
+(ilorest iloaccounts add). Everything else still goes through ilorest.
+
+Each call is one or two HTTPS requests over the pooled client instead of
+starting an ilorest process for login, action and logout.
+"""
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+import json
+
+try:
+    from ansible.module_utils.redfish_client import RedfishClient, RedfishError, DEFAULT_TIMEOUT
+    from ansible.module_utils.run_trace import traced
+    from ansible.module_utils.server_executor import remaining_time, ServerTimeout
+except ImportError:
+    from redfish_client import RedfishClient, RedfishError, DEFAULT_TIMEOUT
+    from run_trace import traced
+    from server_executor import remaining_time, ServerTimeout
+
+SYSTEM_URL = '/redfish/v1/Systems/1'
+MANAGER_URL = '/redfish/v1/Managers/1'
+ACCOUNTS_URL = '/redfish/v1/AccountService/Accounts'
+
+# ilorest reboot <arg> -> Redfish ResetType; bare `ilorest reboot` is ForceRestart
+RESET_TYPES = {
+    'on': 'On',
+    'forceoff': 'ForceOff',
+    'force': 'ForceRestart',
+    'forcerestart': 'ForceRestart',
+    'nmi': 'Nmi',
+    'pushpowerbutton': 'PushPowerButton',
+    'press': 'PushPowerButton',
+    'gracefulshutdown': 'GracefulShutdown',
+    'gracefulrestart': 'GracefulRestart',
+}
+
+
+def connect(ipaddress, username, password):
+    """Client for one server, bounded by the server's run_per_server deadline"""
+    timeout = DEFAULT_TIMEOUT
+    remaining = remaining_time()
+    if remaining is not None:
+        if remaining <= 0:
+            raise ServerTimeout("Timed out before connecting")
+        timeout = min(timeout, remaining)
+    return RedfishClient(ipaddress, username, password, timeout=timeout)
+
+
+def _check(response, action):
+    if not response.ok:
+        try:
+            info = response.json().get('error', {}).get('@Message.ExtendedInfo', [])
+            detail = ', '.join(i.get('MessageId', '') for i in info) or response.text
+        except ValueError:
+            detail = response.text
+        raise RedfishError(f"{action} failed: HTTP {response.status_code} {detail}")
+    return response
+
+
+def _get(client, url, action):
+    return _check(client.get(url), action).json()
+
+
+@traced('redfish_reset')
+def reset_system(client, reset_type='ForceRestart'):
+    """POST ComputerSystem.Reset; accepts ilorest reboot names or Redfish ResetType values"""
+    reset_type = RESET_TYPES.get(reset_type.lower(), reset_type)
+    _check(client.post(f'{SYSTEM_URL}/Actions/ComputerSystem.Reset', {'ResetType': reset_type}),
+           f"Reset {reset_type}")
+
+
+def power_state(client):
+    return _get(client, SYSTEM_URL, "Read power state").get('PowerState')
+
+
+def _media_action(media, standard, oem):
+    actions = media.get('Actions', {})
+    target = actions.get(standard, {}).get('target')
+    if target:
+        return target, False
+    target = actions.get('Oem', {}).get('Hpe', {}).get(oem, {}).get('target')
+    if target:
+        return target, True
+    raise RedfishError(f"Virtual media does not support {standard}")
+
+
+@traced('redfish_eject_media')
+def eject_media(client, index=2):
+    """Eject virtual media device <index>; already empty is not an error"""
+    media = _get(client, f'{MANAGER_URL}/VirtualMedia/{index}', "Read virtual media")
+    if not media.get('Inserted') and not media.get('Image'):
+        return
+    target, oem = _media_action(media, '#VirtualMedia.EjectMedia', '#HpeiLOVirtualMedia.EjectVirtualMedia')
+    _check(client.post(target, {}), "Eject virtual media")
+
+
+@traced('redfish_insert_media')
+def insert_media(client, image_url, index=2, boot_next_reset=True):
+    """Insert an ISO on virtual media device <index>, optionally booting from it once"""
+    url = f'{MANAGER_URL}/VirtualMedia/{index}'
+    media = _get(client, url, "Read virtual media")
+    target, oem = _media_action(media, '#VirtualMedia.InsertMedia', '#HpeiLOVirtualMedia.InsertVirtualMedia')
+    body = {'Image': image_url}
+    if not oem:
+        body['Inserted'] = True
+    _check(client.post(target, body), "Insert virtual media")
+    if not boot_next_reset:
+        return
+    if 'Hpe' in media.get('Oem', {}):
+        _check(client.patch(url, {'Oem': {'Hpe': {'BootOnNextServerReset': True}}}), "Set boot on next reset")
+    else:
+        _check(client.patch(SYSTEM_URL, {'Boot': {'BootSourceOverrideTarget': 'Cd',
+                                                  'BootSourceOverrideEnabled': 'Once'}}),
+               "Set one-time CD boot")
+
+
+def bios_attributes_from_template(template_file):
+    """Attributes from an `ilorest save --select Bios.` file (or a plain {"Attributes": ...})"""
+    with open(template_file) as f:
+        data = json.load(f)
+    attributes = {}
+
+    def collect(node):
+        if isinstance(node, list):
+            for item in node:
+                collect(item)
+        elif isinstance(node, dict):
+            if isinstance(node.get('Attributes'), dict):
+                attributes.update(node['Attributes'])
+            else:
+                for value in node.values():
+                    collect(value)
+
+    collect(data)
+    if not attributes:
+        raise RedfishError(f"No BIOS attributes found in {template_file}")
+    return attributes
+
+
+@traced('redfish_bios_patch')
+def patch_bios(client, attributes):
+    """PATCH pending BIOS settings; they apply on the next reboot"""
+    bios = _get(client, f'{SYSTEM_URL}/Bios', "Read BIOS")
+    settings = bios.get('@Redfish.Settings', {}).get('SettingsObject', {}).get('@odata.id',
+                                                                               f'{SYSTEM_URL}/Bios/Settings')
+    current = bios.get('Attributes', {})
+    # Only send what differs, and never attributes this BIOS does not have
+    changes = dict((k, v) for k, v in attributes.items() if k in current and current[k] != v)
+    if changes:
+        _check(client.patch(settings, {'Attributes': changes}), "BIOS settings update")
+    return changes
+
+
+@traced('redfish_create_account')
+def create_account(client, username, password, role='Administrator', login_name=None):
+    """Create an iLO account, like `ilorest iloaccounts add <login_name> <username> <password>`"""
+    body = {
+        'UserName': username,
+        'Password': password,
+        'RoleId': role,
+        'Oem': {'Hpe': {'LoginName': login_name or username}},
+    }
+    _check(client.post(ACCOUNTS_URL, body), f"Create account {username}")
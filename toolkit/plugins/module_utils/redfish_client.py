@@ -0,0 +1,198 @@
+# Copyright: (c) 2025, Ansible Module
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+"""Pooled, keep-alive Redfish client shared by the discovery and HA code.
+
+One requests.Session (and its connection pool) is kept per BMC, so repeated
+calls to the same BMC reuse the TCP/TLS connection instead of handshaking
+again. Session-token (X-Auth-Token) logins are kept per BMC and username and
+reused by every client for that pair until logout() or close_all().
+"""
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+import logging
+import threading
+
+import requests
+import urllib3
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+urllib3.disable_warnings()
+
+logger = logging.getLogger(__name__)
+
+SESSIONS_URL = '/redfish/v1/SessionService/Sessions'
+DEFAULT_TIMEOUT = 10
+DEFAULT_RETRIES = 2
+DEFAULT_BACKOFF = 0.5
+DEFAULT_POOL_SIZE = 4
+
+# Busy BMCs answer 503 while the web server restarts; anything else is returned to the caller
+RETRY_STATUSES = (500, 502, 503, 504)
+
+_registry_lock = threading.Lock()
+_http_sessions = {}
+_auth_tokens = {}
+
+
+class RedfishError(Exception):
+    pass
+
+
+def split_host(host):
+    """Return (base_url, host_header) for an IPv4/IPv6 address or hostname
+
+    Accepts the "[fe80::1]" form written to servers.csv and link-local
+    addresses with a zone id; the zone id is URL encoded as %25.
+    """
+    address = host.strip().strip('[]')
+    if ':' in address:
+        return f"https://[{address.replace('%', '%25')}]", f"[{address.split('%')[0]}]"
+    return f"https://{address}", address
+
+
+def _retry(retries, backoff_factor):
+    kwargs = dict(total=retries, connect=retries, read=retries, status=retries,
+                  backoff_factor=backoff_factor, status_forcelist=RETRY_STATUSES,
+                  raise_on_status=False)
+    # Only idempotent calls are retried; a repeated POST could create two sessions/accounts
+    try:
+        return Retry(allowed_methods=frozenset(['GET', 'HEAD', 'DELETE']), **kwargs)
+    except TypeError:
+        return Retry(method_whitelist=frozenset(['GET', 'HEAD', 'DELETE']), **kwargs)
+
+
+def get_http_session(base_url, retries=DEFAULT_RETRIES, backoff_factor=DEFAULT_BACKOFF,
+                     pool_size=DEFAULT_POOL_SIZE):
+    """Return the keep-alive requests.Session for a BMC, creating it once"""
+    with _registry_lock:
+        session = _http_sessions.get(base_url)
+        if session is None:
+            session = requests.Session()
+            session.verify = False
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size,
+                                  max_retries=_retry(retries, backoff_factor))
+            session.mount('https://', adapter)
+            _http_sessions[base_url] = session
+        return session
+
+
+def close_all():
+    """Log out every cached token and close every pooled connection"""
+    with _registry_lock:
+        tokens = list(_auth_tokens.items())
+        _auth_tokens.clear()
+        sessions = list(_http_sessions.items())
+        _http_sessions.clear()
+    sessions = dict(sessions)
+    for (base_url, username), (token, location) in tokens:
+        session = sessions.get(base_url)
+        if session is not None and location:
+            try:
+                session.delete(location if location.startswith('http') else base_url + location,
+                               headers={'X-Auth-Token': token}, timeout=DEFAULT_TIMEOUT)
+            except requests.RequestException:
+                pass
+    for session in sessions.values():
+        session.close()
+
+
+class RedfishClient(object):
+    """Redfish client for one BMC
+
+    auth='basic' sends credentials with every request, which is what discovery
+    wants when it is still guessing credentials. auth='session' logs in once via
+    SessionService and reuses the X-Auth-Token, re-logging in once on a 401.
+    """
+
+    def __init__(self, host, username, password, auth='basic', timeout=DEFAULT_TIMEOUT,
+                 retries=DEFAULT_RETRIES, backoff_factor=DEFAULT_BACKOFF, pool_size=DEFAULT_POOL_SIZE):
+        self.host = host
+        self.username = username
+        self.password = password
+        self.auth = auth
+        self.timeout = timeout
+        self.base_url, host_header = split_host(host)
+        self.headers = {
+            'Content-Type': 'application/json',
+            'User-Agent': 'curl/7.54.0',
+            'Host': host_header
+        }
+        self.http = get_http_session(self.base_url, retries, backoff_factor, pool_size)
+
+    def url(self, path):
+        if path.startswith('http'):
+            return path
+        return self.base_url + path
+
+    @property
+    def token(self):
+        with _registry_lock:
+            entry = _auth_tokens.get((self.base_url, self.username))
+        return entry[0] if entry else None
+
+    def login(self, force=False):
+        """Create (or reuse) a Redfish session token for this BMC/username"""
+        if self.auth != 'session':
+            return None
+        if self.token and not force:
+            return self.token
+        response = self.http.post(self.url(SESSIONS_URL), json={'UserName': self.username, 'Password': self.password},
+                                  headers=self.headers, timeout=self.timeout)
+        token = response.headers.get('X-Auth-Token')
+        if not response.ok or not token:
+            raise RedfishError(f"Session login to {self.host} failed: HTTP {response.status_code}")
+        with _registry_lock:
+            _auth_tokens[(self.base_url, self.username)] = (token, response.headers.get('Location'))
+        logger.debug(f"Redfish session created on {self.host}")
+        return token
+
+    def logout(self):
+        """Delete the session token, if any. Pooled connections stay open"""
+        with _registry_lock:
+            entry = _auth_tokens.pop((self.base_url, self.username), None)
+        if not entry:
+            return
+        token, location = entry
+        if location:
+            try:
+                self.http.delete(self.url(location), headers=dict(self.headers, **{'X-Auth-Token': token}),
+                                 timeout=self.timeout)
+            except requests.RequestException as e:
+                logger.debug(f"Redfish logout from {self.host} failed: {e}")
+
+    def request(self, method, path, **kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+        headers = dict(self.headers, **kwargs.pop('headers', {}))
+        if self.auth == 'session':
+            headers['X-Auth-Token'] = self.login()
+            response = self.http.request(method, self.url(path), headers=headers, **kwargs)
+            if response.status_code == 401:
+                # Token expired or was dropped by the BMC; log in again once
+                headers['X-Auth-Token'] = self.login(force=True)
+                response = self.http.request(method, self.url(path), headers=headers, **kwargs)
+            return response
+        return self.http.request(method, self.url(path), auth=(self.username, self.password),
+                                 headers=headers, **kwargs)
+
+    def get(self, path, **kwargs):
+        return self.request('GET', path, **kwargs)
+
+    def post(self, path, body=None, **kwargs):
+        return self.request('POST', path, json=body, **kwargs)
+
+    def patch(self, path, body=None, **kwargs):
+        return self.request('PATCH', path, json=body, **kwargs)
+
+    def delete(self, path, **kwargs):
+        return self.request('DELETE', path, **kwargs)
+
+    def __enter__(self):
+        self.login()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.logout()
@@ -0,0 +1,213 @@
+# Copyright: (c) 2025, Ansible Module
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+"""Per-phase timing for a module run.
+
+A module starts one Tracer per run and returns tracer.finish() in its result:
+
+    tracer = run_trace.start('ucp_all', module.params['trace_dir'])
+    ...
+    result['trace'] = tracer.finish()
+
+Anything called during the run wraps its phases in span(), without having
+the tracer passed in:
+
+    with run_trace.span('bios_patch'):
+        ...
+
+or, for a whole function, decorates it with @traced('bios_patch').
+
+Each finished span is one line in <trace_dir>/<run id>.jsonl:
+
+    {"run": "ucp_all-20250101-120000-4242", "phase": "bios_patch", "host": "10.1.1.1",
+     "start": 1735732800.12, "seconds": 2.314, "status": "ok"}
+
+The host is taken from the innermost host() block on the current thread;
+run_per_server opens one per server. Code that is not on a per-server
+thread (asyncio discovery) passes host= explicitly.
+
+Spans nest, so phase totals overlap: a 'server' span contains that server's
+'bios' span, which contains its 'ilorest_load'. A host's time is the span
+from its first phase starting to its last phase ending. Without an active
+tracer span() does nothing.
+"""
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+import contextlib
+import functools
+import json
+import logging
+import os
+import shlex
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TRACE_DIR = '/tmp/ansible_toolkit/traces'
+SLOWEST_HOSTS = 5
+# Error messages in the trace are cut to this length
+ERROR_LENGTH = 200
+
+_local = threading.local()
+_active = None
+
+
+class Tracer(object):
+    """Collects spans for one run; thread-safe"""
+
+    def __init__(self, run_name, trace_dir=DEFAULT_TRACE_DIR):
+        self.run_id = f"{run_name}-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}"
+        self.path = os.path.join(trace_dir, f'{self.run_id}.jsonl') if trace_dir else None
+        self.started = time.monotonic()
+        self._lock = threading.Lock()
+        self._file = None
+        self._phases = {}
+        self._hosts = {}
+        if self.path:
+            try:
+                os.makedirs(trace_dir, exist_ok=True)
+                self._file = open(self.path, 'a', buffering=1)
+            except (IOError, OSError) as e:
+                logger.debug(f"Cannot write trace file {self.path}: {e}")
+                self.path = None
+
+    @contextlib.contextmanager
+    def span(self, phase, host=None, **fields):
+        """Time the block as phase on host
+
+        Yields a dict the block may add fields to; setting its 'status' (e.g.
+        to 'failed' when the block reports failure without raising) replaces
+        the default 'ok'. An exception leaving the block is status 'error'.
+        """
+        if host is None:
+            host = current_host()
+        start = time.time()
+        started = time.monotonic()
+        error = None
+        try:
+            yield fields
+            status = fields.pop('status', 'ok')
+        except BaseException as e:
+            status, error = 'error', str(e)[:ERROR_LENGTH]
+            raise
+        finally:
+            self.record(phase, host, start, time.monotonic() - started, status, error, fields)
+
+    def record(self, phase, host, start, seconds, status='ok', error=None, fields=None):
+        entry = {'run': self.run_id, 'phase': phase, 'host': host, 'start': round(start, 3),
+                 'seconds': round(seconds, 3), 'status': status}
+        if error:
+            entry['error'] = error
+        if fields:
+            entry.update(fields)
+        with self._lock:
+            totals = self._phases.setdefault(phase, {'count': 0, 'seconds': 0.0, 'max': 0.0, 'errors': 0})
+            totals['count'] += 1
+            totals['seconds'] += seconds
+            totals['max'] = max(totals['max'], seconds)
+            if status != 'ok':
+                totals['errors'] += 1
+            if host is not None:
+                timeline = self._hosts.setdefault(host, {'first': start, 'last': start, 'phases': {}})
+                timeline['first'] = min(timeline['first'], start)
+                timeline['last'] = max(timeline['last'], start + seconds)
+                timeline['phases'][phase] = timeline['phases'].get(phase, 0.0) + seconds
+            if self._file is not None:
+                try:
+                    self._file.write(json.dumps(entry, default=str) + '\n')
+                except (IOError, OSError, ValueError) as e:
+                    logger.debug(f"Writing trace file {self.path} failed, stopping trace output: {e}")
+                    self._file = None
+
+    def summary(self, slowest=SLOWEST_HOSTS):
+        """Per-phase totals and the slowest hosts, for the module result"""
+        with self._lock:
+            phases = dict((phase, {'count': t['count'], 'seconds': round(t['seconds'], 3),
+                                   'max': round(t['max'], 3), 'errors': t['errors']})
+                          for phase, t in sorted(self._phases.items(), key=lambda item: -item[1]['seconds']))
+            hosts = sorted(self._hosts.items(), key=lambda item: item[1]['first'] - item[1]['last'])
+            slowest_hosts = [{'host': host, 'seconds': round(t['last'] - t['first'], 3),
+                              'phases': dict((phase, round(seconds, 3)) for phase, seconds in t['phases'].items())}
+                             for host, t in hosts[:slowest]]
+        return {
+            'run_id': self.run_id,
+            'trace_file': self.path,
+            'seconds': round(time.monotonic() - self.started, 3),
+            'phases': phases,
+            'slowest_hosts': slowest_hosts,
+        }
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def finish(self, slowest=SLOWEST_HOSTS):
+        """Close the trace, stop it being the active one and return summary()"""
+        global _active
+        self.close()
+        if _active is self:
+            _active = None
+        return self.summary(slowest)
+
+
+def start(run_name, trace_dir=DEFAULT_TRACE_DIR):
+    """Start the run's tracer and make it the one span() records to; an empty trace_dir writes no file"""
+    global _active
+    _active = Tracer(run_name, trace_dir)
+    return _active
+
+
+def active():
+    return _active
+
+
+def span(phase, host=None, **fields):
+    """Tracer.span on the active tracer, or a no-op block yielding a throwaway dict"""
+    tracer = _active
+    if tracer is None:
+        return contextlib.nullcontext(fields)
+    return tracer.span(phase, host, **fields)
+
+
+def traced(phase):
+    """Decorator: every call of the function is a span named phase"""
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(phase):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def current_host():
+    return getattr(_local, 'host', None)
+
+
+@contextlib.contextmanager
+def host(name):
+    """Spans on this thread without an explicit host belong to name"""
+    previous = current_host()
+    _local.host = name
+    try:
+        yield
+    finally:
+        _local.host = previous
+
+
+def command_phase(cmd):
+    """Phase name for a command line: 'ilorest_login' for `ilorest --cache-dir=... login ...`"""
+    try:
+        args = shlex.split(cmd) if isinstance(cmd, str) else [str(arg) for arg in cmd]
+    except ValueError:
+        args = str(cmd).split()
+    if not args:
+        return 'command'
+    name = os.path.basename(args[0])
+    verb = next((arg for arg in args[1:] if not arg.startswith('-')), None)
+    return f'{name}_{verb}' if verb else name
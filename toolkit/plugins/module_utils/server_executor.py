@@ -0,0 +1,110 @@
+# Copyright: (c) 2025, Ansible Module
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+"""Bounded fan-out of a per-server function for the ilorest-driven modules.
+
+run_per_server() calls the module's existing per-server function on a thread
+pool and hands back the outcomes in servers.csv order, so the modules build
+exactly the same result lists as their serial loops did.
+
+Per-server timeouts are enforced through run_command(): it replaces
+subprocess.run inside the per-server functions and gives each command only
+the time left before that server's deadline, killing the child when it runs
+out instead of leaving a thread blocked on it.
+
+Each server's run is traced as a 'server' span on that host, and every
+command as a span named after it (run_trace.command_phase).
+"""
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    from ansible.module_utils import run_trace
+except ImportError:
+    import run_trace
+
+DEFAULT_MAX_PARALLEL = 8
+
+_local = threading.local()
+
+
+class ServerTimeout(Exception):
+    pass
+
+
+def remaining_time():
+    """Seconds left before the current server's deadline, or None without one"""
+    deadline = getattr(_local, 'deadline', None)
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+def run_command(cmd, **kwargs):
+    """subprocess.run bounded by the current server's deadline
+
+    Raises ServerTimeout rather than subprocess.TimeoutExpired, whose message
+    contains the command line and therefore the iLO password.
+    """
+    remaining = remaining_time()
+    if remaining is not None:
+        if remaining <= 0:
+            raise ServerTimeout(f"Timed out after {_local.timeout}s")
+        timeout = kwargs.get('timeout')
+        kwargs['timeout'] = remaining if timeout is None else min(timeout, remaining)
+    try:
+        with run_trace.span(run_trace.command_phase(cmd)) as span:
+            result = subprocess.run(cmd, **kwargs)
+            if result.returncode != 0:
+                span['status'] = 'failed'
+            return result
+    except subprocess.TimeoutExpired:
+        if remaining is not None and remaining_time() <= 0:
+            raise ServerTimeout(f"Timed out after {_local.timeout}s")
+        raise
+
+
+def server_name(server):
+    """Host a server is traced under: its servers.csv ipaddress"""
+    if isinstance(server, dict):
+        return server.get('ipaddress')
+    return str(server)
+
+
+def _failure(server, message):
+    return False, message
+
+
+def run_per_server(func, servers, max_parallel=DEFAULT_MAX_PARALLEL, timeout=None, on_error=_failure):
+    """Run func(server) for every server, at most max_parallel at a time
+
+    Returns [(server, outcome)] in the order of servers. timeout is the
+    budget in seconds for one server. An exception that escapes func
+    becomes on_error(server, message), so the caller's result shape is
+    kept either way.
+    """
+    def call(server):
+        _local.deadline = time.monotonic() + timeout if timeout else None
+        _local.timeout = timeout
+        try:
+            with run_trace.host(server_name(server)), run_trace.span('server'):
+                return func(server)
+        except Exception as e:
+            return on_error(server, str(e))
+        finally:
+            _local.deadline = None
+
+    servers = list(servers)
+    if not servers:
+        return []
+    workers = max(1, min(int(max_parallel or 1), len(servers)))
+    if workers == 1:
+        return [(server, call(server)) for server in servers]
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(zip(servers, executor.map(call, servers)))
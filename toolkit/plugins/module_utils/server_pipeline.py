@@ -0,0 +1,81 @@
+# Copyright: (c) 2025, Ansible Module
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+"""Per-server stage pipeline on top of run_per_server.
+
+Every server walks the stages in order on its own worker, so one server can be
+rebooting while another loads its BIOS template and a third mounts media.
+A stage can have its own concurrency limit (for example to cap how many
+servers pull an ISO from nginx at once) without slowing down the other stages.
+"""
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+import threading
+import time
+
+try:
+    from ansible.module_utils import run_trace
+    from ansible.module_utils.server_executor import run_per_server, DEFAULT_MAX_PARALLEL
+except ImportError:
+    import run_trace
+    from server_executor import run_per_server, DEFAULT_MAX_PARALLEL
+
+
+class StageFailed(Exception):
+    def __init__(self, stage, message):
+        super(StageFailed, self).__init__(message)
+        self.stage = stage
+
+
+class Pipeline(object):
+    """Ordered stages, each a callable func(server, state) -> (success, message)
+
+    state is a dict private to one server that stages use to hand data
+    to later stages. limits maps stage name -> how many servers may be
+    in that stage at the same time; stages without a limit are bounded
+    only by max_parallel.
+    """
+
+    def __init__(self, stages, limits=None):
+        self.stages = list(stages)
+        limits = limits or {}
+        self._gates = dict((name, threading.BoundedSemaphore(limits[name]))
+                           for name, func in self.stages if limits.get(name))
+
+    def run_server(self, server):
+        """Run all stages for one server; returns (state, stage_seconds) or raises StageFailed"""
+        state = {}
+        timings = {}
+        for name, func in self.stages:
+            gate = self._gates.get(name)
+            if gate is not None:
+                gate.acquire()
+            started = time.monotonic()
+            try:
+                with run_trace.span(name) as span:
+                    success, message = func(server, state)
+                    if not success:
+                        span['status'] = 'failed'
+            except Exception as e:
+                success, message = False, str(e)
+            finally:
+                timings[name] = round(time.monotonic() - started, 1)
+                if gate is not None:
+                    gate.release()
+            if not success:
+                raise StageFailed(name, message)
+        return state, timings
+
+    def run(self, servers, max_parallel=DEFAULT_MAX_PARALLEL, timeout=None):
+        """Returns [(server, outcome)]: (True, state, stage_seconds) or (False, message, failed_stage)"""
+        def call(server):
+            try:
+                state, timings = self.run_server(server)
+                return True, state, timings
+            except StageFailed as e:
+                return False, str(e), e.stage
+
+        return run_per_server(call, servers, max_parallel, timeout,
+                              on_error=lambda server, message: (False, message, None))
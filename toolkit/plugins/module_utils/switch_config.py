@@ -0,0 +1,168 @@
+# Copyright: (c) 2025, Ansible Module
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+"""Desired switch configuration and the lines needed to get there.
+
+The caller describes what a switch should look like as sections of
+NX-OS/EOS CLI, compares it with the parsed `show running-config`, and
+pushes only the difference in one configuration session:
+
+    desired = DesiredConfig()
+    desired.add('feature lacp')
+    desired.add('interface Eth1/49', 'switchport mode trunk', 'channel-group 10 mode active')
+    running = parse_running_config(session.send(RUNNING_CONFIG_COMMAND))
+    lines = diff_config(desired, running)     # [] when the switch already matches
+
+Only what the desired state names is compared. Lines the switch has on top
+of it are left alone, except where a managed setting holds a different
+value: then the new value replaces it (after a `no` for channel-group and
+vpc, which cannot be changed in place).
+"""
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+import re
+
+RUNNING_CONFIG_COMMAND = 'show running-config'
+
+# Settings with one value per section; the desired line replaces a running line with the same prefix
+SINGLE_VALUED = ('description', 'switchport mode', 'switchport trunk allowed vlan', 'channel-group', 'mtu',
+                 'vpc', 'role priority', 'peer-keepalive destination', 'domain-id', 'local-interface',
+                 'peer-address', 'peer-link', 'ip address')
+# A port cannot move from one port-channel (or vPC) to another without leaving the first
+REMOVE_FIRST = ('channel-group', 'vpc')
+# Defaults the running-config does not print
+DEFAULT_LINES = ('mtu 1500',)
+# Settings the switch prints with defaults appended: "peer-keepalive destination x source y vrf z"
+APPENDS_DEFAULTS = ('peer-keepalive destination', 'channel-group')
+
+_VLANS = 'switchport trunk allowed vlan '
+_INTERFACE_NAMES = ((re.compile(r'^(?:ethernet|eth|et)(\d[\d/]*)$', re.I), 'Ethernet'),
+                    (re.compile(r'^(?:port-channel|po)(\d+)$', re.I), 'port-channel'),
+                    (re.compile(r'^(?:vlan)(\d+)$', re.I), 'Vlan'))
+
+
+def interface_name(name):
+    """Eth1/49, Et49, Po10 -> Ethernet1/49, Ethernet49, port-channel10; other names unchanged"""
+    for pattern, prefix in _INTERFACE_NAMES:
+        match = pattern.match(name.strip())
+        if match is not None:
+            return prefix + match.group(1)
+    return name.strip()
+
+
+def vlan_set(text):
+    """'10,20-22' -> {10, 20, 21, 22}"""
+    vlans = set()
+    for part in str(text).replace(' ', '').split(','):
+        if '-' in part:
+            first, last = part.split('-', 1)
+            vlans.update(range(int(first), int(last) + 1))
+        elif part.isdigit():
+            vlans.add(int(part))
+    return vlans
+
+
+def format_vlans(vlans):
+    return ','.join(str(vlan) for vlan in sorted(set(int(vlan) for vlan in vlans)))
+
+
+def _key(header):
+    """Sections compare case-insensitively with interface names spelled out"""
+    words = header.split()
+    if len(words) == 2 and words[0].lower() == 'interface':
+        words[1] = interface_name(words[1])
+    return ' '.join(words).lower()
+
+
+def _setting(line):
+    return next((prefix for prefix in SINGLE_VALUED if line == prefix or line.startswith(prefix + ' ')), None)
+
+
+def _satisfied(line, running):
+    """running (a running-config line) already says what line asks for"""
+    if line.startswith(_VLANS) and running.startswith(_VLANS):
+        return vlan_set(line[len(_VLANS):]) == vlan_set(running[len(_VLANS):])
+    if running == line:
+        return True
+    # Anything else (a description, say) must match exactly, or a shortened value would never be pushed
+    return _setting(line) in APPENDS_DEFAULTS and running.startswith(line + ' ')
+
+
+class DesiredConfig(object):
+    """Ordered sections: header -> lines under it; a header without lines is a global command"""
+
+    def __init__(self):
+        self.sections = {}
+
+    def add(self, header, *lines):
+        header = ' '.join(header.split())
+        section = self.sections.setdefault(_key(header), (header, []))[1]
+        for line in lines:
+            line = ' '.join(str(line).split())
+            setting = _setting(line)
+            if setting is not None:
+                # The last value given for a setting wins
+                section[:] = [existing for existing in section if _setting(existing) != setting]
+            if line not in section:
+                section.append(line)
+        return self
+
+    def lines(self):
+        """All sections as CLI lines, for pushing without a diff"""
+        lines = []
+        for header, section in self.sections.values():
+            lines.append(header)
+            lines.extend(section)
+        return lines
+
+    def __len__(self):
+        return len(self.sections)
+
+
+def parse_running_config(output):
+    """{section key: [lines]} from `show running-config` on NX-OS or EOS"""
+    sections = {}
+    lines = None
+    for raw in output.splitlines():
+        if not raw.strip() or raw.strip().startswith('!'):
+            continue
+        if raw[0] in ' \t':
+            line = ' '.join(raw.split())
+            if lines is None:
+                continue
+            # NX-OS wraps long VLAN lists onto "switchport trunk allowed vlan add ..." lines
+            if line.startswith(_VLANS + 'add ') and lines and lines[-1].startswith(_VLANS):
+                lines[-1] += ',' + line[len(_VLANS + 'add '):]
+            else:
+                lines.append(line)
+            continue
+        lines = sections.setdefault(_key(raw), [])
+    return sections
+
+
+def diff_config(desired, running):
+    """CLI lines that make running match desired, in desired order; [] when nothing differs"""
+    changes = []
+    for key, (header, lines) in desired.sections.items():
+        current = running.get(key)
+        if current is None:
+            changes.append(header)
+            changes.extend(line for line in lines if line not in DEFAULT_LINES)
+            continue
+        section = []
+        for line in lines:
+            if any(_satisfied(line, existing) for existing in current):
+                continue
+            setting = _setting(line)
+            replaced = [existing for existing in current if setting is not None and _setting(existing) == setting]
+            if not replaced and line in DEFAULT_LINES:
+                continue
+            if setting in REMOVE_FIRST:
+                section.extend('no ' + existing for existing in replaced)
+            section.append(line)
+        if section:
+            changes.append(header)
+            changes.extend(section)
+    return changes
@@ -0,0 +1,85 @@
+# Copyright: (c) 2025, Ansible Module
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+"""Configuration phases run on all switches of a rack at once.
+
+A phase calls one function per switch on run_per_server's thread pool and
+returns only when every switch has finished, so consecutive phases keep
+their order (vPC/MLAG peering is complete on all switches before the first
+port-channel is configured) while the switches within a phase do not wait
+on each other:
+
+    run_phase('mtu', lambda name: switches[name].setMTU(MTU=9216), switches)
+
+A switch whose call raises is retried after a pause; a switch that still
+fails is reported in PhaseFailed once the rest of the phase is done.
+"""
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+import logging
+import time
+
+try:
+    from ansible.module_utils import run_trace
+    from ansible.module_utils.server_executor import run_per_server
+except ImportError:
+    import run_trace
+    from server_executor import run_per_server
+
+logger = logging.getLogger(__name__)
+
+# Switches configured at the same time; a rack has at most a handful
+DEFAULT_MAX_PARALLEL = 8
+# Attempts after the first one, and the pause before each
+DEFAULT_RETRIES = 2
+DEFAULT_BACKOFF = 5
+
+
+class PhaseFailed(Exception):
+    def __init__(self, phase, failures):
+        super(PhaseFailed, self).__init__(
+            f"Phase {phase} failed on " + '; '.join(f"{name}: {message}" for name, message in sorted(failures.items())))
+        self.phase = phase
+        self.failures = failures
+
+
+def with_retries(func, name, retries=DEFAULT_RETRIES, backoff=DEFAULT_BACKOFF):
+    """func(name), called again up to retries times while it raises"""
+    attempt = 0
+    while True:
+        try:
+            return func(name)
+        except Exception as e:
+            if attempt >= retries:
+                raise
+            attempt += 1
+            logger.warning(f"{name}: {e}. Retrying ({attempt}/{retries}) in {backoff}s")
+            time.sleep(backoff)
+
+
+def run_phase(phase, func, names, retries=DEFAULT_RETRIES, backoff=DEFAULT_BACKOFF,
+              max_parallel=DEFAULT_MAX_PARALLEL, raise_on_failure=True):
+    """Run func(name) for every switch name concurrently; returns {name: result}
+
+    Switches that failed every attempt are raised together as PhaseFailed,
+    or with raise_on_failure=False logged and left out of the result.
+    """
+    def call(name):
+        return True, with_retries(func, name, retries, backoff)
+
+    results = {}
+    failures = {}
+    with run_trace.span(phase):
+        for name, (success, outcome) in run_per_server(call, names, max_parallel):
+            if success:
+                results[name] = outcome
+            else:
+                failures[name] = outcome
+    if failures:
+        if raise_on_failure:
+            raise PhaseFailed(phase, failures)
+        for name, message in failures.items():
+            logger.error(f"{name}: {phase} failed: {message}")
+    return results
@@ -0,0 +1,247 @@
+# Copyright: (c) 2025, Ansible Module
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+"""Pooled SSH sessions to switches, shared by discovery and configuration.
+
+One authenticated netmiko session is kept per switch, so identifying a switch
+and then configuring it logs in once instead of once per call:
+
+    session = switch_sessions.get_session(host, username, password)
+    output = session.identify()
+    session.send('show interface status')
+
+Commands return as soon as the switch prints its prompt again. The prompt is
+read once after login, so there are no fixed delay_factor/max_loops waits.
+A session that has dropped is reconnected on the next get_session();
+close_all() logs out of every switch.
+"""
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+import atexit
+import logging
+import re
+import threading
+
+try:
+    from netmiko import ConnectHandler
+    HAS_NETMIKO = True
+except ImportError:
+    HAS_NETMIKO = False
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TIMEOUT = 10
+# Longest a single command may run before the prompt comes back
+COMMAND_TIMEOUT = 60
+# Tried in order until one is recognised: NX-OS/EOS answer the first, Brocade FOS the second
+IDENTIFY_COMMANDS = ('show version', 'chassisshow')
+IDENTIFY_MARKERS = ('Nexus', 'NX-OS', 'Arista', 'DCS-', 'Factory Part Num', 'Chassis Family')
+# Long tables (MAC address table, running-config) must not stop at a --More-- pager;
+# FOS does not page over SSH and just rejects the command
+PAGING_OFF = 'terminal length 0'
+# The generic terminal_server driver cannot tell configuration mode from exec mode, so a config
+# set is wrapped in these itself and read until the exec prompt ("leaf1#", never "leaf1(config-if)#")
+CONFIG_MODE = 'configure terminal'
+CONFIG_END = 'end'
+EXEC_PROMPT = r'^[^\s(#]+#\s*$'
+# How NX-OS and EOS answer a line they reject
+CONFIG_ERRORS = ('% Invalid', '% Incomplete', '% Ambiguous')
+
+_registry_lock = threading.Lock()
+_sessions = {}
+
+
+class SwitchError(Exception):
+    pass
+
+
+class SwitchSession(object):
+    """One logged-in SSH shell on a switch; commands are serialised per session"""
+
+    def __init__(self, host, username, password, timeout=DEFAULT_TIMEOUT):
+        if not HAS_NETMIKO:
+            raise SwitchError('netmiko is required for switch sessions')
+        self.host = host
+        self.username = username
+        self.password = password
+        self.round_trips = 0
+        self._lock = threading.Lock()
+        try:
+            self.connection = ConnectHandler(device_type='terminal_server', ip=host, username=username,
+                                             password=password, timeout=timeout, conn_timeout=timeout)
+            self._read_prompt()
+        except Exception as e:
+            raise SwitchError(f"SSH login to {host} as {username} failed: {e}")
+        logger.debug(f"SSH session to {host} open, prompt {self.prompt!r}")
+        try:
+            self.send(PAGING_OFF)
+        except Exception as e:
+            logger.debug(f"Cannot turn off paging on {host}: {e}")
+
+    def _read_prompt(self):
+        self.prompt = self.connection.find_prompt().strip()
+        # Configuration mode changes "leaf1#" to "leaf1(config-if)#", so only the hostname is matched
+        hostname = re.sub(r'[#>$]$', '', self.prompt)
+        self.prompt_pattern = re.escape(hostname) + r'.*[#>$]'
+
+    def matches(self, username, password):
+        return (self.username, self.password) == (username, password)
+
+    def is_alive(self):
+        try:
+            return self.connection.is_alive()
+        except Exception:
+            return False
+
+    def send(self, command, read_timeout=COMMAND_TIMEOUT):
+        """Run one command and return its output once the prompt is back"""
+        with self._lock:
+            self.round_trips += 1
+            try:
+                return self.connection.send_command(command, expect_string=self.prompt_pattern,
+                                                    read_timeout=read_timeout)
+            except TypeError:
+                # netmiko 3.x has no read_timeout; it polls every 0.2s up to max_loops
+                return self.connection.send_command(command, expect_string=self.prompt_pattern,
+                                                    max_loops=int(read_timeout / 0.2))
+
+    def send_config(self, commands, read_timeout=COMMAND_TIMEOUT):
+        """Enter configuration mode, send all commands back to back and leave again
+
+        The commands are written in one go and not echo-checked one at a
+        time, so the whole set costs one round trip. Raises SwitchError
+        listing the lines the switch rejected.
+        """
+        lines = [CONFIG_MODE] + list(commands) + [CONFIG_END]
+        with self._lock:
+            self.round_trips += 1
+            self.connection.write_channel(''.join(self.connection.normalize_cmd(line) for line in lines))
+            try:
+                output = self.connection.read_until_pattern(pattern=EXEC_PROMPT, re_flags=re.M,
+                                                            read_timeout=read_timeout)
+            except TypeError as e:
+                # netmiko 3.x has no read_timeout; the lines are already written, only the read is repeated
+                if 'read_timeout' not in str(e):
+                    raise
+                output = self.connection.read_until_pattern(pattern=EXEC_PROMPT, re_flags=re.M,
+                                                            max_loops=int(read_timeout / 0.2))
+            # A "hostname" line changes the prompt the next command has to wait for
+            self._read_prompt()
+        rejected = []
+        command = None
+        for line in output.splitlines():
+            if '# ' in line:
+                # Echo after a prompt: "leaf1(config-if)# mtu 9216"
+                command = line.split('# ', 1)[1].strip()
+            elif line.strip().startswith(CONFIG_ERRORS):
+                rejected.append(f"{command}: {line.strip()}")
+        if rejected:
+            raise SwitchError(f"{self.host} rejected config: " + '; '.join(rejected))
+        return output
+
+    def identify(self):
+        """Output of the first identification command the switch recognises"""
+        output = ''
+        for cmd in IDENTIFY_COMMANDS:
+            try:
+                output = self.send(cmd)
+            except Exception as e:
+                logger.debug(f"Command '{cmd}' failed on {self.host}: {e}")
+                continue
+            if any(marker in output for marker in IDENTIFY_MARKERS):
+                return output
+        return output
+
+    def close(self):
+        try:
+            self.connection.disconnect()
+        except Exception as e:
+            logger.debug(f"Closing SSH session to {self.host}: {e}")
+
+
+class ConfigTransaction(object):
+    """Config lines for one switch, collected during a phase and committed together
+
+        with ConfigTransaction(session) as transaction:
+            transaction.add('interface Eth1/1', 'mtu 9216')
+            transaction.add('interface Eth1/2', 'mtu 9216')
+        transaction.commands, transaction.round_trips      # 4, 1
+
+    The block commits on a clean exit and sends nothing if it raises.
+    """
+
+    def __init__(self, session):
+        self.session = session
+        self.lines = []
+        self.round_trips = 0
+        self.output = ''
+
+    def add(self, *lines):
+        self.lines.extend(lines)
+        return self
+
+    @property
+    def commands(self):
+        return len(self.lines)
+
+    def commit(self):
+        if self.lines:
+            before = self.session.round_trips
+            self.output = self.session.send_config(self.lines)
+            self.round_trips += self.session.round_trips - before
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.commit()
+        return False
+
+
+def get_session(host, username, password, timeout=DEFAULT_TIMEOUT):
+    """Return the open session for host, logging in when there is none or its credentials differ
+
+    Raises SwitchError when the login fails; a failed login leaves no session behind.
+    """
+    with _registry_lock:
+        session = _sessions.get(host)
+    if session is not None and session.matches(username, password) and session.is_alive():
+        return session
+
+    new_session = SwitchSession(host, username, password, timeout)
+    with _registry_lock:
+        previous = _sessions.get(host)
+        _sessions[host] = new_session
+    if previous is not None:
+        previous.close()
+    return new_session
+
+
+def pooled(host):
+    """The open session for host, or None"""
+    with _registry_lock:
+        return _sessions.get(host)
+
+
+def close(host):
+    with _registry_lock:
+        session = _sessions.pop(host, None)
+    if session is not None:
+        session.close()
+
+
+def close_all():
+    """Log out of every pooled switch"""
+    with _registry_lock:
+        sessions = list(_sessions.values())
+        _sessions.clear()
+    for session in sessions:
+        session.close()
+
+
+# exit_json/fail_json end the process with sys.exit; log out instead of dropping the sessions
+atexit.register(close_all)
@@ -0,0 +1,180 @@
+# Copyright: (c) 2025, Ansible Module
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+"""Where a MAC or WWN is cabled: one index over every switch's tables.
+
+The tables are read once per refresh from the switches' CLI output
+(`show mac address-table` on NX-OS/EOS, `switchshow` on Brocade FOS) and
+merged into a dictionary, so locating a NIC or HBA port is one lookup:
+
+    index = LocationIndex(normalize_mac, access_port)
+    index.update('Leaf1', [(mac, port) for mac, port, age in parse_mac_table(output)])
+    switchname, port = index.lookup('AA:BB:CC:00:01:00')
+
+A refresh can also be a delta: merge() applies only the entries the switch
+learned since the previous poll (their age is below the time since then)
+on top of what the index already holds for that switch.
+
+Uplinks, port-channels and peer-links are dropped while the index is built.
+When the same address shows up on two switches the switch updated first
+wins, as the old per-switch walk did.
+"""
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+import re
+import time
+
+MAC_TABLE_COMMAND = 'show mac address-table'
+FLOGI_TABLE_COMMAND = 'switchshow'
+# Host-facing ports on the leaf and mgmt switches; the ports above are uplinks and peer-links
+ACCESS_PORTS = 48
+# Ages keep counting while a poll runs, so a delta takes entries this much older than the last poll too
+AGE_MARGIN = 5
+
+_MAC = re.compile(r'\b([0-9a-fA-F]{4}\.[0-9a-fA-F]{4}\.[0-9a-fA-F]{4})\b')
+_WWN = re.compile(r'\b([0-9a-fA-F]{2}(?::[0-9a-fA-F]{2}){7})\b')
+_ETHERNET_PORT = re.compile(r'^(?:Eth1/|Et)(\d+)$')
+_PORT = re.compile(r'^[A-Za-z][\w/.:()-]+$')
+_LAST_MOVE = re.compile(r'(?:(\d+) days?, )?(\d+):(\d+):(\d+) ago')
+# NX-OS secure and ntfy columns
+_FLAGS = ('T', 'F')
+
+
+def normalize_mac(mac):
+    """'aabb.cc00.0100', 'AA:BB:CC:00:01:00' and 'aabbcc000100' all become 'aabbcc000100'"""
+    return re.sub(r'[^0-9a-f]', '', str(mac).lower())
+
+
+def normalize_wwn(wwn):
+    return re.sub(r'[^0-9a-f]', '', str(wwn).lower())
+
+
+def access_port(port, ports=ACCESS_PORTS):
+    """True for a front-panel host port: Eth1/1..Eth1/48 (NX-OS) or Et1..Et48 (EOS)"""
+    match = _ETHERNET_PORT.match(port or '')
+    return match is not None and 0 < int(match.group(1)) <= ports
+
+
+def _age(line, age):
+    """Seconds since the entry was learned: NX-OS 'age' column, EOS 'Last Move'; None when not shown"""
+    match = _LAST_MOVE.search(line)
+    if match is not None:
+        days, hours, minutes, seconds = (int(value or 0) for value in match.groups())
+        return ((days * 24 + hours) * 60 + minutes) * 60 + seconds
+    # NX-OS prints NA or - for static and gateway entries
+    if age is not None and age.isdigit():
+        return int(age)
+    return None
+
+
+def parse_mac_table(output):
+    """[(mac, port, age)] from `show mac address-table` on NX-OS or EOS
+
+    The port is taken by position: NX-OS rows are "type age secure ntfy
+    ports" after the MAC (secure and ntfy are T/F) and the port is the last
+    column; EOS rows are "type ports moves last-move" and the port follows
+    the type. age is in seconds, or None for NA/- (static entries) and
+    platforms that do not show it.
+    """
+    entries = []
+    for line in output.splitlines():
+        match = _MAC.search(line)
+        if match is None:
+            continue
+        columns = line[match.end():].split()
+        if len(columns) >= 5 and columns[2] in _FLAGS and columns[3] in _FLAGS:
+            port, age = columns[-1], columns[1]
+        elif len(columns) >= 2:
+            port, age = columns[1], None
+        else:
+            continue
+        if _PORT.match(port):
+            entries.append((match.group(1), port, _age(line, age)))
+    return entries
+
+
+def parse_flogi_table(output):
+    """[(wwn, port index)] for the F-Ports in Brocade `switchshow`
+
+    Only ports with a single login show the device WWN; NPIV ports list a
+    login count instead and are skipped. E-Ports (ISLs) are not F-Ports.
+    """
+    entries = []
+    for line in output.splitlines():
+        if 'F-Port' not in line:
+            continue
+        match = _WWN.search(line)
+        columns = line.split()
+        if match is not None and columns and columns[0].isdigit():
+            entries.append((match.group(1), columns[0]))
+    return entries
+
+
+class LocationIndex(object):
+    """address -> (switch name, port) over the tables of all switches
+
+    normalize turns any spelling of an address into the index key, and
+    include decides which ports are kept; both run once per entry at
+    update() time, so lookup() is a single dictionary access. Not
+    thread-safe: tables read in parallel are applied from one thread.
+    """
+
+    def __init__(self, normalize, include=None):
+        self.normalize = normalize
+        self.include = include
+        self.tables = {}
+        self.polled = {}
+        self._locations = {}
+
+    def _entries(self, entries):
+        return dict((self.normalize(address), port) for address, port in entries
+                    if self.include is None or self.include(port))
+
+    def update(self, switchname, entries, polled=None):
+        """Replace one switch's table with entries [(address, port)] and re-index
+
+        polled is the time.monotonic() the entries were read at; it defaults to now.
+        """
+        self.tables[switchname] = self._entries(entries)
+        self.polled[switchname] = time.monotonic() if polled is None else polled
+        self._reindex()
+
+    def merge(self, switchname, entries, polled=None):
+        """Apply entries on top of the switch's current table; addresses not in entries are kept
+
+        A merged address was just learned here, so it is dropped from the other switches' tables.
+        """
+        entries = self._entries(entries)
+        for other, table in self.tables.items():
+            if other != switchname:
+                for address in entries:
+                    table.pop(address, None)
+        self.tables.setdefault(switchname, {}).update(entries)
+        self.polled[switchname] = time.monotonic() if polled is None else polled
+        self._reindex()
+
+    def since(self, switchname):
+        """Seconds since the switch was last polled, or None if it never was"""
+        polled = self.polled.get(switchname)
+        return None if polled is None else time.monotonic() - polled
+
+    def remove(self, switchname):
+        self.polled.pop(switchname, None)
+        if self.tables.pop(switchname, None) is not None:
+            self._reindex()
+
+    def _reindex(self):
+        locations = {}
+        for switchname, table in self.tables.items():
+            for address, port in table.items():
+                locations.setdefault(address, (switchname, port))
+        self._locations = locations
+
+    def lookup(self, address):
+        """(switch name, port), or (None, None) when the address is on no indexed port"""
+        return self._locations.get(self.normalize(address), (None, None))
+
+    def __len__(self):
+        return len(self._locations)
@@ -0,0 +1,121 @@
+# Copyright: (c) 2025, Ansible Module
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+"""Logging for a module run, configured from the module's parameters.
+
+    logger = toolkit_logging.configure('ansibleautodiscover', module.params['log_level'],
+                                       module.params['log_dir'])
+
+Nothing is set up at import time. configure() puts a QueueHandler on the
+root logger, so a thread that logs only appends the record to a queue, and
+a single QueueListener thread writes the records to
+<log_dir>/<name>_<timestamp>.log. Discovery threads never wait on each
+other's file writes.
+
+Every line is one JSON object:
+
+    {"time": "2025-01-01T12:00:00.123", "level": "DEBUG", "logger": "__main__",
+     "host": "fe80::aa1e:84ff:fe73:ba49%eth0", "thread": "ThreadPoolExecutor-0_3",
+     "message": "Redfish response status: 200"}
+
+host is the `host` passed in extra=, else the run_trace.host() the logging
+thread is working on, else null. With an empty log_dir nothing is written.
+"""
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+from datetime import datetime
+
+try:
+    from ansible.module_utils import run_trace
+except ImportError:
+    import run_trace
+
+DEFAULT_LOG_DIR = '/tmp/ansible_toolkit/logs'
+DEFAULT_LEVEL = 'info'
+LEVELS = ('debug', 'info', 'warning', 'error')
+
+_listener = None
+_handler = None
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record"""
+
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'host': getattr(record, 'host', None),
+            'thread': record.threadName,
+            'message': record.getMessage(),
+        }
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class _HostFilter(logging.Filter):
+    """Fill in record.host on the logging thread, before the record crosses the queue"""
+
+    def filter(self, record):
+        if getattr(record, 'host', None) is None:
+            record.host = run_trace.current_host()
+        return True
+
+
+def configure(name, level=DEFAULT_LEVEL, log_dir=DEFAULT_LOG_DIR):
+    """Route all logging of this run through a queue to a JSON-lines file; returns the logger for name
+
+    Calling it again replaces the previous configuration.
+    """
+    global _listener, _handler
+    shutdown()
+    root = logging.getLogger()
+    root.setLevel(getattr(logging, str(level).upper(), logging.INFO))
+    logger = logging.getLogger(name)
+    if not log_dir:
+        return logger
+
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    path = os.path.join(log_dir, f'{name}_{timestamp}.log')
+    try:
+        os.makedirs(log_dir, exist_ok=True)
+        file_handler = logging.FileHandler(path)
+    except (IOError, OSError):
+        return logger
+    file_handler.setFormatter(JsonFormatter())
+
+    records = queue.SimpleQueue()
+    _handler = logging.handlers.QueueHandler(records)
+    _handler.addFilter(_HostFilter())
+    _listener = logging.handlers.QueueListener(records, file_handler)
+    _listener.start()
+    root.addHandler(_handler)
+    logger.info(f"Logging initialized. Log file: {path}")
+    return logger
+
+
+def shutdown():
+    """Flush queued records to the file and stop the listener thread"""
+    global _listener, _handler
+    if _handler is not None:
+        logging.getLogger().removeHandler(_handler)
+        _handler = None
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+# exit_json/fail_json end the process with sys.exit; write out what is still queued
+atexit.register(shutdown)
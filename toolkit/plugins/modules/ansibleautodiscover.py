@@ -55,6 +55,88 @@ options:
         required: false
         type: bool
         default: true
+    engine:
+        description:
+            - Discovery engine to use.
+            - C(serial) probes one address at a time.
+            - C(async) probes addresses concurrently with asyncio, bounded by I(max_in_flight).
+        required: false
+        type: str
+        choices: ['serial', 'async']
+        default: serial
+    single_pass:
+        description:
+            - Ping each address once, probe ports 623/443/22 together and identify it as either
+              a server (Redfish) or a switch (SSH) based on what answered.
+            - When false, servers and switches are discovered in two separate sweeps.
+        required: false
+        type: bool
+        default: true
+    use_identity_cache:
+        description:
+            - Remember which credential worked and what each device is, keyed by the MAC in its
+              EUI-64 link-local address.
+            - Devices with a fresh cache entry are reported without logging in again; stale
+              entries still put the last working credential first.
+        required: false
+        type: bool
+        default: true
+    identity_cache_path:
+        description: Location of the identity cache file
+        required: false
+        type: str
+        default: /tmp/ansible_toolkit/identity_cache.json
+    identity_cache_ttl:
+        description: Seconds an identity cache entry is trusted without re-identifying the device
+        required: false
+        type: int
+        default: 3600
+    invalidate_identity_cache:
+        description: Drop every identity cache entry before discovery
+        required: false
+        type: bool
+        default: false
+    max_in_flight:
+        description: Maximum number of hosts probed at the same time when I(engine=async)
+        required: false
+        type: int
+        default: 32
+    host_timeout:
+        description: Seconds allowed for discovering a single host when I(engine=async)
+        required: false
+        type: int
+        default: 60
+    sweep_window:
+        description: Seconds to collect echo replies to the ff02::1 sweep; raise it if slow BMCs are missed
+        required: false
+        type: float
+        default: 3.0
+    incremental:
+        description: Reuse the previous run's results for devices still at the same address and still answering, only fully probe new or changed addresses, and return added/removed/unchanged
+        required: false
+        type: bool
+        default: false
+    discovery_state_path:
+        description: File holding the previous run's results for I(incremental)
+        required: false
+        type: str
+        default: /tmp/ansible_toolkit/discovery_state.json
+    trace_dir:
+        description: Directory for the run's JSON-lines trace (one line per timed phase per device); empty to only return the summary
+        required: false
+        type: str
+        default: /tmp/ansible_toolkit/traces
+    log_level:
+        description: Level of the run's log; C(debug) logs every probe and login attempt
+        required: false
+        type: str
+        choices: ['debug', 'info', 'warning', 'error']
+        default: info
+    log_dir:
+        description: Directory for the run's JSON-lines log file, one file per run; empty to not write one
+        required: false
+        type: str
+        default: /tmp/ansible_toolkit/logs
 
 author:
     - Ansible Module (@ansible)
@@ -76,6 +158,19 @@ EXAMPLES = r'''
     interface: eth0
     usernames: ['admin', 'root']
     passwords: ['password1', 'password2']
+
+# Discover a full rack concurrently
+- name: Discover all devices with the async engine
+  ansibleautodiscover:
+    engine: async
+    max_in_flight: 64
+    host_timeout: 90
+
+# Re-run after recabling; only new or moved devices are fully probed
+- name: Incremental discovery
+  ansibleautodiscover:
+    engine: async
+    incremental: true
 '''
 
 RETURN = r'''
@@ -108,57 +203,57 @@ switches:
             "model": "C92348GC-X"
         }
     ]
+added:
+    description: Devices found now that were not in the previous run, or whose identity changed (without passwords)
+    type: list
+    returned: when incremental is true
+removed:
+    description: Devices from the previous run that were not found now, or whose identity changed (without passwords)
+    type: list
+    returned: when incremental is true
+unchanged:
+    description: Devices found again with the same identity (without passwords)
+    type: list
+    returned: when incremental is true
+trace:
+    description: Seconds spent per phase (sweep, ping, probe, login, sku_fetch, ssh_login, show_version) and the slowest devices
+    type: dict
+    returned: always
+    sample: {
+        "run_id": "ansibleautodiscover-20250101-120000-4242",
+        "trace_file": "/tmp/ansible_toolkit/traces/ansibleautodiscover-20250101-120000-4242.jsonl",
+        "seconds": 41.2,
+        "phases": {"login": {"count": 40, "seconds": 96.1, "max": 10.0, "errors": 4}},
+        "slowest_hosts": [{"host": "fe80::aa1e:84ff:fe73:ba49%eth0", "seconds": 12.4,
+                           "phases": {"ping": 0.01, "probe": 2.0, "login": 10.3, "sku_fetch": 10.3}}]
+    }
 '''
 
 import socket
 import subprocess
 import json
-import requests
 import urllib3
 import itertools
-import sys
 import time
 import os
 import logging
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils import run_trace, switch_sessions, toolkit_logging
+from ansible.module_utils.async_discovery import (AsyncDiscoveryEngine, classify_ports,
+                                                   IPMI_PORT, HTTPS_PORT, SSH_PORT)
+from ansible.module_utils.discovery_state import DiscoveryState, DEFAULT_STATE_PATH
+from ansible.module_utils.identity_cache import IdentityCache, walk_credentials
+from ansible.module_utils.neighbor_sweep import sweep, DEFAULT_WINDOW
+from ansible.module_utils.redfish_client import RedfishClient
 
 urllib3.disable_warnings()
 
-# Setup logging
-def setup_logging():
-    """Setup logging to file with timestamp"""
-    # Use a fixed logs directory path - avoid using module path during Ansible execution
-    logs_dir = "/home/ubuntu/smci/ansible-toolkit/toolkit/logs"
-    
-    # Ensure logs directory exists
-    os.makedirs(logs_dir, exist_ok=True)
-    
-    # Create log filename with timestamp
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    log_filename = f"ansibleautodiscover_{timestamp}.log"
-    log_path = os.path.join(logs_dir, log_filename)
-    
-    # Configure logging
-    logging.basicConfig(
-        level=logging.DEBUG,
-        format='%(asctime)s - %(levelname)s - %(message)s',
-        handlers=[
-            logging.FileHandler(log_path),
-            logging.StreamHandler(sys.stderr)  # Also log to stderr for immediate visibility
-        ]
-    )
-    
-    logger = logging.getLogger(__name__)
-    logger.info(f"Logging initialized. Log file: {log_path}")
-    return logger
-
-# Initialize logger
-logger = setup_logging()
+logger = logging.getLogger(__name__)
 
-def log_debug(message):
-    """Log debug messages to both file and stderr"""
-    logger.debug(message)
+def log_debug(message, host=None):
+    """Debug message for the run's log, tagged with the device it is about"""
+    logger.debug(message, extra={'host': host} if host else None)
 
 def get_nic_interfaces():
     """Get all non-loopback and UP NIC interfaces from /sys/class/net"""
@@ -185,8 +280,8 @@ def get_nic_interfaces():
     log_debug(f"Found UP interfaces: {interfaces}")
     return interfaces
 
-def get_ipv6_neighbors(interface=None):
-    """Discover IPv6 link-local devices using ping6 to multicast"""
+def get_ipv6_neighbors(interface=None, window=DEFAULT_WINDOW):
+    """Discover IPv6 link-local devices with an ICMPv6 all-nodes sweep plus the neighbor table"""
     log_debug("Starting IPv6 neighbor discovery...")
     nics = []
     if interface is None:
@@ -195,37 +290,16 @@ def get_ipv6_neighbors(interface=None):
         nics.append(str(interface))
     
     log_debug(f"Will scan interfaces: {nics}")
-    
-    ipv6_devices = []
-    for nic in nics:
-        try:
-            log_debug(f"Pinging multicast on interface {nic}...")
-            # Send ping to all-nodes multicast address
-            cmd = ['ping6', '-c', '2', f'ff02::1%{nic}']
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=10)
-            output = result.stdout
-            
-            log_debug(f"Parsing ping responses from interface {nic}...")
-            # Parse ping responses to extract IPv6 addresses
-            for line in output.splitlines():
-                if line.startswith("64 bytes from fe80:"):
-                    # Extract the source address
-                    parts = line.split()
-                    ipv6_address = parts[3].rstrip(':')  # Remove trailing colon
-                    if ipv6_address not in ipv6_devices:
-                        ipv6_devices.append(ipv6_address)
-                        log_debug(f"Found IPv6 device: {ipv6_address}")
-                        
-        except Exception as e:
-            log_debug(f"Error scanning interface {nic}: {e}")
-            continue
+    ipv6_devices = sweep(nics, window=window)
+    for ipv6_address in ipv6_devices:
+        log_debug(f"Found IPv6 device: {ipv6_address}")
     
     log_debug(f"Total IPv6 devices found: {len(ipv6_devices)}")
     return ipv6_devices
 
 def test_ipmi_port(ipv6_node):
     """Test if IPMI port 623 is open"""
-    log_debug(f"Testing IPMI port 623 on {ipv6_node}")
+    log_debug(f"Testing IPMI port 623 on {ipv6_node}", host=ipv6_node)
     try:
         addrinfo = socket.getaddrinfo(ipv6_node, 623, socket.AF_INET6, socket.SOCK_DGRAM)
         family, socktype, proto, canonname, sockaddr = addrinfo[0]
@@ -234,15 +308,15 @@ def test_ipmi_port(ipv6_node):
         result = sock.connect_ex(sockaddr)
         sock.close()
         is_open = result == 0
-        log_debug(f"IPMI port 623 on {ipv6_node}: {'OPEN' if is_open else 'CLOSED'}")
+        log_debug(f"IPMI port 623 on {ipv6_node}: {'OPEN' if is_open else 'CLOSED'}", host=ipv6_node)
         return is_open
     except Exception as e:
-        log_debug(f"Error testing IPMI port on {ipv6_node}: {e}")
+        log_debug(f"Error testing IPMI port on {ipv6_node}: {e}", host=ipv6_node)
         return False
 
 def test_ssh_port(ipv6_address):
     """Test if SSH port 22 is open"""
-    log_debug(f"Testing SSH port 22 on {ipv6_address}")
+    log_debug(f"Testing SSH port 22 on {ipv6_address}", host=ipv6_address)
     try:
         addrinfo = socket.getaddrinfo(ipv6_address, 22, socket.AF_INET6, socket.SOCK_STREAM)
         family, socktype, proto, canonname, sockaddr = addrinfo[0]
@@ -251,12 +325,36 @@ def test_ssh_port(ipv6_address):
         result = sock.connect_ex(sockaddr)
         sock.close()
         is_open = result == 0
-        log_debug(f"SSH port 22 on {ipv6_address}: {'OPEN' if is_open else 'CLOSED'}")
+        log_debug(f"SSH port 22 on {ipv6_address}: {'OPEN' if is_open else 'CLOSED'}", host=ipv6_address)
         return is_open
     except Exception as e:
-        log_debug(f"Error testing SSH port on {ipv6_address}: {e}")
+        log_debug(f"Error testing SSH port on {ipv6_address}: {e}", host=ipv6_address)
         return False
 
+def test_https_port(ipv6_address):
+    """Test if HTTPS port 443 is open"""
+    log_debug(f"Testing HTTPS port 443 on {ipv6_address}", host=ipv6_address)
+    try:
+        addrinfo = socket.getaddrinfo(ipv6_address, 443, socket.AF_INET6, socket.SOCK_STREAM)
+        family, socktype, proto, canonname, sockaddr = addrinfo[0]
+        sock = socket.socket(family, socktype, proto)
+        sock.settimeout(2)
+        result = sock.connect_ex(sockaddr)
+        sock.close()
+        is_open = result == 0
+        log_debug(f"HTTPS port 443 on {ipv6_address}: {'OPEN' if is_open else 'CLOSED'}", host=ipv6_address)
+        return is_open
+    except Exception as e:
+        log_debug(f"Error testing HTTPS port on {ipv6_address}: {e}", host=ipv6_address)
+        return False
+
+def probe_ports(ipv6_address):
+    """Probe IPMI, HTTPS and SSH ports in parallel and return {port: is_open}"""
+    probes = {IPMI_PORT: test_ipmi_port, HTTPS_PORT: test_https_port, SSH_PORT: test_ssh_port}
+    with run_trace.span('probe', ipv6_address), ThreadPoolExecutor(max_workers=len(probes)) as executor:
+        futures = {port: executor.submit(probe, ipv6_address) for port, probe in probes.items()}
+        return {port: future.result() for port, future in futures.items()}
+
 def discover_server_type(ipv6_node, username, password):
     """Discover server type via Redfish API using original logic"""
     log_debug(f"Starting server discovery for {ipv6_node} with username {username}")
@@ -265,22 +363,20 @@ def discover_server_type(ipv6_node, username, password):
         log_debug(f"IPMI port not accessible on {ipv6_node}, skipping")
         return None
     
-    # Set up Redfish API URL (use Systems/1 endpoint like original)
-    redfish_api = f'https://[{ipv6_node.replace("%", "%25")}]/redfish/v1/Systems/'
-    redfish_header = {
-        'Content-Type': 'application/json',
-        'User-Agent': 'curl/7.54.0',
-        'Host': f'[{ipv6_node.split("%")[0]}]'
-    }
-    
+    return identify_server(ipv6_node, username, password)
+
+def identify_server(ipv6_node, username, password):
+    """Identify a server over Redfish once its IPMI port is known to be open"""
+    # Pooled client: every credential tried against this BMC reuses the same TLS connection
+    client = RedfishClient(ipv6_node, username, password, timeout=10)
+
     try:
-        log_debug(f"Attempting Redfish connection to {redfish_api}1")
-        # Connect directly to Systems/1 endpoint like original
-        session = requests.get(f'{redfish_api}1', 
-                             auth=(username, password), 
-                             verify=False,
-                             headers=redfish_header, 
-                             timeout=10)
+        log_debug(f"Attempting Redfish connection to {client.url('/redfish/v1/Systems/1')}")
+        # Connect directly to Systems/1 endpoint like original; this request is also the login
+        with run_trace.span('sku_fetch', ipv6_node) as span:
+            session = client.get('/redfish/v1/Systems/1')
+            if not session.ok:
+                span['status'] = 'failed'
         
         log_debug(f"Redfish response status: {session.status_code}")
         
@@ -335,6 +431,15 @@ def discover_server_type(ipv6_node, username, password):
         log_debug(f"Exception during server discovery for {ipv6_node}: {e}")
         return None
 
+def verify_server(ipv6_node, username, password):
+    """Log in to the BMC without reading the system; used when the identity cache already has its SKU"""
+    client = RedfishClient(ipv6_node, username, password, timeout=10)
+    try:
+        return client.get('/redfish/v1/Systems').ok
+    except Exception as e:
+        log_debug(f"Redfish login check failed for {ipv6_node}: {e}")
+        return False
+
 def discover_switch_type(ipv6_address, username, password):
     """Discover switch type via SSH (simplified)"""
     log_debug(f"Starting switch discovery for {ipv6_address} with username {username}")
@@ -344,37 +449,20 @@ def discover_switch_type(ipv6_address, username, password):
         log_debug(f"SSH port not accessible on {ipv6_address}, skipping")
         return None
     
+    return identify_switch(ipv6_address, username, password)
+
+def identify_switch(ipv6_address, username, password):
+    """Identify a switch over SSH once its SSH port is known to be open"""
     try:
-        from netmiko import ConnectHandler
-        
         log_debug(f"Attempting SSH connection to {ipv6_address}")
-        net_connect = ConnectHandler(
-            device_type='terminal_server',
-            ip=ipv6_address,
-            username=username,
-            password=password,
-            timeout=10,  # Reduced timeout
-            conn_timeout=10  # Add connection timeout
-        )
-        
-        log_debug(f"SSH connection established to {ipv6_address}")
-        
-        # Try different show commands
-        commands = ["show version", "chassisshow"]
-        output = ""
-        
-        for cmd in commands:
-            try:
-                log_debug(f"Executing command '{cmd}' on {ipv6_address}")
-                result = net_connect.send_command(cmd, delay_factor=10, max_loops=50)
-                output += result
-                break
-            except Exception as e:
-                log_debug(f"Command '{cmd}' failed on {ipv6_address}: {e}")
-                continue
-        
-        net_connect.disconnect()
-        log_debug(f"SSH connection closed for {ipv6_address}")
+        with run_trace.span('ssh_login', ipv6_address):
+            session = switch_sessions.get_session(ipv6_address, username, password)
+
+        log_debug(f"SSH session established to {ipv6_address}, prompt {session.prompt}")
+
+        # Returns on the prompt; the session stays open for the next phase that needs this switch
+        with run_trace.span('show_version', ipv6_address):
+            output = session.identify()
         
         # Determine switch type based on output
         switch_type = 'Unknown'
@@ -429,20 +517,33 @@ def discover_switch_type(ipv6_address, username, password):
         log_debug(f"Exception during switch discovery for {ipv6_address}: {e}")
         return None
 
+def verify_switch(ipv6_address, username, password):
+    """Log in to the switch without show version; the session stays pooled for configuration"""
+    try:
+        with run_trace.span('ssh_login', ipv6_address):
+            switch_sessions.get_session(ipv6_address, username, password)
+        return True
+    except Exception as e:
+        log_debug(f"SSH login check failed for {ipv6_address}: {e}")
+        return False
+
 def quick_ping_test(ipv6_address):
     """Quick ping test to see if device is responsive"""
     try:
-        log_debug(f"Quick ping test to {ipv6_address}")
-        result = subprocess.run(['ping6', '-c', '1', '-W', '1', ipv6_address], 
-                              capture_output=True, timeout=3)
-        is_alive = result.returncode == 0
-        log_debug(f"Ping test for {ipv6_address}: {'ALIVE' if is_alive else 'NO RESPONSE'}")
+        log_debug(f"Quick ping test to {ipv6_address}", host=ipv6_address)
+        with run_trace.span('ping', ipv6_address) as span:
+            result = subprocess.run(['ping6', '-c', '1', '-W', '1', ipv6_address], 
+                                  capture_output=True, timeout=3)
+            is_alive = result.returncode == 0
+            if not is_alive:
+                span['status'] = 'failed'
+        log_debug(f"Ping test for {ipv6_address}: {'ALIVE' if is_alive else 'NO RESPONSE'}", host=ipv6_address)
         return is_alive
     except Exception as e:
-        log_debug(f"Ping test failed for {ipv6_address}: {e}")
+        log_debug(f"Ping test failed for {ipv6_address}: {e}", host=ipv6_address)
         return False
 
-def discover_servers(ipv6_nodes, usernames, passwords):
+def discover_servers(ipv6_nodes, usernames, passwords, identity_cache=None):
     """Discover servers sequentially"""
     log_debug(f"Starting server discovery for {len(ipv6_nodes)} nodes")
     servers = []
@@ -454,16 +555,13 @@ def discover_servers(ipv6_nodes, usernames, passwords):
             log_debug(f"Device {ipv6_node} not responding to ping, skipping")
             continue
             
-        result = None
-        for username in usernames:
-            for password in passwords:
-                result = discover_server_type(ipv6_node, username, password)
-                if result:
-                    log_debug(f"Successfully discovered server: {result['type']}")
-                    servers.append(result)
-                    break  # Stop trying passwords for this node
-            if result:
-                break  # Stop trying usernames for this node
+        # Stops at the first working credential, cached credential first
+        result = walk_credentials(discover_server_type, ipv6_node,
+                                  list(itertools.product(usernames, passwords)), 'server', identity_cache,
+                                  verify=verify_server)
+        if result:
+            log_debug(f"Successfully discovered server: {result['type']}")
+            servers.append(result)
         
         # If no server found, log and continue to next node
         if not result:
@@ -472,7 +570,7 @@ def discover_servers(ipv6_nodes, usernames, passwords):
     log_debug(f"Total servers discovered: {len(servers)}")
     return servers
 
-def discover_switches(ipv6_addresses, usernames, passwords):
+def discover_switches(ipv6_addresses, usernames, passwords, identity_cache=None):
     """Discover switches sequentially"""
     log_debug(f"Starting switch discovery for {len(ipv6_addresses)} nodes")
     switches = []
@@ -484,16 +582,13 @@ def discover_switches(ipv6_addresses, usernames, passwords):
             log_debug(f"Device {ipv6_address} not responding to ping, skipping")
             continue
             
-        result = None
-        for username in usernames:
-            for password in passwords:
-                result = discover_switch_type(ipv6_address, username, password)
-                if result:
-                    log_debug(f"Successfully discovered switch: {result['type']}")
-                    switches.append(result)
-                    break  # Stop trying passwords for this node
-            if result:
-                break  # Stop trying usernames for this node
+        # Stops at the first working credential, cached credential first
+        result = walk_credentials(discover_switch_type, ipv6_address,
+                                  list(itertools.product(usernames, passwords)), 'switch', identity_cache,
+                                  verify=verify_switch)
+        if result:
+            log_debug(f"Successfully discovered switch: {result['type']}")
+            switches.append(result)
         
         # If no switch found, log and continue to next node
         if not result:
@@ -502,9 +597,47 @@ def discover_switches(ipv6_addresses, usernames, passwords):
     log_debug(f"Total switches discovered: {len(switches)}")
     return switches
 
+def discover_neighbors(ipv6_addresses, usernames, passwords, switch_usernames, switch_passwords,
+                       discover_servers_flag=True, discover_switches_flag=True, identity_cache=None):
+    """Discover servers and switches in a single pass over the neighbor list"""
+    log_debug(f"Starting single-pass discovery for {len(ipv6_addresses)} nodes")
+    server_credentials = list(itertools.product(usernames, passwords))
+    switch_credentials = list(itertools.product(switch_usernames, switch_passwords))
+    servers = []
+    switches = []
+    for i, ipv6_address in enumerate(ipv6_addresses):
+        log_debug(f"Processing device {i+1}/{len(ipv6_addresses)}: {ipv6_address}")
+
+        # Quick ping test first
+        if not quick_ping_test(ipv6_address):
+            log_debug(f"Device {ipv6_address} not responding to ping, skipping")
+            continue
+
+        open_ports = probe_ports(ipv6_address)
+        result = None
+        for path in classify_ports(open_ports, discover_servers_flag, discover_switches_flag):
+            if path == 'redfish':
+                result = walk_credentials(identify_server, ipv6_address, server_credentials, 'server',
+                                          identity_cache, verify=verify_server)
+                if result:
+                    log_debug(f"Successfully discovered server: {result['type']}")
+                    servers.append(result)
+                    break
+            else:
+                result = walk_credentials(identify_switch, ipv6_address, switch_credentials, 'switch',
+                                          identity_cache, verify=verify_switch)
+                if result:
+                    log_debug(f"Successfully discovered switch: {result['type']}")
+                    switches.append(result)
+                    break
+
+        if not result:
+            log_debug(f"No device discovered at {ipv6_address}")
+
+    log_debug(f"Total servers discovered: {len(servers)}, total switches discovered: {len(switches)}")
+    return servers, switches
+
 def run_module():
-    logger.info("Starting ansibleautodiscover module")
-    
     # Define available arguments/parameters
     module_args = dict(
         interface=dict(type='str', required=False),
@@ -514,7 +647,22 @@ def run_module():
         switch_usernames=dict(type='list', required=False, default=['admin']),
         switch_passwords=dict(type='list', required=False, default=['Passw0rd!']),
         discover_servers=dict(type='bool', required=False, default=True),
-        discover_switches=dict(type='bool', required=False, default=True)
+        discover_switches=dict(type='bool', required=False, default=True),
+        engine=dict(type='str', required=False, default='serial', choices=['serial', 'async']),
+        single_pass=dict(type='bool', required=False, default=True),
+        use_identity_cache=dict(type='bool', required=False, default=True),
+        identity_cache_path=dict(type='str', required=False, default='/tmp/ansible_toolkit/identity_cache.json'),
+        identity_cache_ttl=dict(type='int', required=False, default=3600),
+        invalidate_identity_cache=dict(type='bool', required=False, default=False),
+        max_in_flight=dict(type='int', required=False, default=32),
+        host_timeout=dict(type='int', required=False, default=60),
+        sweep_window=dict(type='float', required=False, default=3.0),
+        incremental=dict(type='bool', required=False, default=False),
+        discovery_state_path=dict(type='str', required=False, default=DEFAULT_STATE_PATH),
+        log_level=dict(type='str', required=False, default=toolkit_logging.DEFAULT_LEVEL,
+                       choices=list(toolkit_logging.LEVELS)),
+        log_dir=dict(type='str', required=False, default=toolkit_logging.DEFAULT_LOG_DIR),
+        trace_dir=dict(type='str', required=False, default=run_trace.DEFAULT_TRACE_DIR)
     )
 
     # Seed the result dict
@@ -535,6 +683,10 @@ def run_module():
     if module.check_mode:
         module.exit_json(**result)
 
+    toolkit_logging.configure('ansibleautodiscover', module.params['log_level'], module.params['log_dir'])
+    logger.info("Starting ansibleautodiscover module")
+    tracer = run_trace.start('ansibleautodiscover', module.params['trace_dir'])
+
     # Get module parameters
     interface = module.params['interface']
     target_nodes = module.params['target_nodes']
@@ -544,8 +696,21 @@ def run_module():
     switch_passwords = module.params['switch_passwords']
     discover_servers_flag = module.params['discover_servers']
     discover_switches_flag = module.params['discover_switches']
-
-    logger.info(f"Module parameters - interface: {interface}, target_nodes: {target_nodes}, discover_servers: {discover_servers_flag}, discover_switches: {discover_switches_flag}")
+    engine = module.params['engine']
+    single_pass = module.params['single_pass']
+
+    identity_cache = None
+    if module.params['use_identity_cache']:
+        identity_cache = IdentityCache(module.params['identity_cache_path'], module.params['identity_cache_ttl'])
+        if module.params['invalidate_identity_cache']:
+            log_debug("Invalidating identity cache")
+            identity_cache.invalidate()
+    max_in_flight = module.params['max_in_flight']
+    host_timeout = module.params['host_timeout']
+    sweep_window = module.params['sweep_window']
+    incremental = module.params['incremental']
+
+    logger.info(f"Module parameters - interface: {interface}, target_nodes: {target_nodes}, discover_servers: {discover_servers_flag}, discover_switches: {discover_switches_flag}, engine: {engine}, single_pass: {single_pass}")
     logger.info(f"Authentication - server usernames: {len(usernames)}, server passwords: {len(passwords)}, switch usernames: {len(switch_usernames)}, switch passwords: {len(switch_passwords)}")
 
     try:
@@ -557,40 +722,102 @@ def run_module():
         else:
             logger.info("Starting IPv6 device discovery...")
             log_debug("Starting module execution...")
-            ipv6_devices = get_ipv6_neighbors(interface)
+            with run_trace.span('sweep'):
+                ipv6_devices = get_ipv6_neighbors(interface, sweep_window)
         
         logger.info(f"Found {len(ipv6_devices)} IPv6 devices")
         
         if not ipv6_devices:
             logger.warning("No IPv6 devices found")
             result['message'] = 'No IPv6 devices found'
+            result['trace'] = tracer.finish()
             log_debug("No IPv6 devices found, exiting")
             module.exit_json(**result)
 
+        swept_devices = list(ipv6_devices)
+        reused = []
+        if incremental:
+            device_classes = [device_class for device_class, enabled in
+                              (('server', discover_servers_flag), ('switch', discover_switches_flag)) if enabled]
+            discovery_state = DiscoveryState({'server': list(itertools.product(usernames, passwords)),
+                                              'switch': list(itertools.product(switch_usernames, switch_passwords))},
+                                             module.params['discovery_state_path'])
+            known, ipv6_devices = discovery_state.plan(swept_devices, device_classes)
+            with run_trace.span('revalidate'):
+                reused, unanswered = discovery_state.revalidate(known)
+            ipv6_devices += unanswered
+            logger.info(f"Incremental discovery: reusing {len(reused)} known devices, probing {len(ipv6_devices)}")
+
         log_debug(f"Found {len(ipv6_devices)} IPv6 devices, starting discovery...")
 
-        # Discover servers
+        if not ipv6_devices:
+            servers, switches = [], []
+        elif engine == 'async':
+            log_debug(f"Starting async discovery, max_in_flight={max_in_flight}, host_timeout={host_timeout}s")
+            async_engine = AsyncDiscoveryEngine(identify_server, identify_switch,
+                                                max_in_flight=max_in_flight, host_timeout=host_timeout,
+                                                identity_cache=identity_cache,
+                                                verify_server=verify_server, verify_switch=verify_switch)
+            servers, switches = async_engine.discover(
+                ipv6_devices,
+                list(itertools.product(usernames, passwords)),
+                list(itertools.product(switch_usernames, switch_passwords)),
+                discover_servers=discover_servers_flag,
+                discover_switches=discover_switches_flag,
+                single_pass=single_pass)
+        elif single_pass:
+            servers, switches = discover_neighbors(ipv6_devices, usernames, passwords,
+                                                   switch_usernames, switch_passwords,
+                                                   discover_servers_flag, discover_switches_flag,
+                                                   identity_cache)
+        else:
+            servers, switches = [], []
+
+            # Discover servers
+            if discover_servers_flag:
+                log_debug("Starting server discovery phase...")
+                servers = discover_servers(ipv6_devices, usernames, passwords, identity_cache)
+
+            # Discover switches
+            if discover_switches_flag:
+                log_debug("Starting switch discovery phase...")
+                switches = discover_switches(ipv6_devices, switch_usernames, switch_passwords, identity_cache)
+
+        if incremental:
+            # Known devices first get their place back in sweep order
+            order = dict((address, index) for index, address in enumerate(swept_devices))
+            servers = sorted([r for c, r in reused if c == 'server'] + servers,
+                             key=lambda r: order.get(r['host'], len(order)))
+            switches = sorted([r for c, r in reused if c == 'switch'] + switches,
+                              key=lambda r: order.get(r['host'], len(order)))
+            delta = discovery_state.update([('server', server) for server in servers] +
+                                           [('switch', switch) for switch in switches],
+                                           device_classes, scope=swept_devices if target_nodes else None)
+            discovery_state.save()
+            result.update(delta)
+            result['message'] += (f"{len(delta['added'])} added, {len(delta['removed'])} removed, "
+                                  f"{len(delta['unchanged'])} unchanged. ")
+
         if discover_servers_flag:
-            log_debug("Starting server discovery phase...")
-            servers = discover_servers(ipv6_devices, usernames, passwords)
             result['servers'] = servers
             result['message'] += f'Found {len(servers)} servers. '
-
-        # Discover switches
         if discover_switches_flag:
-            log_debug("Starting switch discovery phase...")
-            switches = discover_switches(ipv6_devices, switch_usernames, switch_passwords)
             result['switches'] = switches
             result['message'] += f'Found {len(switches)} switches.'
 
+        if identity_cache is not None:
+            identity_cache.save()
+
         log_debug("Discovery complete, preparing results...")
         result['changed'] = True
 
     except Exception as e:
         log_debug(f"Exception in module execution: {e}")
+        result['trace'] = tracer.finish()
         module.fail_json(msg=f'Discovery failed: {str(e)}', **result)
 
     # Exit with results
+    result['trace'] = tracer.finish()
     module.exit_json(**result)
 
 def main():
@@ -1,10 +1,9 @@
 #!/usr/bin/python
 
 from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils import toolkit_logging
 import json
 import logging
-import os
-from datetime import datetime
 
 try:
     from prettytable import PrettyTable
@@ -12,36 +11,7 @@ try:
 except ImportError:
     HAS_PRETTYTABLE = False
 
-# Setup logging
-def setup_logging():
-    """Setup logging to file with timestamp"""
-    # Use a fixed logs directory path - avoid using module path during Ansible execution
-    logs_dir = "/home/ubuntu/smci/ansible-toolkit/toolkit/logs"
-    
-    # Ensure logs directory exists
-    os.makedirs(logs_dir, exist_ok=True)
-    
-    # Create log filename with timestamp
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    log_filename = f"display_discovery_table_{timestamp}.log"
-    log_path = os.path.join(logs_dir, log_filename)
-    
-    # Configure logging
-    logging.basicConfig(
-        level=logging.DEBUG,
-        format='%(asctime)s - %(levelname)s - %(message)s',
-        handlers=[
-            logging.FileHandler(log_path),
-            logging.StreamHandler()  # Also log to stderr for immediate visibility
-        ]
-    )
-    
-    logger = logging.getLogger(__name__)
-    logger.info(f"Display module logging initialized. Log file: {log_path}")
-    return logger
-
-# Initialize logger
-logger = setup_logging()
+logger = logging.getLogger(__name__)
 
 def display_servers_table(servers):
     """Display servers in a pretty table format similar to original autodiscover.py"""
@@ -108,13 +78,14 @@ def display_switches_table(switches):
     return str(table)
 
 def main():
-    logger.info("Starting display_discovery_table module")
-    
     module_args = dict(
         servers=dict(type='list', required=False, default=[]),
         switches=dict(type='list', required=False, default=[]),
         display_servers=dict(type='bool', required=False, default=True),
-        display_switches=dict(type='bool', required=False, default=True)
+        display_switches=dict(type='bool', required=False, default=True),
+        log_level=dict(type='str', required=False, default=toolkit_logging.DEFAULT_LEVEL,
+                       choices=list(toolkit_logging.LEVELS)),
+        log_dir=dict(type='str', required=False, default=toolkit_logging.DEFAULT_LOG_DIR)
     )
 
     result = dict(
@@ -129,6 +100,9 @@ def main():
         supports_check_mode=True
     )
 
+    toolkit_logging.configure('display_discovery_table', module.params['log_level'], module.params['log_dir'])
+    logger.info("Starting display_discovery_table module")
+
     if not HAS_PRETTYTABLE:
         logger.error("prettytable library is not available")
         module.fail_json(msg="prettytable library is required for this module")
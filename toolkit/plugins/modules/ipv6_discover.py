@@ -2,12 +2,13 @@
 #working code 
 import itertools
 import socket
-import requests
-import multiprocessing
 from subprocess import Popen, PIPE
 from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils.async_discovery import thread_starmap
+from ansible.module_utils.identity_cache import IdentityCache, pick_credentials, DEFAULT_CACHE_PATH, DEFAULT_TTL
+from ansible.module_utils.neighbor_sweep import sweep, DEFAULT_WINDOW
+from ansible.module_utils.redfish_client import RedfishClient
 import os
-import subprocess
 import logging
 
 # Setup logging
@@ -21,6 +22,9 @@ logging.basicConfig(
 
 logging.debug("Starting custom IPv6 discovery module.")
 
+# Threads, one per credential combination up to this many
+DISCOVERY_MAX_WORKERS = 64
+
 def get_nic_interfaces():
     """Get all non-loopback and UP NIC interfaces from /sys/class/net"""
     interfaces = []
@@ -41,40 +45,22 @@ def get_nic_interfaces():
     return interfaces
 
 
-def ping_and_discover(interface):
-    """Ping ff02::1 on a given interface and parse neighbors"""
-    discovered = []
-    try:
-        cmd = ['ping6', '-c', '2', f'ff02::1%{interface}']
-        logging.info(f"Pinging from interface {interface}")
-        result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=10)
-        output = result.stdout.decode()
-        logging.info(f"Output  {output}")
-
-        for line in output.splitlines():
-            if line.startswith("64 bytes from fe80:"):
-                # Extract the source address
-                parts = line.split()
-                ipv6_address = parts[3].rstrip(':') 
-                discovered.append(ipv6_address)
-                logging.info(f"Discovered neighbor: {ipv6_address}")
-    except Exception as e:
-        raise RuntimeError(f"Failed to discover IPv6 neighbors on {interface}: {str(e)}")
-        
-    return discovered
-
-
-def discoverNodes(IPv6nodes, usernames=['ADMIN'], passwords=['cmb9.admin']):
+def discoverNodes(IPv6nodes, usernames=['ADMIN'], passwords=['cmb9.admin'],
+                  identity_cache_path=DEFAULT_CACHE_PATH, identity_cache_ttl=DEFAULT_TTL):
     logging.info(f"Starting Node Discovery against {len(IPv6nodes)} devices.")
     logging.info("disocvering nodes")
-    combinations = list(itertools.product(IPv6nodes, usernames, passwords))
-    pool = multiprocessing.Pool(processes=30)
-    results = pool.starmap(discoverNodeType, combinations)
-    pool.close()
-    pool.join()
+    # Nodes with a fresh identity cache entry only get the credential that worked last
+    cache = IdentityCache(identity_cache_path, identity_cache_ttl) if identity_cache_path else None
+    credentials = list(itertools.product(usernames, passwords))
+    combinations = []
+    for IPv6node in IPv6nodes:
+        for index, (username, password) in pick_credentials(cache, IPv6node, credentials, 'server'):
+            combinations.append((IPv6node, username, password, index, identity_cache_path, identity_cache_ttl))
+    results = thread_starmap(discoverNodeType, combinations, DISCOVERY_MAX_WORKERS)
     return [x for x in results if x is not None]
 
-def discoverNodeType(IPv6node, username, password):
+def discoverNodeType(IPv6node, username, password, credential_index=None,
+                     identity_cache_path=None, identity_cache_ttl=DEFAULT_TTL):
     logging.info("discovering node type...")
     try:
         logging.info("discovering node type...")
@@ -91,24 +77,17 @@ def discoverNodeType(IPv6node, username, password):
         logging.error(f"Socket error for {IPv6node}: {e}")
         return None
 
-    #redfishapi = f'https://[{IPv6node.replace("%", "%25")}]/redfish/v1/'
-    redfishapi = f'https://[{IPv6node.replace("%", "%25")}]/redfish/v1/Systems/'
-    redfishheader = {
-        'Content-Type': 'application/json',
-        'User-Agent': 'curl/7.54.0',
-        'Host': f'[{IPv6node.split("%")[0]}]'
-    }
-
     #passwords = [password, lawcompliance.passwordencode(IPv6node, getPassword())]
     passwords = [password,password]
     session = None
+    client = None
     members = None
 
     for pwd in passwords:
         try:
             logging.info("creating session ...")
-            session = requests.get(redfishapi + '1', auth=(username, pwd), verify=False,
-                                   headers=redfishheader, timeout=30)
+            client = RedfishClient(IPv6node, username, pwd, timeout=30)
+            session = client.get('/redfish/v1/Systems/1')
             logging.info(f"session ......{session}")
             j = session.json()
             logging.info(f"j of session : {j}")
@@ -129,16 +108,23 @@ def discoverNodeType(IPv6node, username, password):
     if not members:
         return None
 
-    try:
-        for member in members:
-            redfishapi = f'https://[{IPv6node.replace("%", "%25")}]{member["@odata.id"]}'
-            logging.info(f"redfish api resp for: {member} {redfishapi} ")
-            break
-        session = requests.get(redfishapi, auth=(username, password), verify=False,
-                               headers=redfishheader, timeout=30)
-        j = session.json()
-    except:
-        return None
+    # Credentials work; skip the SKU fetch when the cache already knows this node
+    cache = IdentityCache(identity_cache_path, identity_cache_ttl) if identity_cache_path else None
+    entry = cache.lookup(IPv6node, 'server') if cache else None
+    if entry and entry.get('username') == username:
+        logging.info(f"Identity cache hit for {IPv6node}")
+        j = {'SKU': entry['identity'].get('sku', ''), 'Model': entry['identity'].get('model', ''),
+             'SerialNumber': entry['identity'].get('serial_number', '')}
+    else:
+        try:
+            for member in members:
+                redfishapi = member["@odata.id"]
+                logging.info(f"redfish api resp for: {member} {client.url(redfishapi)} ")
+                break
+            session = client.get(redfishapi)
+            j = session.json()
+        except:
+            return None
 
     try:
         SKU = j['SKU']
@@ -147,6 +133,11 @@ def discoverNodeType(IPv6node, username, password):
         logging.error(f"Missing SKU/Model for {IPv6node}")
         return None
 
+    if cache is not None and not entry and ('Q72D' in SKU or "Super" in model):
+        cache.record(IPv6node, 'server', credential_index, username,
+                     {'model': model, 'sku': SKU, 'serial_number': j.get('SerialNumber', '')})
+        cache.save()
+
     
     if 'Q72D' in SKU:
         logging.info("other node discovered...")
@@ -163,6 +154,10 @@ def run_module():
     logging.debug("Starting run module.")
     module_args = dict(
         interface=dict(type='str', required=False, default=None),
+        sweep_window=dict(type='float', required=False, default=DEFAULT_WINDOW),
+        use_identity_cache=dict(type='bool', required=False, default=True),
+        identity_cache_path=dict(type='str', required=False, default=DEFAULT_CACHE_PATH),
+        identity_cache_ttl=dict(type='int', required=False, default=DEFAULT_TTL),
     )
 
     result = dict(
@@ -182,17 +177,17 @@ def run_module():
 
         result['interfaces'] = interfaces
 
-        all_neighbors = []
-        for iface in interfaces:
-            neighbors = ping_and_discover(iface)
-            all_neighbors.extend(neighbors)
-
-        unique_neighbors = list(set(all_neighbors))
-        result['ipv6_neighbors'] = list(set(all_neighbors))
+        # All interfaces are swept at once; the result is already deduplicated
+        unique_neighbors = sweep(interfaces, window=module.params['sweep_window'])
+        for neighbor in unique_neighbors:
+            logging.info(f"Discovered neighbor: {neighbor}")
+        result['ipv6_neighbors'] = unique_neighbors
 
         logging.info("calling discover nodes...")
         # Node discovery and classification
-        nodes = discoverNodes(unique_neighbors)
+        cache_path = module.params['identity_cache_path'] if module.params['use_identity_cache'] else None
+        nodes = discoverNodes(unique_neighbors, identity_cache_path=cache_path,
+                              identity_cache_ttl=module.params['identity_cache_ttl'])
         result['nodes_discovered'] = [str(node) for node in nodes]  # Customize as needed
 
     except Exception as e:
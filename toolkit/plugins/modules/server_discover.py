@@ -4,11 +4,12 @@ from __future__ import absolute_import, division, print_function
 __metaclass__ = type
 
 import socket
-import requests
 import logging
 import os
 from datetime import datetime
 from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils.identity_cache import IdentityCache
+from ansible.module_utils.redfish_client import RedfishClient
 
 DOCUMENTATION = r'''
 ---
@@ -34,6 +35,30 @@ options:
     required: false
     default: cmb9.admin
     type: str
+  use_identity_cache:
+    description:
+      - Skip the SKU/model read when the identity cache has a fresh entry for this device.
+    required: false
+    default: true
+    type: bool
+  identity_cache_path:
+    description:
+      - Location of the identity cache file shared with ansibleautodiscover.
+    required: false
+    default: /tmp/ansible_toolkit/identity_cache.json
+    type: str
+  identity_cache_ttl:
+    description:
+      - Seconds a cache entry is trusted.
+    required: false
+    default: 3600
+    type: int
+  invalidate_identity_cache:
+    description:
+      - Drop the cache entry for this device before querying it.
+    required: false
+    default: false
+    type: bool
 author:
   - Your Name
 '''
@@ -77,7 +102,11 @@ def main():
         argument_spec=dict(
             ipv6_address=dict(required=True, type='str'),
             username=dict(required=False, type='str', default='admin'),
-            password=dict(required=False, type='str', default='cmb9.admin')
+            password=dict(required=False, type='str', default='cmb9.admin'),
+            use_identity_cache=dict(required=False, type='bool', default=True),
+            identity_cache_path=dict(required=False, type='str', default='/tmp/ansible_toolkit/identity_cache.json'),
+            identity_cache_ttl=dict(required=False, type='int', default=3600),
+            invalidate_identity_cache=dict(required=False, type='bool', default=False)
         ),
         supports_check_mode=True
     )
@@ -88,6 +117,13 @@ def main():
 
     logging.info(f"Starting discovery for {ipv6_address}")
 
+    identity_cache = None
+    if module.params['use_identity_cache']:
+        identity_cache = IdentityCache(module.params['identity_cache_path'], module.params['identity_cache_ttl'])
+        if module.params['invalidate_identity_cache']:
+            identity_cache.invalidate(ipv6_address)
+            identity_cache.save()
+
     try:
         # Check IPMI UDP port 623
         addrinfo = socket.getaddrinfo(ipv6_address, 623, socket.AF_INET6, socket.SOCK_DGRAM)
@@ -103,16 +139,11 @@ def main():
 
         logging.info("IPMI port check passed.")
 
-        # Redfish base query
-        redfishapi = f"https://[{ipv6_address.replace('%', '%25')}]/redfish/v1/Systems"
-        headers = {
-            'Content-Type': 'application/json',
-            'User-Agent': 'curl/7.54.0',
-            'Host': f"[{ipv6_address.split('%')[0]}]"
-        }
+        # Redfish base query; both GETs below share one keep-alive connection
+        client = RedfishClient(ipv6_address, username, password, timeout=10)
 
-        logging.debug(f"Querying Redfish base API: {redfishapi}")
-        response = requests.get(redfishapi, auth=(username, password), headers=headers, verify=False, timeout=10)
+        logging.debug(f"Querying Redfish base API: {client.url('/redfish/v1/Systems')}")
+        response = client.get('/redfish/v1/Systems')
 
         if not response.ok:
             msg = f"Failed Redfish login for {ipv6_address}, status={response.status_code}"
@@ -127,15 +158,24 @@ def main():
             logging.error(msg)
             module.fail_json(msg=msg)
 
-        # Query first system
-        system_url = f"https://[{ipv6_address.replace('%', '%25')}]{j['Members'][0]['@odata.id']}"
-        logging.debug(f"Querying Redfish system URL: {system_url}")
-        response = requests.get(system_url, auth=(username, password), headers=headers, verify=False, timeout=10)
-        j = response.json()
-        logging.debug(f"System info response: {j}")
+        # Credentials are valid; a fresh cache entry already has the SKU and model
+        entry = identity_cache.lookup(ipv6_address, 'server') if identity_cache else None
+        if entry and entry.get('username') == username:
+            logging.info(f"Identity cache hit for {ipv6_address}, skipping system query")
+            SKU = entry['identity'].get('sku', '')
+            model = entry['identity'].get('model', '')
+            serial = entry['identity'].get('serial_number', '')
+        else:
+            # Query first system
+            system_url = j['Members'][0]['@odata.id']
+            logging.debug(f"Querying Redfish system URL: {client.url(system_url)}")
+            response = client.get(system_url)
+            j = response.json()
+            logging.debug(f"System info response: {j}")
 
-        SKU = j.get('SKU', '')
-        model = j.get('Model', '')
+            SKU = j.get('SKU', '')
+            model = j.get('Model', '')
+            serial = j.get('SerialNumber', '')
 
         # Server type mapping
         if 'Advanced Server DS120_S5B-MB' in SKU:
@@ -160,6 +200,10 @@ def main():
             server_type = f"Unknown ({SKU})" if SKU else "Unknown"
 
         logging.info(f"Identified: server_type={server_type}, model={model}, SKU={SKU}")
+        if identity_cache is not None and not entry:
+            identity_cache.record(ipv6_address, 'server', None, username,
+                                  {'model': model, 'sku': SKU, 'serial_number': serial})
+            identity_cache.save()
         module.exit_json(changed=False, server_type=server_type, SKU=SKU, model=model)
 
     except Exception as e:
@@ -31,6 +31,25 @@ options:
         required: false
         default: 30
         type: int
+    max_parallel:
+        description:
+        - Number of servers worked on at the same time
+        - Each server uses its own ilorest cache directory, so sessions do not interfere
+        required: false
+        default: 8
+        type: int
+    server_timeout:
+        description:
+        - Seconds allowed for a single server; commands still running when it expires are killed and the server is reported as failed
+        required: false
+        type: int
+    trace_dir:
+        description:
+        - Directory for the run's JSON-lines trace, one line per timed phase per server
+        - Empty to only return the summary in I(trace)
+        required: false
+        default: "/tmp/ansible_toolkit/traces"
+        type: str
 
 author:
     - Ansible Toolkit Team
@@ -59,12 +78,29 @@ server_details:
     type: dict
     returned: always
     sample: {"10.1.1.1": {"status": "accessible", "model": "HA810", "power_state": "On"}}
+trace:
+    description: Seconds spent per phase (server, ilorest_login, ilorest_serverstatus) and the slowest servers
+    type: dict
+    returned: always
+    sample: {
+        "run_id": "server_status_checker-20250101-120000-4242",
+        "trace_file": "/tmp/ansible_toolkit/traces/server_status_checker-20250101-120000-4242.jsonl",
+        "seconds": 11.3,
+        "phases": {"server": {"count": 4, "seconds": 38.7, "max": 11.1, "errors": 0},
+                   "ilorest_login": {"count": 4, "seconds": 25.0, "max": 7.2, "errors": 0},
+                   "ilorest_serverstatus": {"count": 4, "seconds": 13.4, "max": 3.8, "errors": 0}},
+        "slowest_hosts": [{"host": "10.1.1.2", "seconds": 11.1,
+                           "phases": {"server": 11.1, "ilorest_login": 7.2, "ilorest_serverstatus": 3.8}}]
+    }
 '''
 
 import csv
 import subprocess
 import os
 from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils import run_trace
+from ansible.module_utils.ilorest_session import ilorest_cmd
+from ansible.module_utils.server_executor import run_per_server, run_command, ServerTimeout
 
 
 def read_servers_csv(csv_file):
@@ -90,8 +126,8 @@ def check_server_status(server, ilorest_path, timeout):
         password = server['password']
         
         # Login command with timeout
-        login_cmd = [ilorest_path, 'login', ipaddress, '-u', username, '-p', password]
-        result = subprocess.run(login_cmd, capture_output=True, text=True, 
+        login_cmd = ilorest_cmd(ilorest_path, ipaddress, 'login', ipaddress, '-u', username, '-p', password)
+        result = run_command(login_cmd, capture_output=True, text=True, 
                               shell=False, timeout=timeout)
         
         if result.returncode != 0:
@@ -103,8 +139,8 @@ def check_server_status(server, ilorest_path, timeout):
             }
         
         # Get server info if login successful
-        info_cmd = [ilorest_path, 'serverstatus']
-        info_result = subprocess.run(info_cmd, capture_output=True, text=True,
+        info_cmd = ilorest_cmd(ilorest_path, ipaddress, 'serverstatus')
+        info_result = run_command(info_cmd, capture_output=True, text=True,
                                    shell=False, timeout=timeout)
         
         # Parse basic info from output
@@ -127,7 +163,7 @@ def check_server_status(server, ilorest_path, timeout):
             'power_state': power_state
         }
         
-    except subprocess.TimeoutExpired:
+    except (subprocess.TimeoutExpired, ServerTimeout):
         return {
             'status': 'timeout',
             'error': 'Connection timed out',
@@ -148,6 +184,9 @@ def main():
         argument_spec=dict(
             servers_csv=dict(required=True, type='str'),
             ilorest_path=dict(required=False, default='ilorest', type='str'),
+            max_parallel=dict(required=False, default=8, type='int'),
+            server_timeout=dict(required=False, type='int'),
+            trace_dir=dict(required=False, default=run_trace.DEFAULT_TRACE_DIR, type='str'),
             timeout=dict(required=False, default=30, type='int'),
         ),
         supports_check_mode=True,
@@ -155,6 +194,8 @@ def main():
 
     servers_csv = module.params['servers_csv']
     ilorest_path = module.params['ilorest_path']
+    max_parallel = module.params['max_parallel']
+    server_timeout = module.params['server_timeout']
     timeout = module.params['timeout']
 
     # Read servers from CSV
@@ -166,13 +207,24 @@ def main():
         module.exit_json(changed=False, 
                         msg=f"Would check status of {len(servers)} servers")
 
+    tracer = run_trace.start('server_status_checker', module.params['trace_dir'])
+
     accessible_servers = []
     inaccessible_servers = []
     server_details = {}
 
     # Check status of each server
-    for server in servers:
-        status_info = check_server_status(server, ilorest_path, timeout)
+    outcomes = run_per_server(
+        lambda server: check_server_status(server, ilorest_path, timeout),
+        servers, max_parallel, server_timeout,
+        on_error=lambda server, message: {
+            'status': 'error',
+            'error': message,
+            'model': 'Unknown',
+            'power_state': 'Unknown'
+        }
+    )
+    for server, status_info in outcomes:
         server_ip = server['ipaddress']
         
         server_details[server_ip] = status_info
@@ -192,6 +244,7 @@ def main():
         'server_details': server_details,
         'msg': f"Checked {len(servers)} servers: {len(accessible_servers)} accessible, {len(inaccessible_servers)} inaccessible"
     }
+    result['trace'] = tracer.finish()
 
     module.exit_json(**result)
 
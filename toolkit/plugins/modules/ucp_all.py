@@ -54,6 +54,14 @@ options:
         required: false
         default: "ilorest"
         type: str
+    backend:
+        description:
+        - How iLO actions are sent
+        - C(ilorest) runs the ilorest CLI for every step; C(redfish) calls the iLO Redfish API in-process
+        required: false
+        default: "ilorest"
+        choices: ["ilorest", "redfish"]
+        type: str
     manage_nginx:
         description:
         - Whether to manage nginx web server
@@ -66,6 +74,39 @@ options:
         required: false
         default: false
         type: bool
+    max_parallel:
+        description:
+        - Number of servers worked on at the same time
+        - Each server uses its own ilorest cache directory, so sessions do not interfere
+        - Servers move through the stages independently, so the whole rack can be in flight at once
+        required: false
+        default: 8
+        type: int
+    stage_limits:
+        description:
+        - Maximum number of servers in a stage at the same time, by stage name
+        - Stages are C(bios), C(bios_reboot), C(mount_spv) and C(final_reboot); unlisted stages are only bounded by I(max_parallel)
+        required: false
+        default: {}
+        type: dict
+    boot_timeout:
+        description:
+        - Seconds to wait for a server to get through POST after the BIOS reboot, polling its Redfish power and POST state
+        required: false
+        default: 1800
+        type: int
+    server_timeout:
+        description:
+        - Seconds allowed for a single server; commands still running when it expires are killed and the server is reported as failed
+        required: false
+        type: int
+    trace_dir:
+        description:
+        - Directory for the run's JSON-lines trace, one line per timed phase per server
+        - Empty to only return the summary in I(trace)
+        required: false
+        default: "/tmp/ansible_toolkit/traces"
+        type: str
 
 author:
     - Ansible Toolkit Team
@@ -87,6 +128,18 @@ EXAMPLES = r'''
     spv_url_g2: "http://10.1.1.100:8080/spv_g2.iso"
     spv_url_g3: "http://10.1.1.100:8080/spv_g3.iso"
     kickstart_url: "http://10.1.1.100:8080/azureshci.iso"
+
+- name: Build a full rack, limiting BIOS loads to 8 servers at a time
+  ucp_all:
+    servers_csv: "/path/to/servers.csv"
+    solution_type: "10"
+    spv_url_g2: "http://10.1.1.100:8080/spv_g2.iso"
+    spv_url_g3: "http://10.1.1.100:8080/spv_g3.iso"
+    kickstart_url: "http://10.1.1.100:8080/suse.iso"
+    backend: redfish
+    max_parallel: 32
+    stage_limits:
+      bios: 8
 '''
 
 RETURN = r'''
@@ -105,13 +158,50 @@ bios_templates_applied:
     type: dict
     returned: always
     sample: {"10.1.1.1": "HA_G2_Intel_HA810_HA820_G2.json"}
+stage_seconds:
+    description: Seconds each configured server spent in each stage
+    type: dict
+    returned: always
+    sample: {"10.1.1.1": {"bios": 21.4, "bios_reboot": 412.0, "mount_spv": 6.2, "final_reboot": 3.1}}
+trace:
+    description: Seconds spent per phase (server; the bios, bios_reboot, mount_spv and final_reboot stages; the ilorest
+      commands or Redfish actions inside them; wait_bios_pending and wait_boot) and the slowest servers
+    type: dict
+    returned: always
+    sample: {
+        "run_id": "ucp_all-20250101-120000-4242",
+        "trace_file": "/tmp/ansible_toolkit/traces/ucp_all-20250101-120000-4242.jsonl",
+        "seconds": 912.4,
+        "phases": {"server": {"count": 8, "seconds": 5210.3, "max": 905.1, "errors": 0},
+                   "bios_reboot": {"count": 8, "seconds": 4432.7, "max": 771.0, "errors": 0},
+                   "wait_boot": {"count": 8, "seconds": 4391.5, "max": 765.2, "errors": 0},
+                   "bios": {"count": 8, "seconds": 398.6, "max": 61.9, "errors": 0},
+                   "ilorest_load": {"count": 8, "seconds": 201.4, "max": 31.8, "errors": 0},
+                   "mount_spv": {"count": 8, "seconds": 175.5, "max": 29.7, "errors": 0},
+                   "ilorest_login": {"count": 16, "seconds": 112.8, "max": 8.2, "errors": 0},
+                   "ilorest_virtualmedia": {"count": 16, "seconds": 101.2, "max": 9.3, "errors": 0},
+                   "wait_bios_pending": {"count": 8, "seconds": 74.1, "max": 14.0, "errors": 0},
+                   "ilorest_reboot": {"count": 16, "seconds": 68.9, "max": 5.4, "errors": 0},
+                   "final_reboot": {"count": 8, "seconds": 36.1, "max": 5.4, "errors": 0}},
+        "slowest_hosts": [{"host": "10.1.1.7", "seconds": 905.1,
+                           "phases": {"server": 905.1, "bios": 61.9, "ilorest_login": 16.1, "ilorest_load": 31.8,
+                                      "wait_bios_pending": 14.0, "bios_reboot": 771.0, "ilorest_reboot": 10.6,
+                                      "wait_boot": 765.2, "mount_spv": 29.7, "ilorest_virtualmedia": 13.4,
+                                      "final_reboot": 5.4}}]
+    }
 '''
 
 import csv
+import functools
 import subprocess
 import os
 import time
 from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils import run_trace
+from ansible.module_utils import readiness, redfish_actions
+from ansible.module_utils.ilorest_session import ilorest_shell
+from ansible.module_utils.server_executor import run_command
+from ansible.module_utils.server_pipeline import Pipeline
 
 
 def read_servers_csv(csv_file):
@@ -187,7 +277,7 @@ def get_spv_url_for_server(model, spv_url_g2, spv_url_g3):
 def execute_command_safely(cmd, server_ip, description=""):
     """Execute command with error handling"""
     try:
-        result = subprocess.run(cmd, shell=True, capture_output=True, text=True)
+        result = run_command(cmd, shell=True, capture_output=True, text=True)
         if result.returncode != 0:
             return False, f"{description} failed: {result.stderr}"
         return True, f"{description} successful"
@@ -195,61 +285,97 @@ def execute_command_safely(cmd, server_ip, description=""):
         return False, f"{description} exception: {str(e)}"
 
 
-def configure_server_complete(server, solution_type, spv_url_g2, spv_url_g3, kickstart_url,
-                            templates_directory, ilorest_path, skip_bios_reboot):
-    """Complete configuration of a single server"""
-    try:
-        ipaddress = server['ipaddress']
-        username = server['username']
-        password = server['password']
-        model = server.get('model', 'Unknown')
-        
-        # Step 1: Login
-        login_cmd = f'{ilorest_path} login {ipaddress} -u {username} -p {password}'
-        success, message = execute_command_safely(login_cmd, ipaddress, "Login")
-        if not success:
-            return False, message, None
-        
-        # Step 2: Apply BIOS template
-        template_file = get_bios_template_for_solution(model, solution_type, templates_directory)
-        if not os.path.exists(template_file):
-            return False, f"Template file not found: {template_file}", None
-        
-        bios_cmd = f'{ilorest_path} load -f {template_file}'
-        success, message = execute_command_safely(bios_cmd, ipaddress, "BIOS template load")
-        if not success:
-            return False, message, template_file
-        
-        time.sleep(5)  # Wait after BIOS template application
-        
-        # Step 3: Reboot after BIOS (if not skipped)
-        if not skip_bios_reboot:
-            reboot_cmd = f'{ilorest_path} reboot'
-            success, message = execute_command_safely(reboot_cmd, ipaddress, "BIOS reboot")
-            if not success:
-                return False, message, template_file
-        
-        # Step 4: Remove existing virtual media
-        remove_media_cmd = f'{ilorest_path} virtualmedia 2 --remove'
-        execute_command_safely(remove_media_cmd, ipaddress, "Remove virtual media")
-        
-        # Step 5: Mount SPV image
-        spv_url = get_spv_url_for_server(model, spv_url_g2, spv_url_g3)
-        mount_spv_cmd = f'{ilorest_path} virtualmedia 2 {spv_url} --bootnextreset'
-        success, message = execute_command_safely(mount_spv_cmd, ipaddress, "Mount SPV")
-        if not success:
-            return False, message, template_file
-        
-        # Step 6: Final reboot to boot from SPV
-        final_reboot_cmd = f'{ilorest_path} reboot'
-        success, message = execute_command_safely(final_reboot_cmd, ipaddress, "Final reboot")
-        if not success:
-            return False, message, template_file
-        
-        return True, "Complete configuration successful", os.path.basename(template_file)
-        
-    except Exception as e:
-        return False, str(e), None
+def redfish_client(server, state):
+    """One pooled Redfish client per server, shared by its stages"""
+    if 'client' not in state:
+        state['client'] = redfish_actions.connect(server['ipaddress'], server['username'], server['password'])
+    return state['client']
+
+
+def ilorest_login(server, ilorest_path):
+    ipaddress = server['ipaddress']
+    login_cmd = ilorest_shell(ilorest_path, ipaddress,
+                              f"login {ipaddress} -u {server['username']} -p {server['password']}")
+    return execute_command_safely(login_cmd, ipaddress, "Login")
+
+
+def reboot_server(server, state, opts, description):
+    if opts['backend'] == 'redfish':
+        redfish_actions.reset_system(redfish_client(server, state), 'ForceRestart')
+        return True, f"{description} successful"
+    reboot_cmd = ilorest_shell(opts['ilorest_path'], server['ipaddress'], 'reboot')
+    return execute_command_safely(reboot_cmd, server['ipaddress'], description)
+
+
+def stage_bios(server, state, opts):
+    """Apply the BIOS template for the server model and solution type"""
+    template_file = get_bios_template_for_solution(server.get('model', 'Unknown'), opts['solution_type'],
+                                                   opts['templates_directory'])
+    state['template'] = template_file
+    if not os.path.exists(template_file):
+        return False, f"Template file not found: {template_file}"
+
+    if opts['backend'] == 'redfish':
+        redfish_actions.patch_bios(redfish_client(server, state),
+                                   redfish_actions.bios_attributes_from_template(template_file))
+        return True, "BIOS template load successful"
+
+    success, message = ilorest_login(server, opts['ilorest_path'])
+    if not success:
+        return success, message
+    bios_cmd = ilorest_shell(opts['ilorest_path'], server['ipaddress'], f'load -f {template_file}')
+    success, message = execute_command_safely(bios_cmd, server['ipaddress'], "BIOS template load")
+    if success:
+        # Let iLO stage the settings before the reboot picks them up
+        readiness.settle_bios_load(lambda: redfish_client(server, state), template_file)
+    return success, message
+
+
+def stage_bios_reboot(server, state, opts):
+    """Reboot to apply BIOS settings and wait until the server is through POST"""
+    success, message = reboot_server(server, state, opts, "BIOS reboot")
+    if not success:
+        return success, message
+    readiness.wait_for_boot(redfish_client(server, state), opts['boot_timeout'])
+    return True, "BIOS reboot complete"
+
+
+def stage_mount_spv(server, state, opts):
+    """Replace virtual media with the SPV image for the server generation, booting it on next reset"""
+    ipaddress = server['ipaddress']
+    spv_url = get_spv_url_for_server(server.get('model', 'Unknown'), opts['spv_url_g2'], opts['spv_url_g3'])
+
+    if opts['backend'] == 'redfish':
+        client = redfish_client(server, state)
+        try:
+            redfish_actions.eject_media(client, 2)
+        except redfish_actions.RedfishError:
+            pass  # ilorest path ignores a failed remove as well
+        redfish_actions.insert_media(client, spv_url, 2, boot_next_reset=True)
+        return True, "Mount SPV successful"
+
+    # Log in again: the session from the BIOS stage may have expired during the reboot wait
+    success, message = ilorest_login(server, opts['ilorest_path'])
+    if not success:
+        return success, message
+    remove_media_cmd = ilorest_shell(opts['ilorest_path'], ipaddress, 'virtualmedia 2 --remove')
+    execute_command_safely(remove_media_cmd, ipaddress, "Remove virtual media")
+    mount_spv_cmd = ilorest_shell(opts['ilorest_path'], ipaddress, f'virtualmedia 2 {spv_url} --bootnextreset')
+    return execute_command_safely(mount_spv_cmd, ipaddress, "Mount SPV")
+
+
+def stage_final_reboot(server, state, opts):
+    """Final reboot to boot from SPV"""
+    return reboot_server(server, state, opts, "Final reboot")
+
+
+def build_pipeline(opts, stage_limits):
+    """BIOS -> (BIOS reboot) -> mount SPV -> final reboot, each server moving through on its own"""
+    stages = [('bios', stage_bios)]
+    if not opts['skip_bios_reboot']:
+        stages.append(('bios_reboot', stage_bios_reboot))
+    stages += [('mount_spv', stage_mount_spv), ('final_reboot', stage_final_reboot)]
+    return Pipeline([(name, functools.partial(func, opts=opts)) for name, func in stages], stage_limits)
 
 
 def main():
@@ -262,21 +388,24 @@ def main():
             kickstart_url=dict(required=True, type='str'),
             templates_directory=dict(required=False, default='./HA-G2-G3BiosTemplates', type='str'),
             ilorest_path=dict(required=False, default='ilorest', type='str'),
+            backend=dict(required=False, default='ilorest', choices=['ilorest', 'redfish'], type='str'),
+            max_parallel=dict(required=False, default=8, type='int'),
+            server_timeout=dict(required=False, type='int'),
+            trace_dir=dict(required=False, default=run_trace.DEFAULT_TRACE_DIR, type='str'),
             manage_nginx=dict(required=False, default=True, type='bool'),
             skip_bios_reboot=dict(required=False, default=False, type='bool'),
+            stage_limits=dict(required=False, default={}, type='dict'),
+            boot_timeout=dict(required=False, default=1800, type='int'),
         ),
         supports_check_mode=True,
     )
 
     servers_csv = module.params['servers_csv']
     solution_type = module.params['solution_type']
-    spv_url_g2 = module.params['spv_url_g2']
-    spv_url_g3 = module.params['spv_url_g3']
-    kickstart_url = module.params['kickstart_url']
-    templates_directory = module.params['templates_directory']
-    ilorest_path = module.params['ilorest_path']
+    max_parallel = module.params['max_parallel']
+    server_timeout = module.params['server_timeout']
     manage_nginx = module.params['manage_nginx']
-    skip_bios_reboot = module.params['skip_bios_reboot']
+    stage_limits = module.params['stage_limits']
 
     # Read servers from CSV
     servers, error = read_servers_csv(servers_csv)
@@ -288,6 +417,8 @@ def main():
         module.exit_json(changed=True, 
                         msg=f"Would configure {solution_names.get(solution_type)} on {len(servers)} servers")
 
+    tracer = run_trace.start('ucp_all', module.params['trace_dir'])
+
     # Start nginx if requested
     if manage_nginx:
         manage_nginx_server("start")
@@ -295,24 +426,23 @@ def main():
     configured_servers = []
     failed_servers = []
     bios_templates_applied = {}
+    stage_seconds = {}
 
     try:
-        # Configure each server
-        for server in servers:
-            success, message, template = configure_server_complete(
-                server, solution_type, spv_url_g2, spv_url_g3, kickstart_url,
-                templates_directory, ilorest_path, skip_bios_reboot
-            )
-            
+        # Each server moves through the stages on its own; a reboot wait only holds up that server
+        pipeline = build_pipeline(module.params, stage_limits)
+        outcomes = pipeline.run(servers, max_parallel, server_timeout)
+        for server, (success, detail, extra) in outcomes:
             if success:
                 configured_servers.append(server['ipaddress'])
-                if template:
-                    bios_templates_applied[server['ipaddress']] = template
+                bios_templates_applied[server['ipaddress']] = os.path.basename(detail['template'])
+                stage_seconds[server['ipaddress']] = extra
             else:
                 failed_servers.append({
                     'ipaddress': server['ipaddress'],
                     'model': server.get('model', 'Unknown'),
-                    'error': message
+                    'stage': extra,
+                    'error': detail
                 })
     finally:
         # Stop nginx if we started it
@@ -328,8 +458,10 @@ def main():
         'configured_servers': configured_servers,
         'failed_servers': failed_servers,
         'bios_templates_applied': bios_templates_applied,
+        'stage_seconds': stage_seconds,
         'msg': f"Configured {len(configured_servers)} servers, {len(failed_servers)} failed"
     }
+    result['trace'] = tracer.finish()
 
     if failed_servers and not configured_servers:
         module.fail_json(**result)
@@ -38,12 +38,39 @@ options:
         required: false
         default: "ilorest"
         type: str
+    backend:
+        description:
+        - How iLO actions are sent
+        - C(ilorest) runs the ilorest CLI for every step; C(redfish) calls the iLO Redfish API in-process
+        required: false
+        default: "ilorest"
+        choices: ["ilorest", "redfish"]
+        type: str
     perform_reboot:
         description:
         - Whether to reboot servers after applying BIOS settings
         required: false
         default: true
         type: bool
+    max_parallel:
+        description:
+        - Number of servers worked on at the same time
+        - Each server uses its own ilorest cache directory, so sessions do not interfere
+        required: false
+        default: 8
+        type: int
+    server_timeout:
+        description:
+        - Seconds allowed for a single server; commands still running when it expires are killed and the server is reported as failed
+        required: false
+        type: int
+    trace_dir:
+        description:
+        - Directory for the run's JSON-lines trace, one line per timed phase per server
+        - Empty to only return the summary in I(trace)
+        required: false
+        default: "/tmp/ansible_toolkit/traces"
+        type: str
 
 author:
     - Ansible Toolkit Team
@@ -80,13 +107,33 @@ template_mappings:
     type: dict
     returned: always
     sample: {"10.1.1.1": "HA_G2_Intel_HA810_HA820_G2.json"}
+trace:
+    description: Seconds spent per phase (server, ilorest_login, ilorest_load, wait_bios_pending and ilorest_reboot
+      with I(perform_reboot); redfish_bios_patch and redfish_reset with I(backend=redfish)) and the slowest servers
+    type: dict
+    returned: always
+    sample: {
+        "run_id": "ucp_bios_load-20250101-120000-4242",
+        "trace_file": "/tmp/ansible_toolkit/traces/ucp_bios_load-20250101-120000-4242.jsonl",
+        "seconds": 41.6,
+        "phases": {"server": {"count": 4, "seconds": 158.4, "max": 41.3, "errors": 0},
+                   "ilorest_load": {"count": 4, "seconds": 86.0, "max": 22.5, "errors": 0},
+                   "ilorest_login": {"count": 4, "seconds": 27.1, "max": 7.0, "errors": 0},
+                   "wait_bios_pending": {"count": 4, "seconds": 24.8, "max": 6.9, "errors": 0},
+                   "ilorest_reboot": {"count": 4, "seconds": 19.6, "max": 4.9, "errors": 0}},
+        "slowest_hosts": [{"host": "10.1.1.3", "seconds": 41.3,
+                           "phases": {"server": 41.3, "ilorest_login": 7.0, "ilorest_load": 22.5,
+                                      "wait_bios_pending": 6.9, "ilorest_reboot": 4.9}}]
+    }
 '''
 
 import csv
-import subprocess
 import os
-import time
 from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils import run_trace
+from ansible.module_utils import readiness, redfish_actions
+from ansible.module_utils.ilorest_session import ilorest_cmd
+from ansible.module_utils.server_executor import run_per_server, run_command
 
 
 def read_servers_csv(csv_file):
@@ -132,17 +179,27 @@ def get_bios_template(model, solution_type, templates_directory):
     return os.path.join(templates_directory, template_name)
 
 
-def load_bios_config(server, solution_type, templates_directory, ilorest_path, perform_reboot):
+def load_bios_config(server, solution_type, templates_directory, ilorest_path, perform_reboot, backend='ilorest'):
     """Load BIOS configuration to a single server"""
     try:
         ipaddress = server['ipaddress']
         username = server['username']
         password = server['password']
         model = server.get('model', 'Unknown')
+
+        if backend == 'redfish':
+            template_file = get_bios_template(model, solution_type, templates_directory)
+            if not os.path.exists(template_file):
+                return False, f"Template file not found: {template_file}", None
+            client = redfish_actions.connect(ipaddress, username, password)
+            redfish_actions.patch_bios(client, redfish_actions.bios_attributes_from_template(template_file))
+            if perform_reboot:
+                redfish_actions.reset_system(client, 'ForceRestart')
+            return True, "Successfully loaded BIOS configuration", os.path.basename(template_file)
         
         # Login command
-        login_cmd = [ilorest_path, 'login', ipaddress, '-u', username, '-p', password]
-        result = subprocess.run(login_cmd, capture_output=True, text=True, shell=False)
+        login_cmd = ilorest_cmd(ilorest_path, ipaddress, 'login', ipaddress, '-u', username, '-p', password)
+        result = run_command(login_cmd, capture_output=True, text=True, shell=False)
         if result.returncode != 0:
             return False, f"Login failed: {result.stderr}", None
         
@@ -153,17 +210,17 @@ def load_bios_config(server, solution_type, templates_directory, ilorest_path, p
             return False, f"Template file not found: {template_file}", None
         
         # Load BIOS template
-        load_cmd = [ilorest_path, 'load', '-f', template_file]
-        result = subprocess.run(load_cmd, capture_output=True, text=True, shell=False)
+        load_cmd = ilorest_cmd(ilorest_path, ipaddress, 'load', '-f', template_file)
+        result = run_command(load_cmd, capture_output=True, text=True, shell=False)
         if result.returncode != 0:
             return False, f"BIOS template load failed: {result.stderr}", None
         
-        time.sleep(5)  # Wait a bit after loading
-        
-        # Reboot if requested
+        # Reboot if requested, once iLO shows the loaded settings as pending
         if perform_reboot:
-            reboot_cmd = [ilorest_path, 'reboot']
-            result = subprocess.run(reboot_cmd, capture_output=True, text=True, shell=False)
+            readiness.settle_bios_load(lambda: redfish_actions.connect(ipaddress, username, password),
+                                       template_file)
+            reboot_cmd = ilorest_cmd(ilorest_path, ipaddress, 'reboot')
+            result = run_command(reboot_cmd, capture_output=True, text=True, shell=False)
             if result.returncode != 0:
                 return False, f"Reboot failed: {result.stderr}", template_file
                 
@@ -180,6 +237,10 @@ def main():
             solution_type=dict(required=True, choices=['1', '2'], type='str'),
             templates_directory=dict(required=False, default='./HA-G2-G3BiosTemplates', type='str'),
             ilorest_path=dict(required=False, default='ilorest', type='str'),
+            backend=dict(required=False, default='ilorest', choices=['ilorest', 'redfish'], type='str'),
+            max_parallel=dict(required=False, default=8, type='int'),
+            server_timeout=dict(required=False, type='int'),
+            trace_dir=dict(required=False, default=run_trace.DEFAULT_TRACE_DIR, type='str'),
             perform_reboot=dict(required=False, default=True, type='bool'),
         ),
         supports_check_mode=True,
@@ -189,6 +250,9 @@ def main():
     solution_type = module.params['solution_type']
     templates_directory = module.params['templates_directory']
     ilorest_path = module.params['ilorest_path']
+    backend = module.params['backend']
+    max_parallel = module.params['max_parallel']
+    server_timeout = module.params['server_timeout']
     perform_reboot = module.params['perform_reboot']
 
     # Read servers from CSV
@@ -201,16 +265,21 @@ def main():
         module.exit_json(changed=True, 
                         msg=f"Would load BIOS templates for {solution_name} on {len(servers)} servers")
 
+    tracer = run_trace.start('ucp_bios_load', module.params['trace_dir'])
+
     loaded_servers = []
     failed_servers = []
     template_mappings = {}
 
     # Load BIOS configuration on each server
-    for server in servers:
-        success, message, template = load_bios_config(
-            server, solution_type, templates_directory, ilorest_path, perform_reboot
-        )
-        
+    outcomes = run_per_server(
+        lambda server: load_bios_config(
+            server, solution_type, templates_directory, ilorest_path, perform_reboot, backend
+        ),
+        servers, max_parallel, server_timeout,
+        on_error=lambda server, message: (False, message, None)
+    )
+    for server, (success, message, template) in outcomes:
         if success:
             loaded_servers.append(server['ipaddress'])
             if template:
@@ -232,6 +301,7 @@ def main():
         'template_mappings': template_mappings,
         'msg': f"Loaded BIOS config on {len(loaded_servers)} servers, {len(failed_servers)} failed"
     }
+    result['trace'] = tracer.finish()
 
     if failed_servers and not loaded_servers:
         module.fail_json(**result)
@@ -47,6 +47,25 @@ options:
         required: false
         default: "ilorest"
         type: str
+    max_parallel:
+        description:
+        - Number of servers worked on at the same time
+        - Each server uses its own ilorest cache directory, so sessions do not interfere
+        required: false
+        default: 8
+        type: int
+    server_timeout:
+        description:
+        - Seconds allowed for a single server; commands still running when it expires are killed and the server is reported as failed
+        required: false
+        type: int
+    trace_dir:
+        description:
+        - Directory for the run's JSON-lines trace, one line per timed phase per server
+        - Empty to only return the summary in I(trace)
+        required: false
+        default: "/tmp/ansible_toolkit/traces"
+        type: str
 
 author:
     - Ansible Toolkit Team
@@ -82,12 +101,27 @@ config_files:
     type: list
     returned: always
     sample: ["10.1.1.1_ilorest.json", "10.1.1.2_ilorest.json"]
+trace:
+    description: Seconds spent per phase (server, ilorest_save) and the slowest servers
+    type: dict
+    returned: always
+    sample: {
+        "run_id": "ucp_bios_save-20250101-120000-4242",
+        "trace_file": "/tmp/ansible_toolkit/traces/ucp_bios_save-20250101-120000-4242.jsonl",
+        "seconds": 14.2,
+        "phases": {"server": {"count": 4, "seconds": 48.3, "max": 13.9, "errors": 0},
+                   "ilorest_save": {"count": 4, "seconds": 47.9, "max": 13.8, "errors": 0}},
+        "slowest_hosts": [{"host": "10.1.1.4", "seconds": 13.9,
+                           "phases": {"server": 13.9, "ilorest_save": 13.8}}]
+    }
 '''
 
 import csv
-import subprocess
 import os
 from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils import run_trace
+from ansible.module_utils.ilorest_session import ilorest_cmd
+from ansible.module_utils.server_executor import run_per_server, run_command
 
 
 def read_servers_csv(csv_file):
@@ -125,15 +159,15 @@ def save_bios_config(ilo_ip, ilo_username, ilo_password, output_directory, ilore
         output_file = os.path.join(output_directory, filename)
         
         # Save BIOS command
-        cmd = [
-            ilorest_path, 'save', '--select', 'Bios.',
+        cmd = ilorest_cmd(
+            ilorest_path, ilo_ip, 'save', '--select', 'Bios.',
             '--url', ilo_ip,
             '-u', ilo_username,
             '-p', ilo_password,
             '-f', output_file
-        ]
+        )
         
-        result = subprocess.run(cmd, capture_output=True, text=True, shell=False)
+        result = run_command(cmd, capture_output=True, text=True, shell=False)
         if result.returncode != 0:
             return False, f"BIOS save failed: {result.stderr}", None
             
@@ -152,6 +186,9 @@ def main():
             servers_csv=dict(required=False, type='str'),
             output_directory=dict(required=False, default='.', type='str'),
             ilorest_path=dict(required=False, default='ilorest', type='str'),
+            max_parallel=dict(required=False, default=8, type='int'),
+            server_timeout=dict(required=False, type='int'),
+            trace_dir=dict(required=False, default=run_trace.DEFAULT_TRACE_DIR, type='str'),
         ),
         required_one_of=[
             ('ilo_ip', 'servers_csv'),
@@ -168,6 +205,8 @@ def main():
     servers_csv = module.params['servers_csv']
     output_directory = module.params['output_directory']
     ilorest_path = module.params['ilorest_path']
+    max_parallel = module.params['max_parallel']
+    server_timeout = module.params['server_timeout']
 
     servers = []
     
@@ -183,20 +222,25 @@ def main():
         module.exit_json(changed=False, 
                         msg=f"Would save BIOS configuration from {len(servers)} servers")
 
+    tracer = run_trace.start('ucp_bios_save', module.params['trace_dir'])
+
     saved_configs = []
     failed_servers = []
     config_files = []
 
     # Save BIOS configuration from each server
-    for server in servers:
-        success, message, filename = save_bios_config(
+    outcomes = run_per_server(
+        lambda server: save_bios_config(
             server['ipaddress'], 
             server['username'], 
             server['password'], 
             output_directory, 
             ilorest_path
-        )
-        
+        ),
+        servers, max_parallel, server_timeout,
+        on_error=lambda server, message: (False, message, None)
+    )
+    for server, (success, message, filename) in outcomes:
         if success:
             saved_configs.append(server['ipaddress'])
             if filename:
@@ -217,6 +261,7 @@ def main():
         'config_files': config_files,
         'msg': f"Saved BIOS config from {len(saved_configs)} servers, {len(failed_servers)} failed"
     }
+    result['trace'] = tracer.finish()
 
     if failed_servers and not saved_configs:
         module.fail_json(**result)
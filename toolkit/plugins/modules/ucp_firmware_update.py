@@ -37,6 +37,25 @@ options:
         required: false
         default: true
         type: bool
+    max_parallel:
+        description:
+        - Number of servers worked on at the same time
+        - Each server uses its own ilorest cache directory, so sessions do not interfere
+        required: false
+        default: 8
+        type: int
+    server_timeout:
+        description:
+        - Seconds allowed for a single server; commands still running when it expires are killed and the server is reported as failed
+        required: false
+        type: int
+    trace_dir:
+        description:
+        - Directory for the run's JSON-lines trace, one line per timed phase per server
+        - Empty to only return the summary in I(trace)
+        required: false
+        default: "/tmp/ansible_toolkit/traces"
+        type: str
 
 author:
     - Ansible Toolkit Team
@@ -61,6 +80,20 @@ failed_servers:
     type: list
     returned: always
     sample: []
+trace:
+    description: Seconds spent per phase (server, ilorest_login, ilorest_firmwareupdate) and the slowest servers
+    type: dict
+    returned: always
+    sample: {
+        "run_id": "ucp_firmware_update-20250101-120000-4242",
+        "trace_file": "/tmp/ansible_toolkit/traces/ucp_firmware_update-20250101-120000-4242.jsonl",
+        "seconds": 1264.5,
+        "phases": {"server": {"count": 4, "seconds": 4810.2, "max": 1262.8, "errors": 0},
+                   "ilorest_firmwareupdate": {"count": 4, "seconds": 4783.6, "max": 1256.1, "errors": 0},
+                   "ilorest_login": {"count": 4, "seconds": 26.3, "max": 6.7, "errors": 0}},
+        "slowest_hosts": [{"host": "10.1.1.1", "seconds": 1262.8,
+                           "phases": {"server": 1262.8, "ilorest_login": 6.7, "ilorest_firmwareupdate": 1256.1}}]
+    }
 '''
 
 import csv
@@ -68,6 +101,9 @@ import subprocess
 import os
 import time
 from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils import run_trace
+from ansible.module_utils.ilorest_session import ilorest_cmd
+from ansible.module_utils.server_executor import run_per_server, run_command
 
 
 def read_servers_csv(csv_file):
@@ -106,14 +142,14 @@ def update_firmware_on_server(server, firmware_url, ilorest_path):
         password = server['password']
         
         # Login command
-        login_cmd = [ilorest_path, 'login', ipaddress, '-u', username, '-p', password]
-        result = subprocess.run(login_cmd, capture_output=True, text=True, shell=False)
+        login_cmd = ilorest_cmd(ilorest_path, ipaddress, 'login', ipaddress, '-u', username, '-p', password)
+        result = run_command(login_cmd, capture_output=True, text=True, shell=False)
         if result.returncode != 0:
             return False, f"Login failed: {result.stderr}"
         
         # Firmware update command
-        update_cmd = [ilorest_path, 'firmwareupdate', firmware_url]
-        result = subprocess.run(update_cmd, capture_output=True, text=True, shell=False)
+        update_cmd = ilorest_cmd(ilorest_path, ipaddress, 'firmwareupdate', firmware_url)
+        result = run_command(update_cmd, capture_output=True, text=True, shell=False)
         if result.returncode != 0:
             return False, f"Firmware update failed: {result.stderr}"
             
@@ -129,6 +165,9 @@ def main():
             servers_csv=dict(required=True, type='str'),
             firmware_url=dict(required=True, type='str'),
             ilorest_path=dict(required=False, default='ilorest', type='str'),
+            max_parallel=dict(required=False, default=8, type='int'),
+            server_timeout=dict(required=False, type='int'),
+            trace_dir=dict(required=False, default=run_trace.DEFAULT_TRACE_DIR, type='str'),
             manage_nginx=dict(required=False, default=True, type='bool'),
         ),
         supports_check_mode=True,
@@ -137,6 +176,8 @@ def main():
     servers_csv = module.params['servers_csv']
     firmware_url = module.params['firmware_url']
     ilorest_path = module.params['ilorest_path']
+    max_parallel = module.params['max_parallel']
+    server_timeout = module.params['server_timeout']
     manage_nginx = module.params['manage_nginx']
 
     # Read servers from CSV
@@ -148,6 +189,8 @@ def main():
         module.exit_json(changed=True, 
                         msg=f"Would update firmware on {len(servers)} servers")
 
+    tracer = run_trace.start('ucp_firmware_update', module.params['trace_dir'])
+
     # Start nginx if requested
     if manage_nginx:
         success, msg = manage_nginx_server("start")
@@ -159,8 +202,9 @@ def main():
 
     try:
         # Update firmware on each server
-        for server in servers:
-            success, message = update_firmware_on_server(server, firmware_url, ilorest_path)
+        outcomes = run_per_server(lambda server: update_firmware_on_server(server, firmware_url, ilorest_path),
+                                  servers, max_parallel, server_timeout)
+        for server, (success, message) in outcomes:
             if success:
                 updated_servers.append(server['ipaddress'])
             else:
@@ -183,6 +227,7 @@ def main():
         'failed_servers': failed_servers,
         'msg': f"Updated firmware on {len(updated_servers)} servers, {len(failed_servers)} failed"
     }
+    result['trace'] = tracer.finish()
 
     if failed_servers and not updated_servers:
         module.fail_json(**result)
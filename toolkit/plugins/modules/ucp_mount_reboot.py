@@ -31,6 +31,14 @@ options:
         required: false
         default: "ilorest"
         type: str
+    backend:
+        description:
+        - How iLO actions are sent
+        - C(ilorest) runs the ilorest CLI for every step; C(redfish) calls the iLO Redfish API in-process
+        required: false
+        default: "ilorest"
+        choices: ["ilorest", "redfish"]
+        type: str
     manage_nginx:
         description:
         - Whether to manage nginx web server for ISO hosting
@@ -39,10 +47,40 @@ options:
         type: bool
     sleep_duration:
         description:
-        - Time to sleep after operations (in seconds)
+        - Longest time to wait for the servers to finish with the ISO before nginx is stopped (in seconds)
+        - With I(wait_for=sleep) the module always sleeps this long, as it used to
         required: false
         default: 1800
         type: int
+    wait_for:
+        description:
+        - What the module waits for after rebooting the servers
+        - C(completion) waits until every server has booted the ISO and then rebooted again when the installer or SPP finished
+        - C(post) only waits until every server has booted from the ISO
+        - C(sleep) sleeps for I(sleep_duration)
+        required: false
+        default: "completion"
+        choices: ["completion", "post", "sleep"]
+        type: str
+    max_parallel:
+        description:
+        - Number of servers worked on at the same time
+        - Each server uses its own ilorest cache directory, so sessions do not interfere
+        required: false
+        default: 8
+        type: int
+    server_timeout:
+        description:
+        - Seconds allowed for a single server; commands still running when it expires are killed and the server is reported as failed
+        required: false
+        type: int
+    trace_dir:
+        description:
+        - Directory for the run's JSON-lines trace, one line per timed phase per server
+        - Empty to only return the summary in I(trace)
+        required: false
+        default: "/tmp/ansible_toolkit/traces"
+        type: str
 
 author:
     - Ansible Toolkit Team
@@ -63,11 +101,36 @@ mounted_servers:
     type: list
     returned: always
     sample: ["10.1.1.1", "10.1.1.2"]
+not_ready_servers:
+    description: Mounted servers that did not reach the I(wait_for) state within I(sleep_duration)
+    type: list
+    returned: always
+    sample: []
 failed_servers:
     description: List of servers where mounting/reboot failed
     type: list
     returned: always
     sample: []
+trace:
+    description: Seconds spent per phase (server, ilorest_login, ilorest_virtualmedia twice per server, ilorest_reboot;
+      redfish_eject_media, redfish_insert_media and redfish_reset with I(backend=redfish); then wait_boot, plus
+      wait_reset with I(wait_for=completion)) and the slowest servers
+    type: dict
+    returned: always
+    sample: {
+        "run_id": "ucp_mount_reboot-20250101-120000-4242",
+        "trace_file": "/tmp/ansible_toolkit/traces/ucp_mount_reboot-20250101-120000-4242.jsonl",
+        "seconds": 1496.2,
+        "phases": {"wait_reset": {"count": 4, "seconds": 5046.8, "max": 1288.4, "errors": 0},
+                   "wait_boot": {"count": 4, "seconds": 684.0, "max": 182.6, "errors": 0},
+                   "server": {"count": 4, "seconds": 74.5, "max": 19.4, "errors": 0},
+                   "ilorest_virtualmedia": {"count": 8, "seconds": 36.2, "max": 6.1, "errors": 0},
+                   "ilorest_login": {"count": 4, "seconds": 26.8, "max": 7.1, "errors": 0},
+                   "ilorest_reboot": {"count": 4, "seconds": 10.7, "max": 2.9, "errors": 0}},
+        "slowest_hosts": [{"host": "10.1.1.4", "seconds": 1490.4,
+                           "phases": {"server": 19.4, "ilorest_login": 7.1, "ilorest_virtualmedia": 9.4,
+                                      "ilorest_reboot": 2.9, "wait_boot": 182.6, "wait_reset": 1288.4}}]
+    }
 '''
 
 import csv
@@ -75,6 +138,10 @@ import subprocess
 import os
 import time
 from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils import run_trace
+from ansible.module_utils import readiness, redfish_actions
+from ansible.module_utils.ilorest_session import ilorest_cmd
+from ansible.module_utils.server_executor import run_per_server, run_command
 
 
 def read_servers_csv(csv_file):
@@ -105,32 +172,39 @@ def manage_nginx_server(action):
         return False, str(e)
 
 
-def mount_and_reboot_server(server, iso_url, ilorest_path):
+def mount_and_reboot_server(server, iso_url, ilorest_path, backend='ilorest'):
     """Mount ISO and reboot a single server using iLO REST"""
     try:
         ipaddress = server['ipaddress']
         username = server['username']
         password = server['password']
+
+        if backend == 'redfish':
+            client = redfish_actions.connect(ipaddress, username, password)
+            redfish_actions.eject_media(client, 2)
+            redfish_actions.insert_media(client, iso_url, 2, boot_next_reset=True)
+            redfish_actions.reset_system(client, 'ForceRestart')
+            return True, "Successfully mounted ISO and rebooted"
         
         # Login command
-        login_cmd = [ilorest_path, 'login', ipaddress, '-u', username, '-p', password]
-        result = subprocess.run(login_cmd, capture_output=True, text=True, shell=False)
+        login_cmd = ilorest_cmd(ilorest_path, ipaddress, 'login', ipaddress, '-u', username, '-p', password)
+        result = run_command(login_cmd, capture_output=True, text=True, shell=False)
         if result.returncode != 0:
             return False, f"Login failed: {result.stderr}"
         
         # Remove existing virtual media
-        remove_cmd = [ilorest_path, 'virtualmedia', '2', '--remove']
-        subprocess.run(remove_cmd, capture_output=True, text=True, shell=False)
+        remove_cmd = ilorest_cmd(ilorest_path, ipaddress, 'virtualmedia', '2', '--remove')
+        run_command(remove_cmd, capture_output=True, text=True, shell=False)
         
         # Mount new ISO with boot next reset
-        mount_cmd = [ilorest_path, 'virtualmedia', '2', iso_url, '--bootnextreset']
-        result = subprocess.run(mount_cmd, capture_output=True, text=True, shell=False)
+        mount_cmd = ilorest_cmd(ilorest_path, ipaddress, 'virtualmedia', '2', iso_url, '--bootnextreset')
+        result = run_command(mount_cmd, capture_output=True, text=True, shell=False)
         if result.returncode != 0:
             return False, f"ISO mount failed: {result.stderr}"
         
         # Reboot server
-        reboot_cmd = [ilorest_path, 'reboot']
-        result = subprocess.run(reboot_cmd, capture_output=True, text=True, shell=False)
+        reboot_cmd = ilorest_cmd(ilorest_path, ipaddress, 'reboot')
+        result = run_command(reboot_cmd, capture_output=True, text=True, shell=False)
         if result.returncode != 0:
             return False, f"Reboot failed: {result.stderr}"
             
@@ -140,14 +214,32 @@ def mount_and_reboot_server(server, iso_url, ilorest_path):
         return False, str(e)
 
 
+def wait_for_iso_run(server, wait_for, timeout):
+    """Wait until a rebooted server has booted the ISO and, for completion, gone down again afterwards"""
+    try:
+        started = time.monotonic()
+        client = redfish_actions.connect(server['ipaddress'], server['username'], server['password'])
+        readiness.wait_for_boot(client, timeout)
+        if wait_for == 'completion':
+            return readiness.wait_for_reset(client, timeout - (time.monotonic() - started))
+        return True
+    except Exception:
+        return False
+
+
 def main():
     module = AnsibleModule(
         argument_spec=dict(
             servers_csv=dict(required=True, type='str'),
             iso_url=dict(required=True, type='str'),
             ilorest_path=dict(required=False, default='ilorest', type='str'),
+            backend=dict(required=False, default='ilorest', choices=['ilorest', 'redfish'], type='str'),
+            max_parallel=dict(required=False, default=8, type='int'),
+            server_timeout=dict(required=False, type='int'),
+            trace_dir=dict(required=False, default=run_trace.DEFAULT_TRACE_DIR, type='str'),
             manage_nginx=dict(required=False, default=True, type='bool'),
             sleep_duration=dict(required=False, default=1800, type='int'),
+            wait_for=dict(required=False, default='completion', choices=['completion', 'post', 'sleep'], type='str'),
         ),
         supports_check_mode=True,
     )
@@ -155,8 +247,12 @@ def main():
     servers_csv = module.params['servers_csv']
     iso_url = module.params['iso_url']
     ilorest_path = module.params['ilorest_path']
+    backend = module.params['backend']
+    max_parallel = module.params['max_parallel']
+    server_timeout = module.params['server_timeout']
     manage_nginx = module.params['manage_nginx']
     sleep_duration = module.params['sleep_duration']
+    wait_for = module.params['wait_for']
 
     # Read servers from CSV
     servers, error = read_servers_csv(servers_csv)
@@ -167,6 +263,8 @@ def main():
         module.exit_json(changed=True, 
                         msg=f"Would mount ISO and reboot {len(servers)} servers")
 
+    tracer = run_trace.start('ucp_mount_reboot', module.params['trace_dir'])
+
     # Stop any existing nginx instances
     if manage_nginx:
         manage_nginx_server("stop")
@@ -179,11 +277,13 @@ def main():
 
     mounted_servers = []
     failed_servers = []
+    not_ready_servers = []
 
     try:
         # Mount and reboot each server
-        for server in servers:
-            success, message = mount_and_reboot_server(server, iso_url, ilorest_path)
+        outcomes = run_per_server(lambda server: mount_and_reboot_server(server, iso_url, ilorest_path, backend),
+                                  servers, max_parallel, server_timeout)
+        for server, (success, message) in outcomes:
             if success:
                 mounted_servers.append(server['ipaddress'])
             else:
@@ -192,9 +292,13 @@ def main():
                     'error': message
                 })
 
-        # Sleep for specified duration
-        if sleep_duration > 0:
+        # Keep nginx up until the servers are done with the ISO, at most sleep_duration
+        if sleep_duration > 0 and wait_for == 'sleep':
             time.sleep(sleep_duration)
+        elif sleep_duration > 0 and mounted_servers:
+            mounted = [server for server in servers if server['ipaddress'] in mounted_servers]
+            waits = readiness.wait_all(lambda server: wait_for_iso_run(server, wait_for, sleep_duration), mounted)
+            not_ready_servers = [server['ipaddress'] for server, ready in waits if not ready]
             
     finally:
         # Stop nginx if we started it
@@ -208,8 +312,10 @@ def main():
         'changed': changed,
         'mounted_servers': mounted_servers,
         'failed_servers': failed_servers,
+        'not_ready_servers': not_ready_servers,
         'msg': f"Mounted ISO and rebooted {len(mounted_servers)} servers, {len(failed_servers)} failed"
     }
+    result['trace'] = tracer.finish()
 
     if failed_servers and not mounted_servers:
         module.fail_json(**result)
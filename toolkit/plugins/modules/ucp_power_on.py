@@ -25,6 +25,33 @@ options:
         required: false
         default: "ilorest"
         type: str
+    backend:
+        description:
+        - How iLO actions are sent
+        - C(ilorest) runs the ilorest CLI for every step; C(redfish) calls the iLO Redfish API in-process
+        required: false
+        default: "ilorest"
+        choices: ["ilorest", "redfish"]
+        type: str
+    max_parallel:
+        description:
+        - Number of servers worked on at the same time
+        - Each server uses its own ilorest cache directory, so sessions do not interfere
+        required: false
+        default: 8
+        type: int
+    server_timeout:
+        description:
+        - Seconds allowed for a single server; commands still running when it expires are killed and the server is reported as failed
+        required: false
+        type: int
+    trace_dir:
+        description:
+        - Directory for the run's JSON-lines trace, one line per timed phase per server
+        - Empty to only return the summary in I(trace)
+        required: false
+        default: "/tmp/ansible_toolkit/traces"
+        type: str
 
 author:
     - Ansible Toolkit Team
@@ -48,12 +75,30 @@ failed_servers:
     type: list
     returned: always
     sample: []
+trace:
+    description: Seconds spent per phase (server, ilorest_login, ilorest_reboot; redfish_reset with I(backend=redfish))
+      and the slowest servers
+    type: dict
+    returned: always
+    sample: {
+        "run_id": "ucp_power_on-20250101-120000-4242",
+        "trace_file": "/tmp/ansible_toolkit/traces/ucp_power_on-20250101-120000-4242.jsonl",
+        "seconds": 9.8,
+        "phases": {"server": {"count": 4, "seconds": 31.6, "max": 9.6, "errors": 0},
+                   "ilorest_login": {"count": 4, "seconds": 22.4, "max": 6.9, "errors": 0},
+                   "ilorest_reboot": {"count": 4, "seconds": 8.8, "max": 2.6, "errors": 0}},
+        "slowest_hosts": [{"host": "10.1.1.3", "seconds": 9.6,
+                           "phases": {"server": 9.6, "ilorest_login": 6.9, "ilorest_reboot": 2.6}}]
+    }
 '''
 
 import csv
-import subprocess
 import os
 from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils import run_trace
+from ansible.module_utils import redfish_actions
+from ansible.module_utils.ilorest_session import ilorest_cmd
+from ansible.module_utils.server_executor import run_per_server, run_command
 
 
 def read_servers_csv(csv_file):
@@ -71,22 +116,27 @@ def read_servers_csv(csv_file):
         return None, str(e)
 
 
-def power_on_server(server, ilorest_path):
+def power_on_server(server, ilorest_path, backend='ilorest'):
     """Power on a single server using iLO REST"""
     try:
         ipaddress = server['ipaddress']
         username = server['username']
         password = server['password']
+
+        if backend == 'redfish':
+            client = redfish_actions.connect(ipaddress, username, password)
+            redfish_actions.reset_system(client, 'On')
+            return True, "Successfully powered on"
         
         # Login command
-        login_cmd = [ilorest_path, 'login', ipaddress, '-u', username, '-p', password]
-        result = subprocess.run(login_cmd, capture_output=True, text=True, shell=False)
+        login_cmd = ilorest_cmd(ilorest_path, ipaddress, 'login', ipaddress, '-u', username, '-p', password)
+        result = run_command(login_cmd, capture_output=True, text=True, shell=False)
         if result.returncode != 0:
             return False, f"Login failed: {result.stderr}"
         
         # Power on command
-        power_cmd = [ilorest_path, 'reboot', 'on']
-        result = subprocess.run(power_cmd, capture_output=True, text=True, shell=False)
+        power_cmd = ilorest_cmd(ilorest_path, ipaddress, 'reboot', 'on')
+        result = run_command(power_cmd, capture_output=True, text=True, shell=False)
         if result.returncode != 0:
             return False, f"Power on failed: {result.stderr}"
             
@@ -101,12 +151,19 @@ def main():
         argument_spec=dict(
             servers_csv=dict(required=True, type='str'),
             ilorest_path=dict(required=False, default='ilorest', type='str'),
+            backend=dict(required=False, default='ilorest', choices=['ilorest', 'redfish'], type='str'),
+            max_parallel=dict(required=False, default=8, type='int'),
+            server_timeout=dict(required=False, type='int'),
+            trace_dir=dict(required=False, default=run_trace.DEFAULT_TRACE_DIR, type='str'),
         ),
         supports_check_mode=True,
     )
 
     servers_csv = module.params['servers_csv']
     ilorest_path = module.params['ilorest_path']
+    backend = module.params['backend']
+    max_parallel = module.params['max_parallel']
+    server_timeout = module.params['server_timeout']
 
     # Read servers from CSV
     servers, error = read_servers_csv(servers_csv)
@@ -117,12 +174,15 @@ def main():
         module.exit_json(changed=True, 
                         msg=f"Would power on {len(servers)} servers")
 
+    tracer = run_trace.start('ucp_power_on', module.params['trace_dir'])
+
     powered_on_servers = []
     failed_servers = []
 
     # Power on each server
-    for server in servers:
-        success, message = power_on_server(server, ilorest_path)
+    outcomes = run_per_server(lambda server: power_on_server(server, ilorest_path, backend), servers,
+                              max_parallel, server_timeout)
+    for server, (success, message) in outcomes:
         if success:
             powered_on_servers.append(server['ipaddress'])
         else:
@@ -140,6 +200,7 @@ def main():
         'failed_servers': failed_servers,
         'msg': f"Powered on {len(powered_on_servers)} servers, {len(failed_servers)} failed"
     }
+    result['trace'] = tracer.finish()
 
     if failed_servers and not powered_on_servers:
         module.fail_json(**result)
@@ -43,6 +43,33 @@ options:
         required: false
         default: "ilorest"
         type: str
+    backend:
+        description:
+        - How iLO actions are sent
+        - C(ilorest) runs the ilorest CLI for every step; C(redfish) calls the iLO Redfish API in-process
+        required: false
+        default: "ilorest"
+        choices: ["ilorest", "redfish"]
+        type: str
+    max_parallel:
+        description:
+        - Number of servers worked on at the same time
+        - Each server uses its own ilorest cache directory, so sessions do not interfere
+        required: false
+        default: 8
+        type: int
+    server_timeout:
+        description:
+        - Seconds allowed for a single server; commands still running when it expires are killed and the server is reported as failed
+        required: false
+        type: int
+    trace_dir:
+        description:
+        - Directory for the run's JSON-lines trace, one line per timed phase per server
+        - Empty to only return the summary in I(trace)
+        required: false
+        default: "/tmp/ansible_toolkit/traces"
+        type: str
 
 author:
     - Ansible Toolkit Team
@@ -68,12 +95,29 @@ failed_servers:
     type: list
     returned: always
     sample: []
+trace:
+    description: Seconds spent per phase (server, ilorest_iloaccounts; redfish_create_account with I(backend=redfish))
+      and the slowest servers
+    type: dict
+    returned: always
+    sample: {
+        "run_id": "ucp_user_creation-20250101-120000-4242",
+        "trace_file": "/tmp/ansible_toolkit/traces/ucp_user_creation-20250101-120000-4242.jsonl",
+        "seconds": 6.4,
+        "phases": {"server": {"count": 4, "seconds": 22.1, "max": 6.2, "errors": 0},
+                   "ilorest_iloaccounts": {"count": 4, "seconds": 21.8, "max": 6.1, "errors": 0}},
+        "slowest_hosts": [{"host": "10.1.1.1", "seconds": 6.2,
+                           "phases": {"server": 6.2, "ilorest_iloaccounts": 6.1}}]
+    }
 '''
 
 import csv
-import subprocess
 import os
 from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils import run_trace
+from ansible.module_utils import redfish_actions
+from ansible.module_utils.ilorest_session import ilorest_cmd
+from ansible.module_utils.server_executor import run_per_server, run_command
 
 
 def read_servers_csv(csv_file):
@@ -91,24 +135,29 @@ def read_servers_csv(csv_file):
         return None, str(e)
 
 
-def create_user_on_server(server, new_username, new_password, user_role, ilorest_path):
+def create_user_on_server(server, new_username, new_password, user_role, ilorest_path, backend='ilorest'):
     """Create a new admin user on a single server using iLO REST"""
     try:
         ipaddress = server['ipaddress']
         username = server['username']
         password = server['password']
+
+        if backend == 'redfish':
+            client = redfish_actions.connect(ipaddress, username, password)
+            redfish_actions.create_account(client, new_username, new_password, user_role)
+            return True, "Successfully created user"
         
         # Create user command with all parameters
-        cmd = [
-            ilorest_path, 'iloaccounts', 'add', 
+        cmd = ilorest_cmd(
+            ilorest_path, ipaddress, 'iloaccounts', 'add', 
             new_username, new_username, new_password,
             '--role=' + user_role,
             '--url', ipaddress,
             '-u', username,
             '-p', password
-        ]
+        )
         
-        result = subprocess.run(cmd, capture_output=True, text=True, shell=False)
+        result = run_command(cmd, capture_output=True, text=True, shell=False)
         if result.returncode != 0:
             return False, f"User creation failed: {result.stderr}"
             
@@ -126,6 +175,10 @@ def main():
             new_password=dict(required=False, default='cmb9.admin', type='str', no_log=True),
             user_role=dict(required=False, default='Administrator', type='str'),
             ilorest_path=dict(required=False, default='ilorest', type='str'),
+            backend=dict(required=False, default='ilorest', choices=['ilorest', 'redfish'], type='str'),
+            max_parallel=dict(required=False, default=8, type='int'),
+            server_timeout=dict(required=False, type='int'),
+            trace_dir=dict(required=False, default=run_trace.DEFAULT_TRACE_DIR, type='str'),
         ),
         supports_check_mode=True,
     )
@@ -135,6 +188,9 @@ def main():
     new_password = module.params['new_password']
     user_role = module.params['user_role']
     ilorest_path = module.params['ilorest_path']
+    backend = module.params['backend']
+    max_parallel = module.params['max_parallel']
+    server_timeout = module.params['server_timeout']
 
     # Read servers from CSV
     servers, error = read_servers_csv(servers_csv)
@@ -145,14 +201,19 @@ def main():
         module.exit_json(changed=True, 
                         msg=f"Would create user '{new_username}' on {len(servers)} servers")
 
+    tracer = run_trace.start('ucp_user_creation', module.params['trace_dir'])
+
     created_users = []
     failed_servers = []
 
     # Create user on each server
-    for server in servers:
-        success, message = create_user_on_server(
-            server, new_username, new_password, user_role, ilorest_path
-        )
+    outcomes = run_per_server(
+        lambda server: create_user_on_server(
+            server, new_username, new_password, user_role, ilorest_path, backend
+        ),
+        servers, max_parallel, server_timeout
+    )
+    for server, (success, message) in outcomes:
         if success:
             created_users.append(server['ipaddress'])
         else:
@@ -170,6 +231,7 @@ def main():
         'failed_servers': failed_servers,
         'msg': f"Created user on {len(created_users)} servers, {len(failed_servers)} failed"
     }
+    result['trace'] = tracer.finish()
 
     if failed_servers and not created_users:
         module.fail_json(**result)
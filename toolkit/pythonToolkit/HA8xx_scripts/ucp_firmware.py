@@ -2,6 +2,7 @@ import csv
 import subprocess
 import time
 import os
+import readiness
 
 executable_path = os.getcwd() + "\HA8XX_scripts"
 csv_file = f'{executable_path}/servers.csv'
@@ -11,6 +12,9 @@ os.environ['PATH'] += executable_path
 # # Add the executable path to the PATH environment variable
 os.environ['PATH'] += executable_path
 
+# Longest the iLOs may take to flash and restart before the web server is shut down
+FIRMWARE_UPDATE_TIMEOUT = 600
+
 def kill_nginx():
     subprocess.Popen(['taskkill', '/f', '/im', 'nginx.exe'], shell=True)
 
@@ -57,8 +61,12 @@ def main():
     servers = load_csv_file()
     execute_firmwareupdate(servers)
 
-    print("Sleeping for 10 minutes before shutting down web server", flush=True)
-    time.sleep(600)
+    print("Waiting for the iLOs to restart with the new firmware before shutting down web server", flush=True)
+    waits = readiness.wait_all(
+        lambda server: readiness.wait_for_bmc_reset(server['ipaddress'], FIRMWARE_UPDATE_TIMEOUT), servers)
+    for server, ready in waits:
+        if not ready:
+            print(f"{server['ipaddress']} iLO did not come back within {FIRMWARE_UPDATE_TIMEOUT} seconds", flush=True)
     kill_nginx()
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,15 +1,12 @@
 import datetime
 import random
 import string
-import requests
 import urllib3
 
 urllib3.disable_warnings()
-import multiprocessing
 import itertools
 import quantaskylake
 import sys
-from netmiko import ConnectHandler
 import cisconexus
 import brocadefc
 import aristaeos
@@ -35,6 +32,11 @@ import csv
 # SubModule Logging
 import logging
 import toolkit_config
+from identity_cache import IdentityCache, login_pause
+import redfish_client
+import switch_sessions
+import neighbor_sweep
+from async_discovery import thread_starmap
 from quantaskylake import QuantaSkylake
 from esxi import ESXi
 logger = logging.getLogger(__name__)
@@ -50,6 +52,10 @@ HA_MODEL = {
     "Hitachi Advanced Server HA840 G3": "P56092-B21"
 }
 CSV_FILE_PATH = 'HA8XX_scripts/servers.csv'
+# Threads, one per target up to this many; discovery only waits on the network
+DISCOVERY_MAX_WORKERS = 64
+# HA rows are collected here and replace the emptied servers.csv once node discovery is done
+CSV_STAGING_PATH = CSV_FILE_PATH + '.new'
 # TOOLKIT_LAB_TEST_NETWORKCONFIG = toolkit_config.getConfig().lab_test_networkconfig
 
 def getPassword(theinput="default"):
@@ -133,10 +139,7 @@ def getIPv6Neighbors(interface=None):
             for NIC in NICs:
                 host = 'ff02::1%' + NIC
                 hosts.append((host,))
-            pool = multiprocessing.Pool(processes=10)
-            pool.starmap(ping, hosts)
-            pool.close()
-            pool.join()
+            thread_starmap(ping, hosts, 10)
             # Get IPv6 Neighbors for each NIC
             IPv6Devices = []
             for NIC in NICs:
@@ -157,16 +160,8 @@ def getIPv6Neighbors(interface=None):
                     IPv6Devices.append(IPv6Device)
         # Assume everything else is linux platform
         else:
-            IPv6Devices = []
-            for NIC in NICs:
-                session = pexpect.spawn('ping6 -c 2 ff02::1%' + str(NIC))
-                session.wait()
-                output = session.read(20000)
-                output = output.decode('utf-8')
-                output = output.splitlines()
-                for line in output:
-                    if line.startswith("64 bytes from fe80:"):
-                        IPv6Devices.append(line.split()[3][:-1] + '%' + str(NIC))
+            # Sweep ff02::1 on all NICs at once and merge in the kernel neighbor table
+            IPv6Devices = neighbor_sweep.sweep([str(NIC) for NIC in NICs])
         return IPv6Devices
         # return ['fe80::aa1e:84ff:fe73:ba49%11',
         # 'fe80::aa1e:84ff:fecf:34e%11']
@@ -186,58 +181,86 @@ def ping(host):
 def discoverNodes(IPv6nodes, usernames=['admin'], passwords=['cmb9.admin']):
     logger.info('Starting Node Discovery against ' + str(len(IPv6nodes)) + ' IPv6 Devices')
     # time.sleep(5)
-    # empty the csv file before processing
-    with open(CSV_FILE_PATH, 'w') as file:
-        file.write('')
+    # empty the csv file before processing, so servers.csv never lists a previous rack's nodes;
+    # the HA rows are staged and swapped in whole once discovery is done
+    for path in (CSV_FILE_PATH, CSV_STAGING_PATH):
+        with open(path, 'w') as file:
+            file.write('')
 
-    # Create all combinations of commands
-    tuples = []
-    for combination in itertools.product(IPv6nodes, usernames, passwords):
-        tuples.append(combination)
+    # One task per node; each walks the credentials itself and stops at the first one that works
+    tuples = [(IPv6node, usernames, passwords) for IPv6node in IPv6nodes]
 
-    pool = multiprocessing.Pool(processes=30)
-    results = pool.starmap(discoverNodeType, tuples)
-    pool.close()
-    pool.join()
+    results = thread_starmap(discoverNode, tuples, DISCOVERY_MAX_WORKERS)
     # https://stackoverflow.com/questions/16096754/remove-none-value-from-a-list-without-removing-the-0-value
     results = [x for x in results if x is not None]
+    publishServersCSV()
     # Add forwarding ports for linux applications that do not support IPv6 Link-Local Addressing
     return results
 
 
-def discoverNodeType(IPv6node, username, password):
-    # Output the address, username and password
-    temp = IPv6node + ' ' + username + ' ' + password
-    logger.info('Start  ' + temp)
+def publishServersCSV():
+    # Swap the staged HA rows in; with no HA nodes found servers.csv is left empty
+    if not os.path.exists(CSV_STAGING_PATH):
+        return
+    if os.path.getsize(CSV_STAGING_PATH) == 0:
+        logger.info('No HA nodes found, ' + CSV_FILE_PATH + ' is empty')
+    os.replace(CSV_STAGING_PATH, CSV_FILE_PATH)
 
-    # Check if IPMI Port is Open
+
+def discoverNode(IPv6node, usernames, passwords):
+    # Anything without IPMI is not a BMC, so don't spend logins on it
+    if not ipmiPortOpen(IPv6node):
+        logger.warning('NoIPMI ' + IPv6node)
+        return None
+    logger.info('IPMI   ' + IPv6node)
+
+    # The lawcompliance password is tried once per username, after the plain credentials
+    encoded = lawcompliance.passwordencode(IPv6node, getPassword())
+    credentials = list(itertools.product(usernames, passwords)) + [(username, encoded) for username in usernames]
+
+    # Learned order: what worked on this node last, then what worked most recently elsewhere in the rack.
+    # Failed logins are spaced out so a wrong credential list does not lock the BMC out
+    cache = IdentityCache()
+    for failures, (index, (username, password)) in enumerate(cache.order_credentials(IPv6node, credentials,
+                                                                                       'server')):
+        time.sleep(login_pause(failures))
+        node = discoverNodeType(IPv6node, username, password, index, try_encoded=False)
+        if node is not None:
+            return node
+    return None
+
+
+def ipmiPortOpen(IPv6node):
     # https://stackoverflow.com/questions/4030269/why-doesnt-a-en0-suffix-work-to-connect-a-link-local-ipv6-tcp-socket-in-python
     addrinfo = socket.getaddrinfo(IPv6node, 623, socket.AF_INET6, socket.SOCK_DGRAM)
-    # print(addrinfo)
     (family, socktype, proto, canonname, sockaddr) = addrinfo[0]
     sock = socket.socket(family, socktype, proto)
     sock.settimeout(5)
-    # print(sockaddr)
     result = sock.connect_ex(sockaddr)
     sock.close()
-    if result == 0:
+    return result == 0
+
+
+def discoverNodeType(IPv6node, username, password, credential_index=None, try_encoded=True):
+    # Output the address, username and password
+    temp = IPv6node + ' ' + username + ' ' + password
+    logger.info('Start  ' + temp)
+
+    # Check if IPMI Port is Open
+    if ipmiPortOpen(IPv6node):
         logger.info('IPMI   ' + IPv6node)
     else:
         logger.warning('NoIPMI ' + IPv6node)
         return None
 
-    # Set the address
-    # Also %25 has to be used for URLs instead of % due to URL Encoding rules.
-    redfishapi = 'https://[' + IPv6node.replace('%', '%25') + ']/redfish/v1/'
-    # Have to remove the lin-local zone ID for correct curl command
-    redfishheader = {
-        'Content-Type': 'application/json',
-        'User-Agent': 'curl/7.54.0',
-        'Host': '[' + IPv6node.split('%')[0] + ']'
-    }
+    # The pooled client handles the %25 zone ID encoding and the Host header,
+    # and keeps the connection to this BMC open across both passwords and the member GET
+    client = None
 
     # Attempt to login with two passwords
     passwords = [password, lawcompliance.passwordencode(IPv6node, getPassword())]
+    if not try_encoded:
+        passwords = [password]
     session = None
     members = None
 
@@ -248,8 +271,8 @@ def discoverNodeType(IPv6node, username, password):
 
         # Attempt to connect. If specific force password change is required, change password.
         try:
-            session = requests.get(redfishapi + 'Systems', auth=(username, password), verify=False,
-                                   headers=redfishheader, timeout=30)
+            client = redfish_client.RedfishClient(IPv6node, username, password, timeout=30)
+            session = client.get('/redfish/v1/Systems')
             try:
                 j = session.json()
                 if j['error']['code'] == "Base.1.0.PasswordChangeFromIPMI":
@@ -289,32 +312,40 @@ def discoverNodeType(IPv6node, username, password):
     # Loop through members and get first member
     for member in members:
         try:
-            redfishapi = 'https://[' + IPv6node.replace('%', '%25') + ']' + member['@odata.id']
+            redfishapi = member['@odata.id']
             break
         except:
             # Return nothing if @odata.id key doesn't exist
             return None
 
     ''' Discover which type of node this is '''
-    # Try to get first member details
-    try:
-        session = requests.get(redfishapi, auth=(username, password), verify=False,
-                               headers=redfishheader, timeout=30)
-    except:
-        logger.error('Error  ' + temp)
-        return None
-    # If Session is not good, return nothing
-    if not session.ok:
-        logger.error('Error  ' + temp)
-        return None
+    # Credentials are good. If the identity cache knows this node, skip the SKU fetch
+    cache = IdentityCache()
+    entry = cache.lookup(IPv6node, 'server')
+    if entry is not None and entry.get('username') == username:
+        logger.info('Cached ' + temp)
+        j = {'SKU': entry['identity'].get('sku', ''), 'Model': entry['identity'].get('model', ''),
+             'SerialNumber': entry['identity'].get('serial_number', '')}
+    else:
+        entry = None
+        # Try to get first member details
+        try:
+            session = client.get(redfishapi)
+        except:
+            logger.error('Error  ' + temp)
+            return None
+        # If Session is not good, return nothing
+        if not session.ok:
+            logger.error('Error  ' + temp)
+            return None
 
-    # Attempt to decode JSON data
-    try:
-        j = session.json()
-    except:
-        # If return data isn't JSON, return nothing.
-        logger.error('Error  ' + temp)
-        return None
+        # Attempt to decode JSON data
+        try:
+            j = session.json()
+        except:
+            # If return data isn't JSON, return nothing.
+            logger.error('Error  ' + temp)
+            return None
 
     logger.debug('RFDATA ' + IPv6node + ' ' + str(j))
 
@@ -349,6 +380,11 @@ def discoverNodeType(IPv6node, username, password):
                 except:
                     continue
 
+    if entry is None:
+        cache.record(IPv6node, 'server', credential_index, username,
+                     {'model': model, 'sku': SKU, 'serial_number': j.get('SerialNumber', '')})
+        cache.save()
+
     # Decode which node this is
     # If its a D52B Series, return Skylake Server
     if 'Advanced Server DS120_S5B-MB' in SKU:  # QError fe80::aa1e:84ff:fea5:33cd%3 admin cmb9.admin SKU='Advanced Server DS120_S5B-MB 1U (LBG-4)'
@@ -418,7 +454,7 @@ def write_to_csv_for_HA(IPv6node, username, password, model, sku_data):
     # print(f"rows are >>>>>>>>>>>>>>>>>>>>>>>>>>>>>{rows}")
     # Append the new data to the CSV file
 
-    with open(CSV_FILE_PATH, mode='a+', newline='') as file:
+    with open(CSV_STAGING_PATH, mode='a+', newline='') as file:
         writer = csv.writer(file)
 
         # Check if the file is empty and write the header if necessary
@@ -427,7 +463,7 @@ def write_to_csv_for_HA(IPv6node, username, password, model, sku_data):
             writer.writerow(fieldnames)
         # Write the new data to the file
         writer.writerow(new_data)
-        logger.info(f"Added HA node detilas {IPv6node} to the {CSV_FILE_PATH}")
+        logger.info(f"Added HA node detilas {IPv6node} to the {CSV_STAGING_PATH}")
 
 
 def discoverSwitches(IPv6Addresses, usernames=['admin'], passwords=['Passw0rd!']):
@@ -436,10 +472,7 @@ def discoverSwitches(IPv6Addresses, usernames=['admin'], passwords=['Passw0rd!']
     tuples = []
     for combination in itertools.product(IPv6Addresses, usernames, passwords):
         tuples.append(combination)
-    pool = multiprocessing.Pool(processes=30)
-    results = pool.starmap(discoverSwitchType, tuples)
-    pool.close()
-    pool.join()
+    results = thread_starmap(discoverSwitchType, tuples, DISCOVERY_MAX_WORKERS)
     # https://stackoverflow.com/questions/16096754/remove-none-value-from-a-list-without-removing-the-0-value
     results = [x for x in results if x is not None]
     # Add forwarding ports for linux applications that do not support IPv6 Link-Local Addressing
@@ -466,95 +499,77 @@ def discoverSwitchType(IPv6Address, username, password):
         temp = IPv6Address + ' ' + username + ' ' + password
         logger.info('Start  ' + temp)
 
-        net_connect = None
+        session = None
 
-        # SSH Into Switch as generic SSH device
+        # SSH Into Switch as generic SSH device, or reuse the session left open by an earlier call
         try:
-            net_connect = ConnectHandler(device_type='terminal_server', ip=IPv6Address, username=username,
-                                         password=password, timeout=30)
+            session = switch_sessions.get_session(IPv6Address, username, password, timeout=30)
             break
-        except:
+        except switch_sessions.SwitchError:
             # If we failed to connect, return nothing
             logger.info('Finish ' + temp)
 
-    if net_connect is None:
+    if session is None:
         return None
 
-    # Check for Cisco Nexus/Arista EOS switches and Brocade FOS
-    cmds = ["show version", "chassisshow"]
-    for cmd in cmds:
-        try:
-            output = net_connect.send_command(cmd, delay_factor=10, max_loops=50)
-        except:
-            output = 'Failed'
-        # output = net_connect.send_command(cmd, delay_factor=5)
-        # If Nexus 92348 is in output, return Nexus Object
-
-        if 'C92348GC-X ' in output:
-            logger.info('Data   ' + IPv6Address + ' Found a Nexus92348 Switch')
-            net_connect.disconnect()
-            mgmt_switch = cisconexus.Nexus92348(IPv6Address, username, password)
-
-            if toolkit_config.getConfig().lab_test_networkconfig == "100g":
-                logger.info('TOOLKIT_LAB_TEST: Shutting down some switch ports for 100G-to-the-host network testing.')
-                config_commands = ["interface eth1/35", "shutdown", "interface eth1/36", "shutdown", "interface eth1/37", "no shutdown", "interface eth1/38", "no shutdown"]
-                mgmt_switch.runconfig(config_commands)
-            elif toolkit_config.getConfig().lab_test_networkconfig == "standard":
-                logger.info(
-                    'TOOLKIT_LAB_TEST: Shutting down some switch ports for Standard Network testing.')
-                config_commands = ["interface eth1/35", "no shutdown", "interface eth1/36", "no shutdown", "interface eth1/37", "shutdown", "interface eth1/38", "shutdown"]
-                mgmt_switch.runconfig(config_commands)
-
-            return mgmt_switch
-        # If the 9k YC switch is in the output, return 9k YC object.
-        elif '93180YC-FX ' in output:
-            logger.info('Data   ' + IPv6Address + ' Found a Nexus93180YC-FX Switch')
-            net_connect.disconnect()
-            return cisconexus.Nexus93180YCFX(IPv6Address, username, password)
-        elif '93180YC-FX3' in output:
-            logger.info('Data   ' + IPv6Address + ' Found a Nexus93180YC-FX3/FX3H Switch')
-            net_connect.disconnect()
-            return cisconexus.Nexus93180YCFX3(IPv6Address, username, password)
-        elif 'C93600CD-GX ' in output:
-            logger.info('Data   ' + IPv6Address + ' Found a NexusC93600CD-GX Switch')
-            net_connect.disconnect()
-            return cisconexus.Nexus93600CDGX(IPv6Address, username, password)
-        # If the 9k 9332C switch is in the output, return 9k 9332 object.
-        elif '9332C ' in output:
-            logger.info('Data   ' + IPv6Address + ' Found a Nexus9332C Switch')
-            net_connect.disconnect()
-            return cisconexus.Nexus9332C(IPv6Address, username, password)
-        elif 'C9316D-GX' in output:
-            logger.info('Data   ' + IPv6Address + ' Found a Nexus 9316D Switch')
-            net_connect.disconnect()
-            # global global_9316d
-            # global_9316d = True
-            # logger.info("TEST: global_9316d = " + str(global_9316d))
-            # logger.info("TEST: toolkit_config.getConfig().networkconfig_100g_to_the_host" + str(
-            #     id(toolkit_config.getConfig())) + str(toolkit_config.getConfig().networkconfig_100g_to_the_host))
-            return cisconexus.Nexus9316D(IPv6Address, username, password)
-        # If the part number for a G620 is found, return G620 Object
-        elif 'BROCAD0000G62' in output:
-            logger.info('Data   ' + IPv6Address + ' Found a G620 Switch')
-            net_connect.disconnect()
-            return brocadefc.G620(IPv6Address, username, password)
-        elif 'SLKWRM0000G72' in output:
-            logger.info('Data   ' + IPv6Address + ' Found a G720 Switch')
-            net_connect.disconnect()
-            return brocadefc.G720(IPv6Address, username, password)
-        # If their is a DCS-7010T-48-R in the output, return DCS7010 object
-        elif '7010T' in output:
-            logger.info('Data   ' + IPv6Address + ' Found a DCS-7010 Switch')
-            net_connect.disconnect()
-            return aristaeos.DCS7010(IPv6Address, username, password)
-        elif '7050SX3' in output:
-            logger.info('Data   ' + IPv6Address + ' Found a DCS-7050SX3 Switch')
-            net_connect.disconnect()
-            return aristaeos.DCS7050SX3(IPv6Address, username, password)
-        elif '7050CX3' in output:
-            logger.info('Data   ' + IPv6Address + ' Found a DCS-7050CX3 Switch')
-            net_connect.disconnect()
-            return aristaeos.DCS7050CX3(IPv6Address, username, password)
+    # Check for Cisco Nexus/Arista EOS switches and Brocade FOS; the session stays open for networkconfig
+    output = session.identify()
+    # If Nexus 92348 is in output, return Nexus Object
+
+    if 'C92348GC-X ' in output:
+        logger.info('Data   ' + IPv6Address + ' Found a Nexus92348 Switch')
+        mgmt_switch = cisconexus.Nexus92348(IPv6Address, username, password)
+
+        if toolkit_config.getConfig().lab_test_networkconfig == "100g":
+            logger.info('TOOLKIT_LAB_TEST: Shutting down some switch ports for 100G-to-the-host network testing.')
+            config_commands = ["interface eth1/35", "shutdown", "interface eth1/36", "shutdown", "interface eth1/37", "no shutdown", "interface eth1/38", "no shutdown"]
+            mgmt_switch.runconfig(config_commands)
+        elif toolkit_config.getConfig().lab_test_networkconfig == "standard":
+            logger.info(
+                'TOOLKIT_LAB_TEST: Shutting down some switch ports for Standard Network testing.')
+            config_commands = ["interface eth1/35", "no shutdown", "interface eth1/36", "no shutdown", "interface eth1/37", "shutdown", "interface eth1/38", "shutdown"]
+            mgmt_switch.runconfig(config_commands)
+
+        return mgmt_switch
+    # If the 9k YC switch is in the output, return 9k YC object.
+    elif '93180YC-FX ' in output:
+        logger.info('Data   ' + IPv6Address + ' Found a Nexus93180YC-FX Switch')
+        return cisconexus.Nexus93180YCFX(IPv6Address, username, password)
+    elif '93180YC-FX3' in output:
+        logger.info('Data   ' + IPv6Address + ' Found a Nexus93180YC-FX3/FX3H Switch')
+        return cisconexus.Nexus93180YCFX3(IPv6Address, username, password)
+    elif 'C93600CD-GX ' in output:
+        logger.info('Data   ' + IPv6Address + ' Found a NexusC93600CD-GX Switch')
+        return cisconexus.Nexus93600CDGX(IPv6Address, username, password)
+    # If the 9k 9332C switch is in the output, return 9k 9332 object.
+    elif '9332C ' in output:
+        logger.info('Data   ' + IPv6Address + ' Found a Nexus9332C Switch')
+        return cisconexus.Nexus9332C(IPv6Address, username, password)
+    elif 'C9316D-GX' in output:
+        logger.info('Data   ' + IPv6Address + ' Found a Nexus 9316D Switch')
+        # global global_9316d
+        # global_9316d = True
+        # logger.info("TEST: global_9316d = " + str(global_9316d))
+        # logger.info("TEST: toolkit_config.getConfig().networkconfig_100g_to_the_host" + str(
+        #     id(toolkit_config.getConfig())) + str(toolkit_config.getConfig().networkconfig_100g_to_the_host))
+        return cisconexus.Nexus9316D(IPv6Address, username, password)
+    # If the part number for a G620 is found, return G620 Object
+    elif 'BROCAD0000G62' in output:
+        logger.info('Data   ' + IPv6Address + ' Found a G620 Switch')
+        return brocadefc.G620(IPv6Address, username, password)
+    elif 'SLKWRM0000G72' in output:
+        logger.info('Data   ' + IPv6Address + ' Found a G720 Switch')
+        return brocadefc.G720(IPv6Address, username, password)
+    # If their is a DCS-7010T-48-R in the output, return DCS7010 object
+    elif '7010T' in output:
+        logger.info('Data   ' + IPv6Address + ' Found a DCS-7010 Switch')
+        return aristaeos.DCS7010(IPv6Address, username, password)
+    elif '7050SX3' in output:
+        logger.info('Data   ' + IPv6Address + ' Found a DCS-7050SX3 Switch')
+        return aristaeos.DCS7050SX3(IPv6Address, username, password)
+    elif '7050CX3' in output:
+        logger.info('Data   ' + IPv6Address + ' Found a DCS-7050CX3 Switch')
+        return aristaeos.DCS7050CX3(IPv6Address, username, password)
 
 
 def discoverOS(nodes, potentialpassword="Passw0rd!"):
@@ -712,9 +727,13 @@ def main():
             return False
         switches = discoverSwitches(getIPv6Neighbors(), ['admin'], ['Passw0rd!'])
         if switches:
-            UCPNet = networkconfig.networkstack("1", switches, networkconfigjson)
-            UCPNet.detectOrder()
-            UCPNet.getDetails()
+            try:
+                UCPNet = networkconfig.networkstack("1", switches, networkconfigjson)
+            except networkconfig.DesignNotFound as e:
+                logger.info(str(e))
+            else:
+                UCPNet.detectOrder()
+                UCPNet.getDetails()
         else:
             logger.info("Switches Not found")
 
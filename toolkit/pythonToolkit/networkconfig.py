@@ -12,6 +12,10 @@ import operator
 import lawcompliance
 import toolkit_config
 import loginit
+import switch_config
+import switch_phases
+import switch_sessions
+import switch_tables
 import logging
 logger = logging.getLogger("root")
 
@@ -20,278 +24,93 @@ TESTING = False  # Set this to False for production. When TESTING, switch config
 CISCO_SWITCH_LIST = ["93180YC", "9332C", "92348", "93600CD", "C9316D-GX"]
 LACP_LLDP_SWITCH_LIST = ["93180YC", "9332C", "92348", "93600CD", "C9316D-GX"]
 VCP_SWITCH_LIST = ["93180YC", "9332C", "93600CD", "C9316D-GX"]
+# Host-facing switches whose MAC tables locate the node NICs
+MAC_LOCATION_SWITCHES = (cisconexus.Nexus92348, cisconexus.Nexus93180YCFX, cisconexus.Nexus93180YCFX3, aristaeos.DCS7010, aristaeos.DCS7050SX3)
+
+# Switch designs, placements and port-channel layouts
+DESIGN_CATALOG = os.path.join(os.path.dirname(os.path.abspath(__file__)), "networkdesigns.json")
+# Designs listed when the switches match none
+CLOSEST_DESIGNS = 3
+
+_catalog = None
+
+
+class DesignNotFound(Exception):
+    def __init__(self, typecount, closest):
+        super(DesignNotFound, self).__init__("No design for " + str(typecount) +
+                                             ". Closest: " + "; ".join(name + " (" + difference + ")" for name, difference in closest))
+        self.typecount = typecount
+        self.closest = closest
+
+
+def designSignature(typecount):
+    # Canonical form of a switch count: ((switchtype, count), ...) sorted by switch type
+    return tuple(sorted((switchtype, count) for switchtype, count in typecount.items() if count))
+
+
+def loadDesignCatalog(path=DESIGN_CATALOG):
+    # Read the design catalog once and index it by signature
+    global _catalog
+    if _catalog is None:
+        with open(path) as catalog_file:
+            catalog = json.load(catalog_file)
+        index = {}
+        for designname, design in catalog["designs"].items():
+            signature = designSignature(design)
+            if signature in index:
+                raise ValueError(f"Design {designname} has the same switches as {index[signature]} in {path}")
+            index[signature] = designname
+        catalog["index"] = index
+        _catalog = catalog
+    return _catalog
+
+
+def findDesign(typecount):
+    # The design with exactly this switch count, or None
+    return loadDesignCatalog()["index"].get(designSignature(typecount))
+
+
+def closestDesigns(typecount, count=CLOSEST_DESIGNS):
+    # [(designname, what differs)] for the designs nearest to the counted switches
+    ranked = []
+    for designname, expected in loadDesignCatalog()["designs"].items():
+        differences = []
+        distance = 0
+        for switchtype in sorted(set(expected) | set(typecount)):
+            delta = typecount.get(switchtype, 0) - expected.get(switchtype, 0)
+            if delta:
+                distance += abs(delta)
+                differences.append(("extra " if delta > 0 else "missing ") + str(abs(delta)) + " " + switchtype)
+        ranked.append((distance, designname, ", ".join(differences) or "same switches"))
+    return [(designname, difference) for distance, designname, difference in sorted(ranked)[:count]]
+
 
 class networkstack(object):
     def __init__(self, racknum, switches = [], networkconfigjson = None, design = None):
         self.racknum = str(racknum)
 
-        # All Possible UCP CI/HC/RS Designs
-        # TO DO: MUST UPDATE BELOW DESIGNS!!!
-        self.designs = {
-            "Simple-Rack_Cisco" : {
-                "Nexus93180YCFX" : 2,
-                "Nexus92348" : 1,
-            },
-            "Simple-FC-Rack_Cisco": {
-                "Nexus93180YCFX" : 2,
-                "Nexus92348" : 1,
-                "G620" : 2
-            },
-            "Expand-Rack_Cisco": {
-                "Nexus9332C" : 2,
-                "Nexus93180YCFX" : 2,
-                "Nexus92348" : 1,
-            },
-            "Expand-FC-Rack_Cisco": {
-                "Nexus9332C": 2,
-                "Nexus93180YCFX": 2,
-                "Nexus92348": 1,
-                "G620": 2
-            },
-            "Simple-Rack_Arista": {
-                "DCS7050SX3": 2,
-                "DCS7010": 1,
-            },
-            "Simple-FC-Rack_Arista": {
-                "DCS7050SX3": 2,
-                "DCS7010": 1,
-                "G620": 2
-            },
-            "Expand-Rack_Arista": {
-                "DCS7050CX3": 2,
-                "DCS7050SX3": 2,
-                "DCS7010": 1,
-            },
-            "Expand-FC-Rack_Arista": {
-                "DCS7050CX3": 2,
-                "DCS7050SX3": 2,
-                "DCS7010": 1,
-                "G620": 2
-            },
-            "Cisco_Multi_R1_G620": {
-                'Nexus93180YCFX3': 2,
-                'G620': 2,
-                'Nexus92348': 1,
-                "Nexus93600CDGX": 2
-            },
-            "Cisco_Multi_R1_G720": {
-                'Nexus93180YCFX3': 2,
-                'G720': 2,
-                'Nexus92348': 1,
-                "Nexus93600CDGX": 2
-            },
-            "Cisco_Multi_R2-R4_G620": {
-                'Nexus93180YCFX3': 2,
-                'G620': 2,
-                'Nexus92348': 1
-            },
-            "Cisco_Multi_R2-R4_G720": {
-                'Nexus93180YCFX3': 2,
-                'G720': 2,
-                'Nexus92348': 1
-            },
-            "Cisco_Single": {
-                'Nexus93180YCFX3': 2,
-                'G620': 2,
-                'Nexus92348': 1
-            },
-            "100G-To-The-Host_Multi_R1_G620": {
-                'Nexus9316D': 2,
-                'G620': 2,
-                'Nexus92348': 1,
-                "Nexus93600CDGX": 2
-            },
-            "100G-To-The-Host_Multi_R1_G720": {
-                'Nexus9316D': 2,
-                'G720': 2,
-                'Nexus92348': 1,
-                "Nexus93600CDGX": 2
-            },
-            "100G-To-The-Host_Multi_R2-R4_G620": {
-                'G620': 2,
-                'Nexus92348': 1,
-                "Nexus93600CDGX": 2
-            },
-            "100G-To-The-Host_Multi_R2-R4_G720": {
-                'G720': 2,
-                'Nexus92348': 1,
-                "Nexus93600CDGX": 2
-            },
-            "100G-To-The-Host_Single": {
-                'Nexus92348': 1,
-                "Nexus93600CDGX": 2  
-            },
-            "100G-To-The-Host_Multi_100G-TCP-NVMe_R1": {
-                'Nexus9316D': 2,
-                'Nexus92348': 1,
-                "Nexus93600CDGX": 2
-            },
-            "100G-To-The-Host_Multi_100G-TCP-NVMe_R2-R4": {
-                'Nexus92348': 1,
-                "Nexus93600CDGX": 2
-            },
-            "Toolkit_Lab": {
-                'Nexus93180YCFX3': 1,
-                'G620': 2,
-                'Nexus92348': 1,
-                "Nexus93600CDGX": 2,
-                #"G720": 1,  
-                'Nexus9316D': 2,
-
-            }
-        }
-
-        # Interface Locations of switches on 92348
-        self.placements = {
-            "Nexus9332C" : ("1/37", "1/38"),
-            "Nexus93180YCFX" : ("1/39", "1/40"),
-            "Nexus93600CD" : ("1/37", "1/38"),
-            "Nexus93180YCFX3" : ("1/39", "1/40"),
-            "G620" : ("1/41", "1/42"),
-            "Nexus92348" : ("1/45", " ")
-        }
-
-        # Getting ready for Nexus93180YCFX3
-        # self.placements = {HA
-        #     "Nexus9332C": ("1/37", "1/38"),
-        #     "Nexus93180YCFX3": ("1/39", "1/40"),
-        #     "G620": ("1/41", "1/42"),
-        #     "Nexus92348": ("1/45", " ")
-        # }
-
-        # Default port-channel ethernet ports
-        self.portchannelinterfaces = {
-            "default" : {
-                "spine" : {
-                    "peer": {"start": -14, "end": -6},
-                    "customerQSFP" : {"start": -6, "end": None},
-                    "leaf": {},
-                },
-                "leaf" : {
-                    "peer": {"start": -2, "end": None},
-                    "spine": {"start": -6, "end": -4},
-                    # Default on documentation
-                    "mgmt1": {"start": -14, "end": -13},
-                    # Default on rack and stack single network
-                    "mgmt2": {"start": -7, "end": -6},
-                    # Default for designs with Spine Switch
-                    "customerQSFP": {"start": -6, "end": -2},
-                    # Default for all designs
-                    "customerSFP": {"start": -22, "end": -14}
-                },
-                "mgmt" : {
-                    "leaf": {"start": -4, "end": -2}
-                }
-            },
-            "default_Cisco": {
-                "spine": {
-                    "peer": {"start": -16, "end": -8},
-                    "customerQSFP": {"start": -8, "end": -4},
-                    "leaf": {},
-                },
-                "leaf": {
-                    "peer": {"start": -2, "end": None},
-                    "spine": {"start": -6, "end": -4},
-                    # Default on documentation
-                    #"mgmt1": {"start": -14, "end": -13},
-                    "mgmt1": {"start": -7, "end": -6},
-                    # Default on rack and stack single network
-                    # "mgmt2": {"start": -7, "end": -6},
-                    # Default for designs with Spine Switch
-                    "customerQSFP": {"start": -6, "end": -2},
-                    # Default for all designs
-                    "customerSFP": {"start": -22, "end": -14}
-                },
-                "mgmt": {
-                    #"leaf": {"start": -4, "end": -2}
-                    #Cisco 92348 specific info below
-                    "leaf": {"start": -6, "end": -4}
-                }
-            },
-            "default_Arista": {
-                "spine": {
-                    "peer": {"start": -14, "end": -6},
-                    "customerQSFP": {"start": -6, "end": -2},
-                    "leaf": {},
-                },
-                "leaf": {
-                    "peer": {"start": -4, "end": -2},
-                    "spine": {"start": -8, "end": -6},
-                    # Default on documentation
-                    "mgmt1": {"start": -16, "end": -15},
-                    # Default on rack and stack single network
-                    # "mgmt2": {"start": -7, "end": -6},
-                    # Default for designs with Spine Switch
-                    "customerQSFP": {"start": -8, "end": -4},
-                    # Default for all designs
-                    "customerSFP": {"start": -24, "end": -16}
-                },
-                "mgmt": {
-                    "leaf": {"start": -4, "end": -2}
-                }
-            },
-            "100G-To-The-Host_Multi": {
-                "spine": {
-                    "peer": {"start": -4, "end": None},
-                    "customerQSFP": {"start": -8, "end": -4},
-                    "leaf": {},
-                },
-                "leaf": {
-                    "spine": {"start": -4, "end": -2},
-                    "peer": {"start": -2, "end": None},
-                    # Default on documentation
-                    # "mgmt1": {"start": -14, "end": -13},
-                    # Default for designs with Spine Switch
-                    "customerQSFP": {"start": -6, "end": -2},
-                    # Default for all designs
-                    "customerSFP": {"start": -22, "end": -14}
-                },
-                "mgmt": {}
-            },
-            "100G-To-The-Host_Single": {
-                "spine": {},
-                "leaf": {
-                    "peer": {"start": -2, "end": None},
-                    "customerQSFP": {"start": -8, "end": -4},
-                },
-                "mgmt": {}
-            },
-            "engr" : {
-                "spine": {
-                    "peer": {"start": -8, "end": -4},
-                    "customerQSFP": {"start": -4, "end": None},
-                    "leaf": {},
-                },
-                "leaf": {
-                    "peer": {"start": -2, "end": None},
-                    "spine": {"start": -6, "end": -4},
-                    "mgmt1": {"start": -8, "end": -7},
-                    # "mgmt2": {"start": -7, "end": -6},
-                    # "customerQSFP": {"start": -6, "end": -2},
-                    "customerSFP": {"start": -7, "end": -6}
-                },
-                "mgmt": {
-                    "leaf": {"start": -4, "end": -2}
-                }
-            }
-        }
-
+        # All Possible UCP CI/HC/RS Designs, the switch placements on the 92348, the default port-channel
+        # ethernet ports and the Arista MLAG settings; networkdesigns.json is read once per process
+        catalog = loadDesignCatalog()
+        self.designs = catalog["designs"]
+        self.placements = catalog["placements"]
+        self.portchannelinterfaces = catalog["portchannelinterfaces"]
         # NOTE: Arista Only
-        self.defaultMLAGsettings = {
-            "peer-vlan" : 4094,
-            "peer-port-channel" : 1,
-            "switches" :
-                [{"primary": {"address": "10.255.255.1/30"}, "secondary": {"address": "10.255.255.2/30"}},
-                 {"primary": {"address": "10.255.255.5/30"}, "secondary": {"address": "10.255.255.6/30"}},
-                 {"primary": {"address": "10.255.255.9/30"}, "secondary": {"address": "10.255.255.10/30"}},
-                 {"primary": {"address": "10.255.255.13/30"}, "secondary": {"address": "10.255.255.14/30"}},
-                 {"primary": {"address": "10.255.255.17/30"}, "secondary": {"address": "10.255.255.18/30"}},
-                 {"primary": {"address": "10.255.255.21/30"}, "secondary": {"address": "10.255.255.22/30"}},
-                 {"primary": {"address": "10.255.255.25/30"}, "secondary": {"address": "10.255.255.26/30"}},
-                 {"primary": {"address": "10.255.255.29/30"}, "secondary": {"address": "10.255.255.30/30"}}]
-        }
+        self.defaultMLAGsettings = catalog["mlag"]
         self.mlagCount = 0
 
+        # Switches configured at the same time within a phase, and attempts after a failure
+        self.maxParallel = switch_phases.DEFAULT_MAX_PARALLEL
+        self.phaseRetries = switch_phases.DEFAULT_RETRIES
+
+        # MAC/WWN -> (switch, port), rebuilt by updateMACTable/updateWWNTable
+        self.macIndex = switch_tables.LocationIndex(switch_tables.normalize_mac, switch_tables.access_port)
+        self.wwnIndex = switch_tables.LocationIndex(switch_tables.normalize_wwn)
+        # Seconds each switch took to answer its last table refresh
+        self.tableRefreshSeconds = {}
+        # Config commands sent through transactions and the round trips they took
+        self.roundTrips = {}
+
         self.previoustypes = []
         self.networkconfigjson = {}
         self.rackjson = {}
@@ -320,16 +139,11 @@ class networkstack(object):
         prename = "R" + str(self.racknum) + "-"
         # Start Char
         intchar = ord("A")-1+2*(int(self.racknum)-1)
-        # Create Blank Dictionary to start counting
+        # Count the switches of each type
         typecount = {}
         for switch in switches:
             switchtype = type(switch).__name__
-            # Attempt to add one to the count and add blank key to switchname dictionary
-            try:
-                typecount.update({switchtype: int(typecount[switchtype])+1})
-            # If switch doesn't exist, add key with count 1
-            except:
-                typecount.update({switchtype: 1})
+            typecount[switchtype] = typecount.get(switchtype, 0) + 1
 
             # Make Switch Name
             try:
@@ -355,28 +169,19 @@ class networkstack(object):
             }
             self.switches.update(tempdict)
 
-        design = None
-
         logger.info(f"*** Created Design: {typecount}")
         # Detect which design this is based off the count of switches
-        for designname, designcount in self.designs.items():
-            if typecount == designcount:
-                # 100G-To-The-Host_Single and 100G-To-The-Host_Multi_100G-TCP-NVMe_R2-R4 is same design. We need to use Rack# to identify the correct design.
-                if self.racknum != 1:
-                    if designname == "100G-To-The-Host_Single":
-                        # logger.info(f"*** Created Design: {designname} , Rack# = {self.racknum} -> SKIP")
-                        continue
-                logger.info("\n*** Detected the following rack: " + designname + "  ***\n")
-                design = designname
-                break
+        design = findDesign(typecount)
 
         # If designs aren't found, please erase all
         if design is None:
             self.switches = {}
-
-        if not design:
+            closest = closestDesigns(typecount)
             logger.info("*** Selected Design not found on the Tookit design templete. Please contact Admin/Developer to add the respective design")
-            exit()
+            for designname, difference in closest:
+                logger.info(f"*** Closest design: {designname} ({difference})")
+            raise DesignNotFound(typecount, closest)
+        logger.info("\n*** Detected the following rack: " + design + "  ***\n")
 
         # For 100G-To-The-Host configuration, need to change 93600 type from spine to leaf
         if "100G-To-The-Host" in design:
@@ -393,8 +198,6 @@ class networkstack(object):
             self.loadPortChannelJSON("default_Cisco")
         elif "100G-To-The-Host_Multi" in design:
             self.loadPortChannelJSON("100G-To-The-Host_Multi")
-        elif "100G-To-The-Host_Single" in design:
-            self.loadPortChannelJSON("100G-To-The-Host_Single")
         self.design = design
 
         return design
@@ -552,48 +355,57 @@ class networkstack(object):
                     return value["instance"]
         return None
 
+    def readTables(self, phase, command, switchnames):
+        # Pull one table from every switch at once over the pooled sessions; {switchname: (output, polled, seconds)}
+        def read(switchname, switchdata):
+            polled = time.monotonic()
+            output = self.getSession(switchname).send(command)
+            return output, polled, round(time.monotonic() - polled, 3)
+
+        tables = self.runPhase(phase, read, switchnames, raise_on_failure=False)
+        self.tableRefreshSeconds.update((switchname, seconds) for switchname, (output, polled, seconds) in tables.items())
+        logger.info(phase + " refreshed in " + ", ".join(switchname + " " + str(seconds) + "s" for switchname, (output, polled, seconds) in tables.items()))
+        return tables
+
     def updateMACTable(self, force=False):
-        for switchname, data in self.switches.items():
-            switch_instance = data["instance"]
-            if isinstance(switch_instance, cisconexus.cisconexus) or isinstance(switch_instance, aristaeos.aristaeos):
-                switch_instance.getMACTable(force)
+        # whereisMAC is a lookup in the index built here. Spine switches carry no host ports.
+        # Without force a switch polled before only adds the entries it learned since then (by their age);
+        # returns {switchname: seconds the switch took to answer}
+        switchnames = [switchname for switchname, data in self.switches.items() if isinstance(data["instance"], MAC_LOCATION_SWITCHES)]
+        since = dict((switchname, self.macIndex.since(self.switches[switchname]["instance"].name)) for switchname in switchnames)
+        tables = self.readTables("mac_table", switch_tables.MAC_TABLE_COMMAND, switchnames)
+        # Applied in rack order, so the first switch still wins for an address seen twice
+        for switchname in switchnames:
+            if switchname not in tables:
+                continue
+            output, polled, seconds = tables[switchname]
+            name = self.switches[switchname]["instance"].name
+            entries = switch_tables.parse_mac_table(output)
+            if force or since[switchname] is None:
+                self.macIndex.update(name, [(mac, port) for mac, port, age in entries], polled)
+            else:
+                self.macIndex.merge(name, [(mac, port) for mac, port, age in entries
+                                           if age is None or age <= since[switchname] + switch_tables.AGE_MARGIN], polled)
+        logger.debug("MAC index holds " + str(len(self.macIndex)) + " host ports")
+        return dict((switchname, tables[switchname][2]) for switchname in tables)
 
     def updateWWNTable(self, force=False):
-        for switchname, data in self.switches.items():
-            switch_instance = data["instance"]
-            if isinstance(switch_instance, brocadefc.brocadefc):
-                switch_instance.getWWNTable(force)
+        # switchshow shows no login age, so every refresh reads the full table
+        switchnames = [switchname for switchname, data in self.switches.items() if isinstance(data["instance"], brocadefc.brocadefc)]
+        tables = self.readTables("wwn_table", switch_tables.FLOGI_TABLE_COMMAND, switchnames)
+        for switchname in switchnames:
+            if switchname in tables:
+                output, polled, seconds = tables[switchname]
+                self.wwnIndex.update(self.switches[switchname]["instance"].name, switch_tables.parse_flogi_table(output), polled)
+        logger.debug("WWN index holds " + str(len(self.wwnIndex)) + " F-Ports")
+        return dict((switchname, tables[switchname][2]) for switchname in tables)
 
     def whereisMAC(self, MAC):
-        MAC = MAC.lower()
-        for switchname, data in self.switches.items():
-            switch_instance = data["instance"]
-            if isinstance(switch_instance, cisconexus.Nexus92348) or isinstance(switch_instance, cisconexus.Nexus93180YCFX) or isinstance(switch_instance, cisconexus.Nexus93180YCFX3) or isinstance(switch_instance, aristaeos.DCS7010) or isinstance(switch_instance, aristaeos.DCS7050SX3):
-                port = switch_instance.whereisMAC(MAC)
-                # Use Cisco Numbering
-                if "Cisco" in self.design:
-                    if port is None or "Po" in port or 'Peer-Link' in port or int(port.replace("Eth1/","")) > 48:
-                        continue
-                    else:
-                        return switch_instance.name, port
-                # Use Arista Numbering
-                else:
-                    if port is None or "Po" in port or 'Peer-Link' in port or int(port.replace("Et","")) > 48:
-                        continue
-                    else:
-                        return switch_instance.name, port
-        return None, None
+        # Uplinks, port-channels and peer-links were left out when the index was built
+        return self.macIndex.lookup(MAC)
 
     def whereisWWN(self, WWN):
-        for switchname, data in self.switches.items():
-            switch_instance = data["instance"]
-            if isinstance(switch_instance, brocadefc.brocadefc):
-                port = switch_instance.whereisWWN(WWN)
-                if port is None:
-                    continue
-                else:
-                    return switch_instance.name, port
-        return None, None
+        return self.wwnIndex.lookup(WWN)
 
     def loadNetworkConfigJSON(self, input):
         self.networkconfigjson = input
@@ -610,14 +422,32 @@ class networkstack(object):
         self.portchanneljson = self.portchannelinterfaces[key]
         return self.portchanneljson
 
+    def runPhase(self, phase, func, switchnames=None, raise_on_failure=True, retries=None):
+        # Run func(switchname, switchdata) on all switches (or switchnames) at once and wait for all of them
+        if switchnames is None:
+            switchnames = list(self.switches.keys())
+        if retries is None:
+            retries = self.phaseRetries
+        return switch_phases.run_phase(phase, lambda switchname: func(switchname, self.switches[switchname]),
+                                       switchnames, retries=retries, max_parallel=self.maxParallel,
+                                       raise_on_failure=raise_on_failure)
+
     def enableAPI(self):
         logger.info("\nEnabling HTTP API on all switches\n")
-        for switchname, switchdata in self.switches.items():
-            switchdata["instance"].enableAPI()
+        self.runPhase("enable_api", lambda switchname, switchdata: switchdata["instance"].enableAPI())
+
+    def getSession(self, switchname):
+        # Reuse the SSH session discovery logged in with; it stays logged in after configurePassword
+        instance = self.switches[switchname]["instance"]
+        session = switch_sessions.pooled(instance.host)
+        if session is None or not session.is_alive():
+            session = switch_sessions.get_session(instance.host, instance.username, instance.password)
+        return session
 
     def configurePassword(self, password=None):
         logger.info("\nConfiguring all passwords on all switches\n")
-        for switchname, switchdata in self.switches.items():
+
+        def configure(switchname, switchdata):
             if password is None:
                 cpassword = lawcompliance.passwordencode(switchdata["instance"].host, autodiscover.getPassword())
             else:
@@ -627,6 +457,8 @@ class networkstack(object):
                 logger.debug(switchdata["instance"].host + " Skip Change Password.... TESTING=True")
             else:
                 switchdata["instance"].updateUserPass("admin", cpassword)
+
+        self.runPhase("password", configure)
         self.saveAllConfigs()
 
 
@@ -634,6 +466,8 @@ class networkstack(object):
         logger.info("\nConfiguring all management interfaces on all switches\n")
         switchnum = 1
         #previoustype = None
+        # The switch numbers depend on the order of the switches, so the addresses are picked first
+        addresses = {}
         for switchname, switchdata in self.switches.items():
             # Get switch type
             type = switchdata["instance"].type
@@ -655,33 +489,92 @@ class networkstack(object):
             if TESTING:
                 logger.debug(f"Skip setting mgmt IP - {switchname}, {ipaddr}, gtw: {self.networkconfigjson['gateway']}")
                 return None
+            addresses[switchname] = ipaddr
 
-            # Attempt to program the switch IP and switchname
-            try:
-                switchdata["instance"].setName(switchname)
-                switchdata["instance"].setIPv4MGMT(ipaddr, self.networkconfigjson["subnet"], self.networkconfigjson["gateway"])
-            except:
-                continue
+        # Attempt to program the switch IP and switchname
+        def configure(switchname, switchdata):
+            switchdata["instance"].setName(switchname)
+            switchdata["instance"].setIPv4MGMT(addresses[switchname], self.networkconfigjson["subnet"], self.networkconfigjson["gateway"])
+
+        self.runPhase("mgmt_interfaces", configure, list(addresses), raise_on_failure=False)
 
     def resetAllInterfaces(self):
         logger.info("\nResetting all interface configurations on all switches\n")
+
+        def reset(switchname, switchdata):
+            logger.info("Resetting all interface configs on " + switchname)
+            switchdata["instance"].resetAllInterfaces()
+
+        # Reset the interfaces if the switch is a spine, leave, or mgmt switch
+        # https://stackoverflow.com/questions/3389574/check-if-multiple-strings-exist-in-another-string
+        self.runPhase("reset_interfaces", reset,
+                      [switchname for switchname, switchdata in self.switches.items()
+                       if any(x in switchdata["instance"].type for x in ["spine", "leaf", "mgmt"])])
+
+    def vpcPriorities(self):
+        # (CISCO ONLY) vPC role priorities go up in switch order: {switchname: priority}
+        priorities = {}
+        priority = 10
         for switchname, switchdata in self.switches.items():
-            # Reset the interfaces if the switch is a spine, leave, or mgmt switch
-            # https://stackoverflow.com/questions/3389574/check-if-multiple-strings-exist-in-another-string
-            if any(x in switchdata["instance"].type for x in ["spine", "leaf", "mgmt"]):
-                logger.info("Resetting all interface configs on " + switchname)
-                switchdata["instance"].resetAllInterfaces()
+            if any(x in switchdata["instance"].model for x in VCP_SWITCH_LIST):
+                priorities[switchname] = priority
+                priority += 1
+        return priorities
+
+    def vpcPeer(self, switchinstance):
+        # Get the other switch that is the same model but different switch
+        otherswitchinstance = None
+        for otherswitchname, otherswitchdata in self.switches.items():
+            if (switchinstance.model == otherswitchdata["instance"].model) and (
+                    switchinstance is not otherswitchdata["instance"]):
+                otherswitchinstance = otherswitchdata["instance"]
+        return otherswitchinstance
+
+    def mlagPeering(self):
+        # (ARISTA ONLY) {switchname: (local address, peer address)} for the spine and leaf switches
+        # Using Ticktock design to determine the primary and secondary switches
+        ticktock = True
+
+        # Set the mlag count by using the racknum. If racknum is less then 2, set mlagcount to 0 so leaf/spine and switch can use the first two mlag addresses. Otherwise, set mlagcount as racknum
+        if int(self.racknum) < 2:
+            self.mlagCount = 0
+        else:
+            self.mlagCount = int(self.racknum)
+
+        peering = {}
+        for switchname, switchdata in self.switches.items():
+            switchinstance = switchdata["instance"]
+            # Check if the switch is a Spine or Leaf switch
+            if (switchinstance.type == "spine") or (switchinstance.type == "leaf"):
+                # If ticktock is False, program with Primary Settings
+                if ticktock:
+                    ticktock = False
+                    localipv4address = self.defaultMLAGsettings["switches"][self.mlagCount]["primary"]["address"]
+                    peeripv4address = self.defaultMLAGsettings["switches"][self.mlagCount]["secondary"]["address"]
+                # Otherwise, program with Secondary Settings
+                else:
+                    ticktock = True
+                    localipv4address = self.defaultMLAGsettings["switches"][self.mlagCount]["secondary"]["address"]
+                    peeripv4address = self.defaultMLAGsettings["switches"][self.mlagCount]["primary"]["address"]
+
+                    # Add Count
+                    self.mlagCount += 1
+                peering[switchname] = (localipv4address, peeripv4address)
+        return peering
+
+    def peerInterfaces(self, switchinstance):
+        # Get last two interfaces on switch
+        return switchinstance.interfaceList[self.portchanneljson[switchinstance.type]["peer"]["start"]:
+                                            self.portchanneljson[switchinstance.type]["peer"]["end"]]
 
     def configureVendorPeering(self):
         logger.info("\nConfiguring the vendor's multi-chassis switch technology\n")
         if 'Cisco' in self.design or '100G-To-The-Host' in self.design:
             # Get the latest IPv4 Addresses of the switches
-            for switchname, switchdata in self.switches.items():
-                if any(x in switchdata["instance"].model for x in CISCO_SWITCH_LIST):
-                    switchdata["instance"].getIPv4MGMT()
+            self.updateMgmtAddresses()
 
             # (CISCO ONLY) Set the lldp, vpc and lacp features
-            for switchname, switchdata in self.switches.items():
+            def setFeatures(switchname, switchdata):
                 # Set the lacp and vpc features if these are cisco leaf and spine switches
                 # https://stackoverflow.com/questions/3389574/check-if-multiple-strings-exist-in-another-string
                 if any(x in switchdata["instance"].model for x in LACP_LLDP_SWITCH_LIST):
@@ -692,215 +585,253 @@ class networkstack(object):
                     logger.info("Enabling vcp features on " + switchname)
                     switchdata["instance"].setFeature('vpc')
 
+            self.runPhase("peering_features", setFeatures)
+
             # (CISCO ONLY) Set the vpc peer-link on the last two interfaces
-            priority = 10
-            for switchname, switchdata in self.switches.items():
+            # Priorities go up in switch order, so they are handed out before the switches run in parallel
+            priorities = self.vpcPriorities()
+
+            def setVPC(switchname, switchdata):
                 switchinstance = switchdata["instance"]
-                # Set the lacp and vpc features if these are cisco leaf and spine switches
-                # https://stackoverflow.com/questions/3389574/check-if-multiple-strings-exist-in-another-string
-                if any(x in switchinstance.model for x in VCP_SWITCH_LIST):
-                    # Get last two interfaces on switch
-                    interfaces = switchinstance.interfaceList[self.portchanneljson[switchinstance.type]["peer"]["start"]:
-                                                              self.portchanneljson[switchinstance.type]["peer"]["end"]]
-
-                    # Get the other switch that is the same model but different switch
-                    otherswitchinstance = None
-                    for otherswitchname, otherswitchdata in self.switches.items():
-                        if (switchinstance.model == otherswitchdata["instance"].model) and (
-                                switchinstance is not otherswitchdata["instance"]):
-                            otherswitchinstance = otherswitchdata["instance"]
-                    logger.info("Setting up peer-link on " + switchinstance.name + " with " + otherswitchinstance.name)
-                    vpcid = self.rackjson[switchinstance.type]["id"]
-                    switchinstance.setVPC(vpcdomainid=vpcid, priority=priority,
-                                          ipv4AddressOfOtherSwitch=otherswitchinstance.hostIPv4Address,
-                                          peerlinkportchannel=1, peerlinkinterfaces=interfaces)
-                    priority += 1
+                otherswitchinstance = self.vpcPeer(switchinstance)
+                logger.info("Setting up peer-link on " + switchinstance.name + " with " + otherswitchinstance.name)
+                vpcid = self.rackjson[switchinstance.type]["id"]
+                switchinstance.setVPC(vpcdomainid=vpcid, priority=priorities[switchname],
+                                      ipv4AddressOfOtherSwitch=otherswitchinstance.hostIPv4Address,
+                                      peerlinkportchannel=1, peerlinkinterfaces=self.peerInterfaces(switchinstance))
+
+            self.runPhase("peering_vpc", setVPC, list(priorities))
         elif 'Arista' in self.design:
-            # Using Ticktock design to determine the primary and secondary switches
-            ticktock = True
-
-            # Set the mlag count by using the racknum. If racknum is less then 2, set mlagcount to 0 so leaf/spine and switch can use the first two mlag addresses. Otherwise, set mlagcount as racknum
-            if int(self.racknum) < 2:
-                self.mlagCount = 0
-            else:
-                self.mlagCount = int(self.racknum)
+            # Primary/secondary alternate in switch order, so the addresses are handed out before the switches run in parallel
+            peering = self.mlagPeering()
 
-            for switchname, switchdata in self.switches.items():
+            def setMLAG(switchname, switchdata):
                 switchinstance = switchdata["instance"]
-                # Check if the switch is a Spine or Leaf switch
-                if (switchinstance.type == "spine") or (switchinstance.type == "leaf"):
-                    # Get last two interfaces on switch
-                    interfaces = switchinstance.interfaceList[
-                                 self.portchanneljson[switchinstance.type]["peer"]["start"]:
-                                 self.portchanneljson[switchinstance.type]["peer"]["end"]]
-                    # Get the global settings
-                    mlagDomainID = self.rackjson[switchinstance.type]["id"]
-                    peerportChannel = self.defaultMLAGsettings["peer-port-channel"]
-                    peerVLAN = self.defaultMLAGsettings["peer-vlan"]
-                    # If ticktock is False, program with Primary Settings
-                    if ticktock:
-                        ticktock = False
-                        localipv4address = self.defaultMLAGsettings["switches"][self.mlagCount]["primary"]["address"]
-                        peeripv4address = self.defaultMLAGsettings["switches"][self.mlagCount]["secondary"]["address"]
-                    # Otherwise, program with Secondary Settings
-                    else:
-                        ticktock = True
-                        localipv4address = self.defaultMLAGsettings["switches"][self.mlagCount]["secondary"]["address"]
-                        peeripv4address = self.defaultMLAGsettings["switches"][self.mlagCount]["primary"]["address"]
-
-                        # Add Count
-                        self.mlagCount += 1
-
-                    # Set the MLAG Peering settings
-                    switchinstance.setMLAGPeering(mlagDomainID, peerportChannel, interfaces, peerVLAN, localipv4address, peeripv4address)
-
-    def configureInternalPortchannels(self):
-        logger.info("Configuring all port-channels from/to spine, leaf, and mgmt switches")
+                # Get the global settings
+                mlagDomainID = self.rackjson[switchinstance.type]["id"]
+                peerportChannel = self.defaultMLAGsettings["peer-port-channel"]
+                peerVLAN = self.defaultMLAGsettings["peer-vlan"]
+                localipv4address, peeripv4address = peering[switchname]
+
+                # Set the MLAG Peering settings
+                switchinstance.setMLAGPeering(mlagDomainID, peerportChannel, self.peerInterfaces(switchinstance), peerVLAN, localipv4address, peeripv4address)
+
+            self.runPhase("peering_mlag", setMLAG, list(peering))
+
+    def updateMgmtAddresses(self):
+        # Get the latest IPv4 Addresses of the Cisco switches; vPC peer-keepalive uses the peer's address
+        self.runPhase("peering_mgmt_address", lambda switchname, switchdata: switchdata["instance"].getIPv4MGMT(),
+                      [switchname for switchname, switchdata in self.switches.items()
+                       if any(x in switchdata["instance"].model for x in CISCO_SWITCH_LIST)])
+
+    def internalPortchannels(self, switchinstance):
+        # [(portchannel number, interfaces, description)] from/to the spine, leaf, and mgmt switches for one switch
+        portchannels = []
         # Program Spine <-> Leaf Trunk from SPINE Switch Perspective
-        try:
-            for switchname, switchdata in self.switches.items():
-                switchinstance = switchdata["instance"]
-                # If the switch is a spine switch, configure all ports for VPC/MLAG connections to all racks
-                if switchinstance.type == 'spine':
-                    # Get only the ethernet interfaces
-                    # https://stackoverflow.com/questions/2152898/filtering-a-list-of-strings-based-on-contents
-                    ethinterfaces = [k for k in switchinstance.interfaceList if 'Eth' in k]
-                    # Program each port-channel for each leaf pair
-                    # For Cisco, program at every two ports. For some reason, the 93180LC switch have the bottom ports disabled. Otherwise program at every 4 ports
-                    if "Cisco" in self.design:
-                        multport = 4
-                    elif "100G-To-The-Host" in self.design:
-                        multport = 2
-                    else:
-                        multport = 4
-                    for rack, rackdata in self.networkconfigjson["rack"].items():
-                        start = multport * (int(rack) - 1)
-                        portchannelinterfaces = ethinterfaces[start:(start + multport)]
-                        ident = rackdata["leaf"]["id"]
-                        switchinstance.setPortChannelInterface(portchannel_num=ident, interfaces=portchannelinterfaces,
-                                                               description="Spine <-> Leaf Rack#" + str(rack),
-                                                               VLANs=self.mainvlans)
-        except:
-            pass
-
-        # Program Spine <-> Leaf Trunk (If needed on rack 1. Required on racks 2-4.) from LEAF Switch Perspective
-        # Use leaf (VPC/MLAG) ID as Portchannel/VPC/MLAG ID for both spine/leaf switches
-        ident = self.rackjson["leaf"]["id"]
-        for switchname, switchdata in self.switches.items():
-            switchinstance = switchdata["instance"]
+        # If the switch is a spine switch, configure all ports for VPC/MLAG connections to all racks
+        if switchinstance.type == 'spine':
+            try:
+                # Get only the ethernet interfaces
+                # https://stackoverflow.com/questions/2152898/filtering-a-list-of-strings-based-on-contents
+                ethinterfaces = [k for k in switchinstance.interfaceList if 'Eth' in k]
+                # Program each port-channel for each leaf pair
+                # For Cisco, program at every two ports. For some reason, the 93180LC switch have the bottom ports disabled. Otherwise program at every 4 ports
+                if "Cisco" in self.design:
+                    multport = 4
+                elif "100G-To-The-Host" in self.design:
+                    multport = 2
+                else:
+                    multport = 4
+                for rack, rackdata in self.networkconfigjson["rack"].items():
+                    start = multport * (int(rack) - 1)
+                    portchannelinterfaces = ethinterfaces[start:(start + multport)]
+                    ident = rackdata["leaf"]["id"]
+                    portchannels.append((ident, portchannelinterfaces, "Spine <-> Leaf Rack#" + str(rack)))
+            except:
+                pass
+
+        if switchinstance.type == 'leaf':
+            # Program Spine <-> Leaf Trunk (If needed on rack 1. Required on racks 2-4.) from LEAF Switch Perspective
+            # Use leaf (VPC/MLAG) ID as Portchannel/VPC/MLAG ID for both spine/leaf switches
             # If the switch is a leaf switch, work on the 3rd and 4th from last interfaces.
-            if switchinstance.type == 'leaf' and "Single" not in self.design:
+            if "Single" not in self.design:
                 interfaces = switchinstance.interfaceList[self.portchanneljson[switchinstance.type]["spine"]["start"]:
                                                           self.portchanneljson[switchinstance.type]["spine"]["end"]]
-                switchinstance.setPortChannelInterface(portchannel_num=ident, interfaces=interfaces,
-                                                       description="Leaf <-> Spine",
-                                                       VLANs=self.mainvlans)
-
-        # Program Leaf <-> Mgmt Trunk on Leaf Switch
-        # Use mgmt (VPC/MLAG) ID as Portchannel/VPC/MLAG ID for both mgmt/leaf switches
-        ident = self.rackjson["mgmt"]["id"]
-        for switchname, switchdata in self.switches.items():
-            switchinstance = switchdata["instance"]
-            if switchinstance.type == 'leaf':
-                interfaces = []
-                for key, value in self.portchanneljson[switchinstance.type].items():
-                    if "mgmt" in key:
-                        interfaces = interfaces + switchinstance.interfaceList[
-                                                  self.portchanneljson[switchinstance.type][key]["start"]:
-                                                  self.portchanneljson[switchinstance.type][key]["end"]]
-                switchinstance.setPortChannelInterface(portchannel_num=ident, interfaces=interfaces,
-                                                       description="Leaf <-> MGMT",
-                                                       VLANs=self.mainvlans)
-                '''
-                # If the switch is specifically a 7050SX3 switch, please set Serdes setting to 10G for the interfaces
-                if switchinstance.model == "DCS-7050SX3-48YC8-R":
-                    switchinstance.setSerdes(interfaces, "10g")
-                '''
+                portchannels.append((self.rackjson["leaf"]["id"], interfaces, "Leaf <-> Spine"))
+
+            # Program Leaf <-> Mgmt Trunk on Leaf Switch
+            # Use mgmt (VPC/MLAG) ID as Portchannel/VPC/MLAG ID for both mgmt/leaf switches
+            interfaces = []
+            for key, value in self.portchanneljson[switchinstance.type].items():
+                if "mgmt" in key:
+                    interfaces = interfaces + switchinstance.interfaceList[
+                                              self.portchanneljson[switchinstance.type][key]["start"]:
+                                              self.portchanneljson[switchinstance.type][key]["end"]]
+            portchannels.append((self.rackjson["mgmt"]["id"], interfaces, "Leaf <-> MGMT"))
+            '''
+            # If the switch is specifically a 7050SX3 switch, please set Serdes setting to 10G for the interfaces
+            if switchinstance.model == "DCS-7050SX3-48YC8-R":
+                switchinstance.setSerdes(interfaces, "10g")
+            '''
 
+        # Program Leaf <-> Mgmt Trunk on MGMT Switch
         # 100G-To-The-Host config does not have Leaf <-> MGMT port channel
-        print("**Design = " + self.design)
-        if "100G-To-The-Host" not in self.design:
-            # Program Leaf <-> Mgmt Trunk on MGMT Switch
-            ident = self.rackjson["mgmt"]["id"]
-            for switchname, switchdata in self.switches.items():
-                switchinstance = switchdata["instance"]
-                # Use mgmt (VPC) ID as Portchannel/VPC/MLAG ID for both mgmt/leaf switches
-                if switchinstance.type == 'mgmt':
-                    # Get the last two SFP+ interfaces for the mgmt switch
-                    interfaces = switchinstance.interfaceList[self.portchanneljson[switchinstance.type]["leaf"]["start"]:
-                                                              self.portchanneljson[switchinstance.type]["leaf"]["end"]]
-                else:
-                    # If the switch is none of the types above, skip it
-                    continue
-                switchinstance.setPortChannelInterface(portchannel_num=ident, interfaces=interfaces,
-                                                       description="Leaf <-> MGMT",
-                                                       VLANs=self.mainvlans)
-
-    def configureCustomerPortchannel(self):
-        logger.info("\nConfiguring customer uplinks\n")
-        ident = self.networkconfigjson["customerid"]
+        if switchinstance.type == 'mgmt' and "100G-To-The-Host" not in self.design:
+            # Use mgmt (VPC) ID as Portchannel/VPC/MLAG ID for both mgmt/leaf switches
+            # Get the last two SFP+ interfaces for the mgmt switch
+            interfaces = switchinstance.interfaceList[self.portchanneljson[switchinstance.type]["leaf"]["start"]:
+                                                      self.portchanneljson[switchinstance.type]["leaf"]["end"]]
+            portchannels.append((self.rackjson["mgmt"]["id"], interfaces, "Leaf <-> MGMT"))
+        return portchannels
+
+    def customerPortchannels(self, switchinstance):
+        # Configure uplink on spine switch if it exists. Otherwise, configure uplink on leaf switch if and only if the racknum is 1
         spine = self.getPrimarySpineSwitch()
-        for switchname, switchdata in self.switches.items():
-            switchinstance = switchdata["instance"]
-            # Configure uplink on spine switch if it exists. Otherwise, configure uplink on leaf switch if and only if the racknum is 1
-            if (switchinstance.type == 'spine') or (switchinstance.type == "leaf" and self.racknum == str(1) and spine is None):
-                interfaces = []
-                for key, value in self.portchanneljson[switchinstance.type].items():
-                    if "customer" in key:
-                        interfaces = interfaces + switchinstance.interfaceList[
-                                                  self.portchanneljson[switchinstance.type][key]["start"]:
-                                                  self.portchanneljson[switchinstance.type][key]["end"]]
-                switchinstance.setPortChannelInterface(portchannel_num=ident, interfaces=interfaces,
-                                                       description="Customer Uplink",
-                                                       VLANs=self.mainvlans)
-            else:
+        if (switchinstance.type == 'spine') or (switchinstance.type == "leaf" and self.racknum == str(1) and spine is None):
+            interfaces = []
+            for key, value in self.portchanneljson[switchinstance.type].items():
+                if "customer" in key:
+                    interfaces = interfaces + switchinstance.interfaceList[
+                                              self.portchanneljson[switchinstance.type][key]["start"]:
+                                              self.portchanneljson[switchinstance.type][key]["end"]]
+            return [(self.networkconfigjson["customerid"], interfaces, "Customer Uplink")]
+        return []
+
+    def ethernetSwitches(self):
+        # The spine, leaf and mgmt switches, whose config is generated by desiredConfig
+        return [switchname for switchname, switchdata in self.switches.items()
+                if switchdata["instance"].type in ('spine', 'leaf', 'mgmt') and not isinstance(switchdata["instance"], brocadefc.brocadefc)]
+
+    def transaction(self, switchname):
+        # Collect a phase's config lines for one switch; they are sent in one session when the block ends
+        return switch_sessions.ConfigTransaction(self.getSession(switchname))
+
+    def reportTransactions(self, phase, transactions):
+        # Log and add up the config commands a phase sent and the round trips they took
+        commands = sum(transaction.commands for transaction in transactions.values())
+        roundtrips = sum(transaction.round_trips for transaction in transactions.values())
+        for key, value in (("commands", commands), ("round_trips", roundtrips)):
+            self.roundTrips[key] = self.roundTrips.get(key, 0) + value
+        logger.info(phase + ": " + str(commands) + " config commands on " + str(len(transactions)) + " switches in " +
+                    str(roundtrips) + " round trips")
+        return {"commands": commands, "round_trips": roundtrips}
+
+    def desiredConfig(self, switchname, priorities, peering):
+        # What networkconfig.json asks of an Ethernet switch, as switch_config sections.
+        # priorities/peering are vpcPriorities()/mlagPeering(), worked out once for the whole rack.
+        switchinstance = self.switches[switchname]["instance"]
+        arista = isinstance(switchinstance, aristaeos.aristaeos)
+        trunk = ["switchport mode trunk", "switchport trunk allowed vlan " + switch_config.format_vlans(self.mainvlans)]
+        # The vPC peer-link / MLAG peer port-channel carries every VLAN, the MLAG peer VLAN included,
+        # so its allowed list is left at the switch default instead of the main VLANs
+        peertrunk = ["switchport mode trunk"]
+        desired = switch_config.DesiredConfig()
+        desired.add("hostname " + switchname)
+
+        # (portchannel number, interfaces, description, trunk lines, extra lines) of every port-channel on the switch
+        portchannels = []
+        peered = False
+        if not arista:
+            if any(x in switchinstance.model for x in LACP_LLDP_SWITCH_LIST):
+                desired.add("feature lacp")
+                desired.add("feature lldp")
+            if any(x in switchinstance.model for x in VCP_SWITCH_LIST):
+                desired.add("feature vpc")
+            if switchname in priorities and ('Cisco' in self.design or '100G-To-The-Host' in self.design):
+                peered = True
+                otherswitchinstance = self.vpcPeer(switchinstance)
+                desired.add("vpc domain " + str(self.rackjson[switchinstance.type]["id"]),
+                            "role priority " + str(priorities[switchname]),
+                            "peer-keepalive destination " + str(otherswitchinstance.hostIPv4Address))
+                portchannels.append((1, self.peerInterfaces(switchinstance), None, peertrunk, ["vpc peer-link"]))
+        elif switchname in peering and 'Arista' in self.design:
+            peered = True
+            localipv4address, peeripv4address = peering[switchname]
+            peerVLAN = str(self.defaultMLAGsettings["peer-vlan"])
+            peerportChannel = str(self.defaultMLAGsettings["peer-port-channel"])
+            desired.add("vlan " + peerVLAN, "trunk group mlagpeer")
+            desired.add("interface Vlan" + peerVLAN, "ip address " + localipv4address)
+            portchannels.append((peerportChannel, self.peerInterfaces(switchinstance), None, peertrunk, ["switchport trunk group mlagpeer"]))
+            desired.add("mlag configuration",
+                        "domain-id " + str(self.rackjson[switchinstance.type]["id"]),
+                        "local-interface Vlan" + peerVLAN,
+                        "peer-address " + peeripv4address.split("/")[0],
+                        "peer-link Port-Channel" + peerportChannel)
+
+        for ident, interfaces, description in self.internalPortchannels(switchinstance) + self.customerPortchannels(switchinstance):
+            # Port-channels of a vPC/MLAG pair span both switches
+            multichassis = [("mlag " if arista else "vpc ") + str(ident)] if peered else []
+            portchannels.append((ident, interfaces, description, trunk, multichassis))
+
+        members = set()
+        mtu = "mtu " + str(self.mtu)
+        for ident, interfaces, description, trunklines, extra in portchannels:
+            if not interfaces:
                 continue
+            descriptionline = ["description " + description] if description else []
+            desired.add("interface port-channel" + str(ident), *(descriptionline + trunklines + extra + [mtu]))
+            for interface in interfaces:
+                members.add(switch_config.interface_name(interface))
+                desired.add("interface " + interface, *(descriptionline + trunklines + [mtu, "channel-group " + str(ident) + " mode active"]))
+
+        # Every other front-panel port carries the main VLANs and the MTU
+        for interface in switchinstance.interfaceList:
+            name = switch_config.interface_name(interface)
+            if name.startswith("Ethernet") and name not in members:
+                desired.add("interface " + interface, *(trunk + [mtu]))
+        return desired
+
+    def planChanges(self):
+        # {switchname: [config lines]} that bring each Ethernet switch to the state networkconfig.json describes;
+        # a switch that already matches gets an empty list
+        switchnames = self.ethernetSwitches()
+        priorities = {}
+        peering = {}
+        if 'Cisco' in self.design or '100G-To-The-Host' in self.design:
+            self.updateMgmtAddresses()
+            priorities = self.vpcPriorities()
+        elif 'Arista' in self.design:
+            peering = self.mlagPeering()
 
-    def configureAllInterfaceVLANs(self):
-        logger.info("\nConfiguring VLANs on all interfaces that are not grouped\n")
-        for switchname, switchdata in self.switches.items():
-            switchinstance = switchdata["instance"]
-            # Configure all non-portchannel interfaces with VLANs
-            if (switchinstance.type == 'spine') or (switchinstance.type == "leaf") or (switchinstance.type == "mgmt"):
-                # Get the latest config
-                switchinstance.getRunningConfig()
-                interfaces = []
-                # Get all the interfaces that isn't part of port-channel
-                for interface, data in switchinstance.interfaceDetails.items():
-                    if ("channel-group" not in data) and ("port-channel" not in interface) and ("mgmt" not in interface) and ("Management" not in interface) and ("Vlan" not in interface) and ("Port-Channel" not in interface):
-                        interfaces.append(interface)
-                switchinstance.setInterfaceVLANs(interfaces, self.mainvlans)
-
-    def configureMTU(self):
-        logger.info("\nConfigure all switchports to MTU = " + str(self.mtu) + "\n")
-        for switchname, switchdata in self.switches.items():
-            switchinstance = switchdata["instance"]
-            switchinstance.setMTU(MTU = self.mtu)
+        def plan(switchname, switchdata):
+            running = switch_config.parse_running_config(self.getSession(switchname).send(switch_config.RUNNING_CONFIG_COMMAND))
+            return switch_config.diff_config(self.desiredConfig(switchname, priorities, peering), running)
+
+        changes = self.runPhase("plan", plan, switchnames)
+        for switchname in switchnames:
+            logger.info(switchname + ": " + (str(len(changes[switchname])) + " config lines differ" if changes[switchname] else "matches networkconfig.json"))
+        return changes
 
-    def saveAllConfigs(self):
+    def applyChanges(self, changes):
+        # Push each switch's differences in one transaction; switches without differences are not touched
+        changed = [switchname for switchname, lines in changes.items() if lines]
+
+        def apply(switchname, switchdata):
+            logger.debug(switchname + " config changes:\n" + "\n".join(changes[switchname]))
+            with self.transaction(switchname) as transaction:
+                transaction.add(*changes[switchname])
+            return transaction
+
+        self.reportTransactions("apply_config", self.runPhase("apply_config", apply, changed))
+        return changed
+
+    def saveAllConfigs(self, switchnames=None):
         logger.info("\nSaving all the configs\n")
 
         if TESTING:
             logger.debug("\nTESTING=True: Skip switch save config. \n")
         else:
-            for switchname, switchdata in self.switches.items():
-                switchinstance = switchdata["instance"]
-                count = 0
-                while count < 5:
-                    logger.info("Saving running-config on " + switchname)
-                    if switchinstance.saveRunningConfig():
-                        break
-                    else:
-                        count += 1
-                        logger.info("Failed to save running-config on " + switchname + "has failed. Trying again.")
-                        continue
+            def save(switchname, switchdata):
+                logger.info("Saving running-config on " + switchname)
+                if not switchdata["instance"].saveRunningConfig():
+                    raise Exception("Failed to save running-config on " + switchname)
+
+            # Five attempts per switch; one that still cannot save is logged, the others are saved
+            self.runPhase("save_config", save, switchnames, raise_on_failure=False, retries=4)
 
     def getDetails(self):
         logger.info("Getting IPv4 Details of Switches",self.switches)
-        for switchname, switchdata in self.switches.items():
-            switchinstance = switchdata["instance"]
-            switchinstance.getIPv4MGMT()
-
+        self.runPhase("details", lambda switchname, switchdata: switchdata["instance"].getIPv4MGMT())
 
 def main():
     badtime.hitachi()
@@ -967,26 +898,35 @@ def main():
     #             logger.info("\nI detected some spine switches in the rack. Rack#" + racknum + " cannot contain spine switches. Spine switches belong in Rack#1. Please correct this error.\nExiting")
     #             return False
 
-    UCPCINet = networkstack(racknum, switches, networkconfigjson)
+    try:
+        UCPCINet = networkstack(racknum, switches, networkconfigjson)
+    except DesignNotFound as e:
+        logger.info(str(e))
+        return False
     UCPCINet.detectOrder()
 
     logger.info("\n*** This rack is the following design: " + UCPCINet.design + "  ***\n")
 
     input("Hit enter to continue")
 
-    # For CA Law Compliance
-    UCPCINet.configurePassword()
-    UCPCINet.configureAllMgmtInterfaces()
-    # For Advisor Team - Request Made by Sathish Shanmugam
-    UCPCINet.enableAPI()
-    UCPCINet.resetAllInterfaces()
-    UCPCINet.configureVendorPeering()
-    UCPCINet.configureInternalPortchannels()
-    UCPCINet.configureCustomerPortchannel()
-    UCPCINet.configureAllInterfaceVLANs()
-    # For Field - Request Made by Cody McCuistion
-    UCPCINet.configureMTU()
-    UCPCINet.saveAllConfigs()
+    # Compare every switch with networkconfig.json; only the differences are pushed and a rack that
+    # already matches is not touched
+    changes = UCPCINet.planChanges()
+    if not any(changes.values()):
+        logger.info("\n*** All switches already match networkconfig.json. Nothing to change. ***\n")
+    else:
+        # A switch without its rack hostname has not been through this tool yet
+        if any(("hostname " + switchname) in lines for switchname, lines in changes.items()):
+            # For CA Law Compliance
+            UCPCINet.configurePassword()
+            UCPCINet.configureAllMgmtInterfaces()
+            # For Advisor Team - Request Made by Sathish Shanmugam
+            UCPCINet.enableAPI()
+            UCPCINet.resetAllInterfaces()
+            changes = UCPCINet.planChanges()
+        UCPCINet.saveAllConfigs(UCPCINet.applyChanges(changes))
+        logger.info("Config commands sent: " + str(UCPCINet.roundTrips.get("commands", 0)) + " in " + str(UCPCINet.roundTrips.get("round_trips", 0)) + " round trips")
+    switch_sessions.close_all()
 
     badtime.okay()
     logger.info(f"Saved log file {log_file_name}")
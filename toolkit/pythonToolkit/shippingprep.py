@@ -12,6 +12,8 @@ from autodiscover import CSV_FILE_PATH, getPassword
 import loginit
 import logging
 import subprocess
+import shlex
+import ilorest_session
 import prettytable
 from esxi import ESXi
 import quantaskylake
@@ -28,14 +30,15 @@ class ILORestLoginContextManager:
         self.password = password
 
     def __enter__(self):
-        cmd=  f'{ILO_REST_PATH} login {self.host} -u {self.username} -p {self.password}'
+        # Each host gets its own ilorest cache dir, so several hosts can be logged in at once
+        cmd = ilorest_session.ilorest_cmd(ILO_REST_PATH, self.host, 'login', self.host, '-u', self.username, '-p', self.password)
         subprocess.call(cmd)
         return self
     def __exit__(self, exc_type, exc_value, traceback):
-        subprocess.call(f'{ILO_REST_PATH} logout')
+        subprocess.call(ilorest_session.ilorest_cmd(ILO_REST_PATH, self.host, 'logout'))
     
     def run(self,cmd):
-        subprocess.call(f"{ILO_REST_PATH} {cmd}")
+        subprocess.call(ilorest_session.ilorest_cmd(ILO_REST_PATH, self.host, *shlex.split(cmd)))
 
 
 def reset_ha_servers_password(host,username,password,newpassword):
@@ -103,7 +106,11 @@ def main():
             return False
         # Discover the switches
         switches = autodiscover.discoverSwitches(autodiscover.getIPv6Neighbors(), ['admin'], ['Passw0rd!'])
-        UCPNet = networkconfig.networkstack(racknum, switches, networkconfigjson)
+        try:
+            UCPNet = networkconfig.networkstack(racknum, switches, networkconfigjson)
+        except networkconfig.DesignNotFound as e:
+            logger.info(str(e))
+            return False
         UCPNet.detectOrder()
     else:
         UCPNet = None